@@ -0,0 +1,419 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import cv2
+import numpy as np
+
+from capture import MemoryFrameSource
+from macro_engine import Desktop, MacroEngine
+from matcher import synthetic_screenshot
+from process_cache import ProcessNameCache, StubProcessProvider
+from profiler import PHASES, SUB_PHASES, StepProfiler
+from window_index import FakeWindowBackend, WindowTreeSnapshot, build_synthetic_tree
+from window_watcher import ScriptedEventSource
+
+try:
+    import resource
+except ImportError:  # 윈도우에는 없음
+    resource = None
+
+# 크기 이름 -> (윈도우 수, 단계 수)
+SIZES = {
+    "small": (100, 10),
+    "medium": (1000, 100),
+    "large": (10000, 1000),
+    "huge": (100000, 10000),
+}
+DEFAULT_SIZES = ("small", "medium", "large")
+
+# 이미지 조건의 대상이 되는 캔버스 윈도우 수. 각각 스크린샷 하나를 돌려줌
+CANVASES = 4
+SCREENSHOT_SIZE = (1280, 720)
+# 실행 중에 나중에 나타나는 대화상자 수와 나타나는 간격(초)
+DIALOGS = 5
+DIALOG_INTERVAL = 0.02
+# 이 간격마다 단계에 이미지 조건(wait, skip, auto-position 순서)을 붙임
+IMAGE_EVERY = 10
+# 기준 결과보다 steps/s 가 이 비율 이상 떨어지면 회귀로 봄
+REGRESSION_TOLERANCE = 0.2
+
+
+class NullInput:
+    """입력을 보내지 않는 백엔드입니다. 보낸 횟수만 셉니다."""
+
+    def __init__(self):
+        self.sent = 0
+
+    def send_click(self, hwnd, x, y, click_type, menu=False):
+        self.sent += 1
+
+    def send_drag(self, hwnd, x, y, end_x, end_y, menu=False):
+        self.sent += 1
+
+    def send_keys(self, hwnd, keys):
+        self.sent += 1
+
+    def move_cursor_before_click(self):
+        pass
+
+    def scroll_window(self, hwnd):
+        pass
+
+
+def load_screenshots(directory):
+    """폴더의 이미지 파일들을 (H, W, 4) BGRX 배열 목록으로 읽습니다."""
+    screenshots = []
+    for name in sorted(os.listdir(directory)):
+        if not name.lower().endswith((".png", ".bmp", ".jpg", ".jpeg")):
+            continue
+        path = os.path.join(directory, name)
+        # 한글 경로를 위해 fromfile + imdecode 사용
+        image = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            screenshots.append(cv2.cvtColor(image, cv2.COLOR_BGR2BGRA))
+    if not screenshots:
+        raise ValueError(f"no screenshots in {directory}")
+    return screenshots
+
+
+def synthetic_screenshots(count, rng):
+    """가짜 UI 스크린샷 count 장을 BGRX 배열로 만듭니다."""
+    return [
+        cv2.cvtColor(synthetic_screenshot(*SCREENSHOT_SIZE, rng), cv2.COLOR_GRAY2BGRA)
+        for _ in range(count)
+    ]
+
+
+def crop_template(screenshot, rng, width=120, height=48):
+    """스크린샷에서 무늬가 충분한 영역을 잘라 흑백 템플릿으로 반환합니다."""
+    gray = cv2.cvtColor(screenshot, cv2.COLOR_BGRA2GRAY)
+    height = min(height, gray.shape[0])
+    width = min(width, gray.shape[1])
+    best = None
+    for _ in range(50):
+        x = int(rng.integers(0, gray.shape[1] - width + 1))
+        y = int(rng.integers(0, gray.shape[0] - height + 1))
+        crop = gray[y : y + height, x : x + width]
+        if best is None or crop.std() > best.std():
+            best = crop
+        if best.std() > 40:
+            break
+    return best.copy()
+
+
+class SimulatedDesktop:
+    """실제 윈도우 대신 쓰는 가짜 데스크톱입니다.
+
+    합성 윈도우 트리, 실행 중에 스크립트대로 나타나는 대화상자, 캔버스 윈도우마다 스크린샷을
+    돌려주는 캡처 소스로 이루어집니다. 이미지 조건용 템플릿은 스크린샷에서 잘라 directory 에
+    저장합니다.
+    """
+
+    def __init__(self, window_count, screenshots, directory, rng):
+        self.rng = rng
+        self.backend = backend = FakeWindowBackend()
+        build_synthetic_tree(backend, window_count)
+        main = backend.add_window(0, "MidasMain", "MIDAS", 1)
+        self.frames = {}
+        self.canvases = []
+        self.templates = []
+        for i in range(CANVASES):
+            screenshot = screenshots[i % len(screenshots)]
+            height, width = screenshot.shape[:2]
+            canvas = backend.add_window(
+                main, "Canvas", f"Canvas {i}", 1, rect=(0, 0, width, height)
+            )
+            self.frames[canvas] = screenshot
+            self.canvases.append(self.target("Canvas", f"Canvas {i}", 2))
+            path = os.path.join(directory, f"template_{i}.png")
+            _, encoded = cv2.imencode(".png", crop_template(screenshot, rng))
+            encoded.tofile(path)
+            self.templates.append(path)
+        # 대화상자는 실행이 시작된 뒤 DIALOG_INTERVAL 간격으로 하나씩 나타남
+        self.script = [
+            (
+                DIALOG_INTERVAL,
+                "create",
+                lambda i=i: backend.add_window(0, "#32770", f"Dialog {i}", 1),
+            )
+            for i in range(DIALOGS)
+        ]
+        self.windows = [
+            info
+            for info in WindowTreeSnapshot(backend).windows
+            if info.window_class.startswith("Class")
+        ]
+
+    @staticmethod
+    def target(window_class, window_text, depth, program="program1.exe"):
+        return {
+            "program": program,
+            "window_class": window_class,
+            "window_text": window_text,
+            "window_title": window_text,
+            "depth": depth,
+        }
+
+    def desktop(self):
+        """스크립트를 처음부터 재생하는 새 Desktop 을 만듭니다."""
+        return Desktop(
+            self.backend,
+            MemoryFrameSource(self.frames),
+            ScriptedEventSource(self.script),
+            ProcessNameCache(StubProcessProvider()),
+        )
+
+    def click_data(self, steps):
+        """steps 개 단계의 매크로를 만듭니다."""
+        dialog_steps = {
+            steps * (i + 1) // (DIALOGS + 1): i for i in range(min(DIALOGS, steps))
+        }
+        click_data_list = []
+        for i in range(steps):
+            if i in dialog_steps:
+                click_info = self.target("#32770", f"Dialog {dialog_steps[i]}", 1)
+            else:
+                info = self.windows[int(self.rng.integers(len(self.windows)))]
+                click_info = self.target(
+                    info.window_class, info.window_text, info.depth, info.program
+                )
+            click_info.update(
+                {
+                    "x": 10,
+                    "y": 10,
+                    "click_type": "Click",
+                    "keyboard": "ok{enter}" if i % 7 == 0 else "",
+                    "is_cursor_move": i % 3 == 0,
+                }
+            )
+            if i % IMAGE_EVERY == 0:
+                self.add_condition(click_info, i // IMAGE_EVERY)
+            click_data_list.append(click_info)
+        return click_data_list
+
+    def add_condition(self, click_info, n):
+        """wait, skip, auto-position 조건을 번갈아 붙입니다."""
+        canvas = n % CANVASES
+        target = self.canvases[canvas]
+        kind = n % 3
+        if kind == 0:
+            click_info.update(
+                is_wait=True,
+                wait_image_target=target,
+                wait_image_path=self.templates[canvas],
+                wait_timeout=1,
+            )
+        elif kind == 1:
+            # 다른 캔버스의 템플릿이라 일치하지 않으므로 전체 윈도우 탐색까지 거침
+            click_info.update(
+                is_skip=True,
+                skip_image_target=target,
+                skip_image_path=self.templates[(canvas + 1) % CANVASES],
+            )
+        else:
+            click_info.update(
+                is_auto_position=True,
+                auto_position_target=target,
+                auto_position_path=self.templates[canvas],
+            )
+
+
+def peak_memory_mb():
+    """현재 프로세스의 최대 RSS(MB)를 반환합니다. 알 수 없으면 None 입니다."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # 리눅스는 KB, macOS 는 바이트
+    return peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+
+
+def phase_latencies(profiler):
+    """구간별 단계당 시간(ms)의 평균, p95, 최대를 반환합니다."""
+    per_phase = {}
+    for phases in profiler.step_totals().values():
+        for name, seconds in phases.items():
+            per_phase.setdefault(name, []).append(seconds * 1000)
+    return {
+        name: {
+            "count": len(values),
+            "mean": float(np.mean(values)),
+            "p95": float(np.percentile(values, 95)),
+            "max": float(np.max(values)),
+        }
+        for name, values in per_phase.items()
+    }
+
+
+def run_size(name, screenshot_dir=None, seed=0):
+    """크기 하나를 현재 프로세스에서 실행하고 결과 사전을 반환합니다."""
+    window_count, steps = SIZES[name]
+    rng = np.random.default_rng(seed)
+    if screenshot_dir:
+        screenshots = load_screenshots(screenshot_dir)
+    else:
+        screenshots = synthetic_screenshots(CANVASES, rng)
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        simulated = SimulatedDesktop(window_count, screenshots, directory, rng)
+        click_data_list = simulated.click_data(steps)
+        setup = time.perf_counter() - start
+
+        profiler = StepProfiler()
+        input_backend = NullInput()
+        engine = MacroEngine(
+            desktop=simulated.desktop(),
+            input_backend=input_backend,
+            profiler=profiler,
+        )
+        start = time.perf_counter()
+        plan = engine.compile(click_data_list)
+        compile_time = time.perf_counter() - start
+
+        cpu_start = time.process_time()
+        start = time.perf_counter()
+        results = engine.run(plan)
+        elapsed = time.perf_counter() - start
+        cpu = time.process_time() - cpu_start
+
+    return {
+        "size": name,
+        "windows": window_count,
+        "steps": steps,
+        "setup_s": setup,
+        "compile_s": compile_time,
+        "run_s": elapsed,
+        "steps_per_s": len(results) / elapsed if elapsed else 0.0,
+        "cpu_s": cpu,
+        "peak_mb": peak_memory_mb(),
+        "statuses": dict(Counter(result.status for result in results)),
+        "inputs_sent": input_backend.sent,
+        "snapshots_built": engine.desktop.snapshots_built,
+        "phases": phase_latencies(profiler),
+    }
+
+
+def run_isolated(name, screenshot_dir=None, seed=0):
+    """크기 하나를 자식 프로세스에서 실행합니다. 최대 메모리가 크기마다 따로 측정됩니다."""
+    command = [sys.executable, os.path.abspath(__file__), "--child", name]
+    command += ["--seed", str(seed)]
+    if screenshot_dir:
+        command += ["--screenshots", screenshot_dir]
+    completed = subprocess.run(
+        command, capture_output=True, text=True, encoding="utf-8", check=False
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"{name} benchmark failed:\n{completed.stderr}")
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def format_results(results):
+    """결과 목록을 요약표와 구간별 지연 표 문자열로 만듭니다."""
+    lines = [
+        f"{'size':<8} {'windows':>8} {'steps':>6} {'setup s':>8} {'run s':>7} "
+        f"{'steps/s':>9} {'cpu %':>6} {'peak MB':>8}  statuses"
+    ]
+    for result in results:
+        peak = result["peak_mb"]
+        cpu_percent = result["cpu_s"] / result["run_s"] * 100 if result["run_s"] else 0
+        statuses = ", ".join(f"{k} {v}" for k, v in sorted(result["statuses"].items()))
+        lines.append(
+            f"{result['size']:<8} {result['windows']:>8} {result['steps']:>6} "
+            f"{result['setup_s']:>8.2f} {result['run_s']:>7.2f} "
+            f"{result['steps_per_s']:>9.1f} {cpu_percent:>6.0f} "
+            f"{peak if peak is not None else float('nan'):>8.1f}  {statuses}"
+        )
+
+    lines.append("")
+    lines.append("Per-step phase latency, mean / p95 ms")
+    header = f"{'phase':<14}" + "".join(f"{r['size']:>20}" for r in results)
+    lines.append(header)
+    for phase in ("step",) + PHASES + SUB_PHASES:
+        if not any(phase in result["phases"] for result in results):
+            continue
+        cells = []
+        for result in results:
+            stats = result["phases"].get(phase)
+            cell = f"{stats['mean']:.3f} / {stats['p95']:.3f}" if stats else "-"
+            cells.append(f"{cell:>20}")
+        lines.append(f"{phase:<14}" + "".join(cells))
+    return "\n".join(lines)
+
+
+def compare(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    """기준 결과와 steps/s 를 비교합니다. 회귀한 크기 이름 목록을 반환합니다."""
+    previous = {result["size"]: result for result in baseline}
+    regressions = []
+    for result in results:
+        old = previous.get(result["size"])
+        if old is None or not old["steps_per_s"]:
+            continue
+        ratio = result["steps_per_s"] / old["steps_per_s"]
+        regressed = ratio < 1 - tolerance
+        print(
+            f"{result['size']:<8} {old['steps_per_s']:>9.1f} -> "
+            f"{result['steps_per_s']:>9.1f} steps/s ({ratio:.2f}x)"
+            + ("  REGRESSION" if regressed else "")
+        )
+        if regressed:
+            regressions.append(result["size"])
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="가짜 데스크톱에서 매크로 실행 전체를 벤치마크합니다. (리눅스에서 실행 가능)"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(DEFAULT_SIZES),
+        help=f"쉼표로 구분한 크기: {', '.join(SIZES)} (기본값: {','.join(DEFAULT_SIZES)})",
+    )
+    parser.add_argument(
+        "--screenshots", help="캔버스 윈도우가 돌려줄 녹화된 스크린샷 폴더"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    parser.add_argument(
+        "--baseline", help="이전 --json 결과. steps/s 가 떨어지면 종료 코드 1"
+    )
+    parser.add_argument("--child", choices=SIZES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # 자식 프로세스는 결과 JSON 한 줄만 출력
+        print(json.dumps(run_size(args.child, args.screenshots, args.seed)))
+        return 0
+
+    names = [name.strip() for name in args.sizes.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results = []
+    for name in names:
+        windows, steps = SIZES[name]
+        print(f"Running {name}: {windows} windows, {steps} steps...", flush=True)
+        results.append(run_isolated(name, args.screenshots, args.seed))
+    print()
+    print(format_results(results))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        print()
+        if compare(results, baseline):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,247 @@
+import threading
+import zlib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class Frame:
+    """캡처된 윈도우 이미지입니다. bgrx 는 비트맵 바이트 위의 복사 없는 (H, W, 4) 뷰입니다."""
+
+    __slots__ = ("hwnd", "width", "height", "buffer", "bgrx")
+
+    def __init__(self, hwnd, width, height, buffer):
+        self.hwnd = hwnd
+        self.width = width
+        self.height = height
+        self.buffer = buffer
+        self.bgrx = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width, 4)
+
+    def gray(self):
+        """그레이스케일 배열을 반환합니다."""
+        return cv2.cvtColor(self.bgrx, cv2.COLOR_BGRA2GRAY)
+
+    def bgr(self):
+        return cv2.cvtColor(self.bgrx, cv2.COLOR_BGRA2BGR)
+
+    def to_qimage(self):
+        """PNG 인코딩 없이 버퍼에서 바로 QImage 를 만듭니다. (BGRX == Format_RGB32)
+
+        QImage 는 버퍼를 복사하지 않으므로 프레임이 살아있는 동안만 사용해야 합니다.
+        """
+        from PyQt5.QtGui import QImage
+
+        return QImage(
+            self.buffer, self.width, self.height, self.width * 4, QImage.Format_RGB32
+        )
+
+
+def fingerprint(gray):
+    """프레임의 값싼 지문입니다. 크기와 CRC32 가 같으면 같은 화면으로 봅니다."""
+    return gray.shape, zlib.crc32(gray)
+
+
+def changed_rect(previous, current):
+    """두 그레이스케일 프레임에서 바뀐 픽셀을 모두 포함하는 (x, y, w, h) 를 반환합니다.
+
+    바뀐 곳이 없으면 None 을 반환합니다.
+    """
+    x, y, w, h = cv2.boundingRect(cv2.absdiff(previous, current))
+    if w == 0 or h == 0:
+        return None
+    return x, y, w, h
+
+
+class SurfacePool:
+    """크기별로 캡처 표면(메모리 DC 와 비트맵 등)을 재사용합니다."""
+
+    def __init__(self, create, destroy, max_entries=4):
+        self.create = create
+        self.destroy = destroy
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict()  # (width, height) -> 표면
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, width, height, *args):
+        key = (width, height)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            self.reused += 1
+            return surface
+        surface = self.surfaces[key] = self.create(width, height, *args)
+        self.created += 1
+        while len(self.surfaces) > self.max_entries:
+            _, old = self.surfaces.popitem(last=False)
+            self.destroy(old)
+        return surface
+
+    def clear(self):
+        while self.surfaces:
+            _, old = self.surfaces.popitem()
+            self.destroy(old)
+
+
+class GdiFrameSource:
+    """BitBlt 로 윈도우를 캡처합니다. 크기가 같으면 메모리 DC 와 비트맵을 재사용합니다."""
+
+    def __init__(self):
+        import win32con
+        import win32gui
+        import win32ui
+
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.win32ui = win32ui
+        self.pool = SurfacePool(self.create_surface, self.destroy_surface)
+        self.lock = threading.Lock()
+
+    def create_surface(self, width, height, mfcDC):
+        saveDC = mfcDC.CreateCompatibleDC()
+        saveBitMap = self.win32ui.CreateBitmap()
+        saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
+        saveDC.SelectObject(saveBitMap)
+        return saveDC, saveBitMap
+
+    def destroy_surface(self, surface):
+        saveDC, saveBitMap = surface
+        self.win32gui.DeleteObject(saveBitMap.GetHandle())
+        saveDC.DeleteDC()
+
+    def grab(self, hwnd):
+        """(width, height, BGRX 바이트) 를 반환합니다. 실패하면 None 을 반환합니다."""
+        left, top, right, bottom = self.win32gui.GetWindowRect(hwnd)
+        width = right - left
+        height = bottom - top
+        if width <= 0 or height <= 0:
+            return None
+        with self.lock:
+            hwndDC = self.win32gui.GetWindowDC(hwnd)
+            mfcDC = self.win32ui.CreateDCFromHandle(hwndDC)
+            try:
+                saveDC, saveBitMap = self.pool.acquire(width, height, mfcDC)
+                result = saveDC.BitBlt(
+                    (0, 0), (width, height), mfcDC, (0, 0), self.win32con.SRCCOPY
+                )
+                if result == 0:
+                    # BitBlt 실패
+                    return None
+                bits = saveBitMap.GetBitmapBits(True)
+            finally:
+                mfcDC.DeleteDC()
+                self.win32gui.ReleaseDC(hwnd, hwndDC)
+        if len(bits) != width * height * 4:
+            return None
+        return width, height, bits
+
+    def close(self):
+        with self.lock:
+            self.pool.clear()
+
+
+class MemoryFrameSource:
+    """메모리에 있는 프레임을 돌려주는 캡처 백엔드입니다. 리눅스에서 벤치마크할 때 사용합니다.
+
+    frames 는 hwnd -> (H, W, 4) uint8 배열 또는 배열 목록입니다. 목록이면 호출마다 다음 프레임을 돌려줍니다.
+    """
+
+    def __init__(self, frames=None):
+        self.frames = {}
+        self.positions = {}
+        # GDI 표면 대신 크기만 기록하여 재사용 로직을 그대로 거치게 함
+        self.pool = SurfacePool(lambda width, height: (width, height), lambda s: None)
+        for hwnd, hwnd_frames in (frames or {}).items():
+            self.set_frames(hwnd, hwnd_frames)
+
+    def set_frames(self, hwnd, frames):
+        """GetBitmapBits 처럼 바이트로 미리 변환해 둡니다."""
+        if isinstance(frames, list):
+            self.frames[hwnd] = [self.to_bits(frame) for frame in frames]
+        else:
+            self.frames[hwnd] = self.to_bits(frames)
+        self.positions[hwnd] = 0
+
+    @staticmethod
+    def to_bits(frame):
+        height, width = frame.shape[:2]
+        return width, height, np.ascontiguousarray(frame, dtype=np.uint8).tobytes()
+
+    def grab(self, hwnd):
+        frames = self.frames.get(hwnd)
+        if frames is None:
+            return None
+        if isinstance(frames, list):
+            position = self.positions.get(hwnd, 0)
+            grabbed = frames[min(position, len(frames) - 1)]
+            self.positions[hwnd] = position + 1
+        else:
+            grabbed = frames
+        self.pool.acquire(grabbed[0], grabbed[1])
+        return grabbed
+
+    def close(self):
+        self.pool.clear()
+
+
+class CaptureEngine:
+    """모든 캡처 경로(매칭, 미리보기)가 함께 쓰는 캡처 엔진입니다."""
+
+    def __init__(self, source):
+        self.source = source
+        self.captures = 0
+
+    def capture(self, hwnd):
+        """hwnd 를 캡처하여 Frame 을 반환합니다. 실패하면 None 을 반환합니다."""
+        grabbed = self.source.grab(hwnd)
+        if grabbed is None:
+            return None
+        width, height, bits = grabbed
+        self.captures += 1
+        return Frame(hwnd, width, height, bits)
+
+    def close(self):
+        self.source.close()
+
+
+if __name__ == "__main__":
+    # 변환 경로와 표면 재사용을 리눅스에서 측정합니다.
+    import io
+    import time
+
+    rng = np.random.default_rng(0)
+    width, height = 2560, 1440
+    bgrx = rng.integers(0, 255, (height, width, 4), dtype=np.uint8)
+    source = MemoryFrameSource({1: bgrx})
+    engine = CaptureEngine(source)
+    rounds = 20
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        frame = engine.capture(1)
+        frame.gray()
+    engine_time = (time.perf_counter() - start) / rounds
+    print(f"Capture engine grab + gray: {engine_time * 1000:.1f} ms")
+    print(f"Surfaces created {source.pool.created}, reused {source.pool.reused}")
+
+    try:
+        from PIL import Image
+    except ImportError:
+        Image = None
+    if Image is not None:
+        bits = bgrx.tobytes()
+        start = time.perf_counter()
+        for _ in range(rounds):
+            im = Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1)
+            cv2.cvtColor(np.array(im), cv2.COLOR_RGB2GRAY)
+        legacy_time = (time.perf_counter() - start) / rounds
+        print(f"Legacy PIL path + gray:     {legacy_time * 1000:.1f} ms")
+
+        start = time.perf_counter()
+        for _ in range(rounds // 4):
+            im = Image.frombuffer("RGB", (width, height), bits, "raw", "BGRX", 0, 1)
+            buffer = io.BytesIO()
+            im.save(buffer, format="PNG")
+        png_time = (time.perf_counter() - start) / (rounds // 4)
+        print(f"Legacy preview PNG round-trip (encode only): {png_time * 1000:.1f} ms")
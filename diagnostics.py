@@ -0,0 +1,143 @@
+import datetime
+import os
+import queue
+import threading
+import uuid
+
+from logs import get_logger
+
+log = get_logger("diagnostics")
+
+OFF = "off"
+SAMPLED = "sampled"
+FINAL_FAILURE = "final_failure"
+LEVELS = (OFF, SAMPLED, FINAL_FAILURE)
+
+
+class MatchDiagnostics:
+    """이미지 매칭 디버그 이미지를 백그라운드에서 저장합니다.
+
+    - off: 아무것도 저장하지 않습니다. (기본값)
+    - sampled: sample_every 번째 매칭마다, 그리고 최종 실패 시 저장합니다.
+    - final_failure: 대기 시간 초과 등 최종 실패 시에만 저장합니다.
+    """
+
+    def __init__(
+        self,
+        level=OFF,
+        directory="./test",
+        sample_every=30,
+        max_bytes=200 * 1024 * 1024,
+        queue_size=8,
+    ):
+        if level not in LEVELS:
+            log.warning("Unknown diagnostics level '%s', using '%s'.", level, OFF)
+            level = OFF
+        self.level = level
+        self.directory = directory
+        self.sample_every = sample_every
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = None
+        self.match_count = 0
+        self.written = 0
+        self.dropped = 0
+        self.files = None  # (수정 시각, 경로, 크기) 목록, 오래된 순
+
+    @classmethod
+    def from_environment(cls):
+        """MIDAS_LINKER_DIAGNOSTICS 환경 변수로 수준을 정합니다."""
+        return cls(level=os.environ.get("MIDAS_LINKER_DIAGNOSTICS", OFF))
+
+    def on_match(self, tag, window_array, target_shape, max_loc, similarity):
+        """매칭할 때마다 호출됩니다. sampled 수준에서만 일부를 저장합니다."""
+        if self.level != SAMPLED:
+            return
+        self.match_count += 1
+        if self.match_count % self.sample_every == 1 or self.sample_every <= 1:
+            self.submit(tag, window_array, target_shape, max_loc, similarity)
+
+    def on_final_failure(self, tag, window_array, target_shape, max_loc, similarity):
+        """대기 시간 초과 등 최종 실패 시 호출됩니다."""
+        if self.level == OFF or window_array is None:
+            return
+        self.submit(f"{tag}_failed", window_array, target_shape, max_loc, similarity)
+
+    def submit(self, tag, window_array, target_shape, max_loc, similarity):
+        """쓰기 작업을 큐에 넣습니다. 큐가 가득 차면 버립니다. (호출 스레드는 절대 막히지 않음)"""
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait((tag, window_array, target_shape, max_loc, similarity))
+        except queue.Full:
+            self.dropped += 1
+
+    def run(self):
+        while True:
+            job = self.queue.get()
+            try:
+                self.write(*job)
+            except Exception as e:
+                log.warning("Failed to write diagnostics image: %s", e)
+            finally:
+                self.queue.task_done()
+
+    def write(self, tag, window_array, target_shape, max_loc, similarity):
+        import cv2
+
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        unique_id = str(uuid.uuid4())[:8]
+        base_filename = f"{timestamp}_{unique_id}_{tag}_{similarity:.3f}"
+
+        # 캡처는 BGRX 이므로 저장 전에 BGR 로 변환
+        window_bgr = cv2.cvtColor(window_array, cv2.COLOR_BGRA2BGR)
+        window_path = os.path.join(self.directory, f"{base_filename}_window.png")
+        self.save(window_path, window_bgr)
+
+        h, w = target_shape[:2]
+        x, y = max_loc
+        cv2.rectangle(window_bgr, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        result_path = os.path.join(self.directory, f"{base_filename}_result.png")
+        self.save(result_path, window_bgr)
+
+        self.written += 1
+        self.rotate()
+
+    def save(self, path, image):
+        import cv2
+
+        # 한글 경로를 위해 imencode + tofile 사용
+        ok, encoded = cv2.imencode(".png", image)
+        if ok:
+            encoded.tofile(path)
+            self.track(path)
+
+    def track(self, path):
+        if self.files is None:
+            self.files = []
+            for entry in os.scandir(self.directory):
+                if entry.is_file() and entry.path != path:
+                    stat = entry.stat()
+                    self.files.append((stat.st_mtime, entry.path, stat.st_size))
+            self.files.sort()
+        self.files.append((os.path.getmtime(path), path, os.path.getsize(path)))
+
+    def rotate(self):
+        """디렉터리 전체 크기가 max_bytes 를 넘으면 오래된 파일부터 지웁니다."""
+        total = sum(size for _, _, size in self.files)
+        while self.files and total > self.max_bytes:
+            _, path, size = self.files.pop(0)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total -= size
+
+    def flush(self):
+        """큐에 남은 쓰기 작업이 끝날 때까지 기다립니다."""
+        if self.thread is not None:
+            self.queue.join()
@@ -0,0 +1,212 @@
+import threading
+
+from macro_engine import Desktop, MacroEngine
+from macro_plan import compile_plan
+
+
+class ExecutionJob:
+    """관리자에 등록된 매크로 하나입니다. 엔진과 실행 스레드를 가집니다."""
+
+    def __init__(self, name, plan, engine):
+        self.name = name
+        self.plan = plan
+        self.engine = engine
+        self.thread = None
+        self.progress = -1  # 마지막으로 클릭한 단계 (아직 없으면 -1)
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    @property
+    def results(self):
+        return self.engine.step_results
+
+
+class ExecutionManager:
+    """여러 매크로를 동시에 실행합니다. 각 매크로는 자신의 대상 프로세스와 취소 상태를 가집니다.
+
+    모든 엔진이 하나의 Desktop(윈도우 트리 스냅샷, 캡처 엔진, 템플릿 캐시)을 공유합니다.
+    클릭은 PostMessage 로 보내므로 포커스 경쟁 없이 병렬로 실행할 수 있습니다.
+    """
+
+    def __init__(
+        self,
+        desktop=None,
+        input_backend=None,
+        on_progress=None,
+        on_finished=None,
+        masker=None,
+        profiler=None,
+    ):
+        self.desktop = desktop or Desktop()
+        self.input_backend = input_backend
+        # 모든 엔진이 함께 쓰는 오버레이 관리자. 엔진마다 자신의 대상 윈도우만 가림
+        self.masker = masker
+        # 모든 엔진이 함께 쓰는 단계 프로파일러. 추적 파일에서 스레드별로 나뉨
+        self.profiler = profiler
+        # 클릭 후 (name, idx, hwnd), 매크로 하나가 끝나면 (name) 으로 호출되는 콜백
+        self.on_progress = on_progress
+        self.on_finished = on_finished
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def add(self, name, click_data_list, target_pid=None):
+        """매크로를 등록합니다. target_pid 를 주면 그 프로세스의 윈도우만 대상으로 합니다.
+
+        매크로는 등록할 때 컴파일되므로 잘못된 매크로는 여기서 PlanError 를 발생시킵니다.
+        """
+        if name in self.jobs:
+            raise ValueError(f"job '{name}' already exists")
+        job = ExecutionJob(name, None, None)
+        job.engine = MacroEngine(
+            input_backend=self.input_backend,
+            on_step=lambda idx, hwnd: self.step_done(job, idx, hwnd),
+            on_finished=lambda: self.job_done(job),
+            desktop=self.desktop,
+            target_pid=target_pid,
+            masker=self.masker,
+            profiler=self.profiler,
+        )
+        job.plan = job.engine.compile(click_data_list)
+        self.jobs[name] = job
+        return job
+
+    def add_per_instance(self, click_data_list, program):
+        """program 을 실행 중인 인스턴스마다 같은 매크로를 하나씩 등록합니다."""
+        plan = compile_plan(click_data_list, self.desktop.template_store)
+        jobs = []
+        for pid in self.desktop.process_ids(program):
+            jobs.append(self.add(f"{program}:{pid}", plan, pid))
+        return jobs
+
+    def step_done(self, job, idx, hwnd):
+        job.progress = idx
+        if self.on_progress is not None:
+            self.on_progress(job.name, idx, hwnd)
+
+    def job_done(self, job):
+        if self.on_finished is not None:
+            self.on_finished(job.name)
+
+    def start(self, name=None):
+        """등록된 매크로를 시작합니다. name 을 주지 않으면 아직 실행 중이 아닌 모든 매크로를 시작합니다."""
+        with self.lock:
+            for job in self.select(name):
+                if not job.running:
+                    job.thread = job.engine.start(job.plan)
+
+    def stop(self, name=None):
+        """매크로를 중지합니다. name 을 주지 않으면 모두 중지합니다."""
+        for job in self.select(name):
+            job.engine.stop()
+
+    def wait(self, timeout=None):
+        """모든 매크로가 끝날 때까지 기다립니다. 모두 끝났으면 True 를 반환합니다."""
+        for job in list(self.jobs.values()):
+            if job.thread is not None:
+                job.thread.join(timeout)
+        return not any(job.running for job in self.jobs.values())
+
+    def select(self, name):
+        if name is None:
+            return list(self.jobs.values())
+        return [self.jobs[name]]
+
+    @property
+    def running(self):
+        return any(job.running for job in self.jobs.values())
+
+    def results(self):
+        """매크로별 단계 결과를 {name: [StepResult, ...]} 로 반환합니다."""
+        return {name: job.results for name, job in self.jobs.items()}
+
+
+if __name__ == "__main__":
+    # 같은 프로그램 인스턴스 4개에 같은 매크로를 동시에 실행해 봅니다. (리눅스, 가짜 백엔드)
+    import time
+
+    from capture import MemoryFrameSource
+    from process_cache import ProcessNameCache, StubProcessProvider
+    from window_index import FakeWindowBackend
+    from window_watcher import ScriptedEventSource
+
+    class RecordingInput:
+        """보낸 입력의 대상 hwnd 를 기록만 하는 입력 백엔드입니다."""
+
+        def __init__(self):
+            self.clicks = []
+            self.lock = threading.Lock()
+
+        def send_click(self, hwnd, x, y, click_type, menu=False):
+            with self.lock:
+                self.clicks.append(hwnd)
+
+        def send_drag(self, hwnd, x, y, end_x, end_y, menu=False):
+            with self.lock:
+                self.clicks.append(hwnd)
+
+        def send_keys(self, hwnd, keys):
+            with self.lock:
+                self.clicks.append(hwnd)
+
+        def move_cursor_before_click(self):
+            pass
+
+        def scroll_window(self, hwnd):
+            pass
+
+    backend = FakeWindowBackend()
+    instances = 4
+    steps = 5
+    delay = 0.2  # 각 단계의 대화상자가 늦게 뜨는 시간
+    for pid in range(100, 100 + instances):
+        backend.processes[pid] = "MidasGen.exe"
+        backend.add_window(0, "MidasMain", "MIDAS", pid)
+
+    def open_dialog(pid, step):
+        return lambda: backend.add_window(0, "#32770", f"Step {step}", pid)
+
+    script = []
+    for step in range(steps):
+        for i, pid in enumerate(range(100, 100 + instances)):
+            script.append((delay if i == 0 else 0, "create", open_dialog(pid, step)))
+
+    click_data_list = [
+        {
+            "window_class": "#32770",
+            "window_text": f"Step {step}",
+            "window_title": f"Step {step}",
+            "depth": 1,
+            "program": "MidasGen.exe",
+            "x": 10,
+            "y": 10,
+            "hwnd_timeout": 5,
+        }
+        for step in range(steps)
+    ]
+
+    desktop = Desktop(
+        backend,
+        MemoryFrameSource(),
+        ScriptedEventSource(script),
+        ProcessNameCache(StubProcessProvider()),
+    )
+    input_backend = RecordingInput()
+    manager = ExecutionManager(desktop, input_backend)
+    manager.add_per_instance(click_data_list, "MidasGen.exe")
+    start = time.perf_counter()
+    manager.start()
+    manager.wait()
+    elapsed = time.perf_counter() - start
+    clicked = sum(
+        result.status == "clicked"
+        for results in manager.results().values()
+        for result in results
+    )
+    print(
+        f"{len(manager.jobs)} instances x {steps} steps: "
+        f"{clicked} clicks in {elapsed:.2f} s"
+    )
+    print(f"Clicked hwnds are distinct per instance: {len(set(input_backend.clicks))}")
+    print(f"Window snapshots built: {desktop.snapshots_built}")
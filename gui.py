@@ -1,19 +1,20 @@
 import sys
 import os
 import shutil
-import threading  # 스레딩을 위해
-import time  # 지연을 위해
-import win32gui
-import win32process
-import win32con
-import win32api  # 메시지 전송을 위해
-import psutil
-import json  # JSON 저장 및 불러오기를 위해
+import threading
+from itertools import islice
+
+from startup import ImportTimer, warm_up
+
+# 시작 시간 측정. PyQt5 임포트부터 포함하도록 가장 먼저 시작
+# (cv2, numpy, pynput, win32gui 등 무거운 모듈은 창을 띄운 뒤에 불러옴)
+import_timer = ImportTimer()
+
 from PyQt5.QtWidgets import (
     QApplication,
     QMainWindow,
     QLabel,
-    QListWidget,
+    QListView,
     QPushButton,
     QVBoxLayout,
     QHBoxLayout,
@@ -27,23 +28,32 @@ from PyQt5.QtWidgets import (
     QAbstractItemView,
     QMessageBox,
 )
-from PyQt5.QtCore import Qt, pyqtSignal, QTimer
-from PyQt5.QtGui import QPixmap, QImage
-
-from pynput import mouse  # 마우스 이벤트 감지를 위해
-
-import cv2  # OpenCV를 사용한 이미지 매칭을 위해 추가
-import numpy as np  # 이미지 매칭을 위해 추가
-
-import uuid
-import datetime
+from PyQt5.QtCore import Qt, pyqtSignal, QTimer, QItemSelectionModel
+from PyQt5.QtGui import QImage, QPixmap
+
+from macro_format import iter_macro, save_macro
+from step_model import ClickStepModel
+
+MACRO_FILE_FILTER = "JSON Files (*.json);;Macro Files (*.mlnk);;All Files (*)"
+# 불러온 단계를 모델에 넣는 묶음 크기
+LOAD_CHUNK = 1000
+
+# 재생 속도 선택지 (표시 이름, 배속). 0 은 조건이 허락하는 대로 바로 실행
+REPLAY_SPEEDS = (
+    ("최대 속도 (조건 대기만)", 0.0),
+    ("실시간", 1.0),
+    ("2배속", 2.0),
+    ("4배속", 4.0),
+    ("0.5배속", 0.5),
+)
 
 
 class CustomWindow(QMainWindow):
     # 시그널 정의
     click_signal = pyqtSignal(dict, int)  # 클릭 정보와 hwnd를 함께 전달
+    keys_signal = pyqtSignal(str)  # 직전 단계에 붙일 키 입력
     execution_finished_signal = pyqtSignal()
-    update_image_signal = pyqtSignal(int)
+    preview_frame_signal = pyqtSignal(int, object)  # hwnd 와 줄인 BGRX 배열
     center_item_signal = pyqtSignal(int)
 
     def __init__(self):
@@ -66,7 +76,7 @@ class CustomWindow(QMainWindow):
                 font-size: 16px;
                 color: #000000;
             }
-            QListWidget {
+            QListView {
                 border-radius: 5px;
                 border: 1px solid #000000;
                 background-color: #FFFFFF;
@@ -99,10 +109,15 @@ class CustomWindow(QMainWindow):
         self.image_label.setText("No Image Available")
         main_layout.addWidget(self.image_label)
 
-        # 리스트 위젯
-        self.list_widget = QListWidget(self)
-        self.list_widget.setFixedSize(800, 100)
-        main_layout.addWidget(self.list_widget)
+        # 클릭 단계 목록 (모델/뷰, 여러 행 선택 가능)
+        self.step_model = ClickStepModel(self)
+        self.list_view = QListView(self)
+        self.list_view.setModel(self.step_model)
+        # 모든 행의 높이가 같으므로 뷰가 행마다 크기를 묻지 않도록 함
+        self.list_view.setUniformItemSizes(True)
+        self.list_view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.list_view.setFixedSize(800, 100)
+        main_layout.addWidget(self.list_view)
 
         # 버튼 레이아웃
         button_layout_top = QHBoxLayout()
@@ -146,6 +161,17 @@ class CustomWindow(QMainWindow):
         load_button.clicked.connect(self.load_click_data)  # 불러오기 버튼 연결
         button_layout_bottom.addWidget(load_button)
 
+        # 재생 속도 (녹화된 단계 간격 사용 여부와 배속)
+        self.speed_combo = QComboBox(self)
+        for label, speed in REPLAY_SPEEDS:
+            self.speed_combo.addItem(label, speed)
+        button_layout_bottom.addWidget(self.speed_combo)
+
+        # 실행 중 대상 윈도우 가리기
+        self.mask_checkbox = QCheckBox("실행 중 대상 창 가리기", self)
+        button_layout_bottom.addWidget(self.mask_checkbox)
+        self.overlay_manager = None
+
         # 실행 버튼
         self.execute_button = QPushButton("실행", self)
         self.execute_button.clicked.connect(self.toggle_execution)
@@ -163,15 +189,48 @@ class CustomWindow(QMainWindow):
         self.hwnd = int(self.winId())
         self.excluded_hwnds = [self.hwnd]
 
-        # 클릭 데이터 리스트
-        self.click_data_list = []
+        # 실행 엔진 (hwnd 검색, 이미지 매칭, 대기, 클릭 전송은 Qt 없이 엔진이 담당)
+        # 녹화나 실행을 시작할 때 처음 만듭니다.
+        self.engine = None
+        self.engine_lock = threading.Lock()
+        # 미리보기는 작업 스레드에서 캡처하고 줄임 (엔진과 함께 만듦)
+        self.preview = None
 
         # 시그널 연결
         self.click_signal.connect(self.handle_click_signal)
+        self.keys_signal.connect(self.handle_keys_signal)
         self.execution_finished_signal.connect(self.on_execution_finished)
-        self.update_image_signal.connect(self.on_update_image)
+        self.preview_frame_signal.connect(self.on_preview_frame)
         self.center_item_signal.connect(self.center_list_widget_on_item)
 
+    def get_engine(self):
+        """실행 엔진을 반환합니다. 처음 호출할 때 무거운 모듈을 불러와 만듭니다."""
+        with self.engine_lock:
+            if self.engine is None:
+                from macro_engine import MacroEngine
+
+                self.engine = MacroEngine(
+                    on_step=self.on_engine_step,
+                    on_finished=self.execution_finished_signal.emit,
+                )
+                from preview import PreviewRenderer
+
+                size = self.image_label.size()
+                self.preview = PreviewRenderer(
+                    self.engine.capture_engine,
+                    self.preview_frame_signal.emit,
+                    (size.width(), size.height()),
+                ).start()
+            return self.engine
+
+    def get_overlay_manager(self):
+        """오버레이 관리자를 반환합니다. 처음 호출할 때 메시지 루프 스레드를 시작합니다."""
+        if self.overlay_manager is None:
+            from overlay import OverlayManager
+
+            self.overlay_manager = OverlayManager().start()
+        return self.overlay_manager
+
     def toggle_recording(self):
         """녹화 상태를 토글하고 UI를 업데이트합니다."""
         if self.is_recording:
@@ -182,6 +241,14 @@ class CustomWindow(QMainWindow):
             )
             if hasattr(self, "mouse_listener"):
                 self.mouse_listener.stop()
+            if hasattr(self, "keyboard_listener"):
+                self.keyboard_listener.stop()
+            if hasattr(self, "recorder"):
+                from recorder import log as recorder_log
+
+                # 남은 이벤트를 처리한 뒤 멈춤
+                self.recorder.stop()
+                recorder_log.info("%s", self.recorder.summary())
         else:
             # 녹화 시작 전에 기존 데이터가 있는지 확인
             if self.click_data_list:
@@ -190,8 +257,7 @@ class CustomWindow(QMainWindow):
                 )
                 if reply == "예":
                     # 기존 데이터 삭제
-                    self.click_data_list.clear()
-                    self.list_widget.clear()
+                    self.step_model.clear()
                 else:
                     # 녹화 시작하지 않음
                     return
@@ -202,6 +268,8 @@ class CustomWindow(QMainWindow):
             self.record_button.setStyleSheet(
                 "background-color: #000000; color: #FFFFFF; border: 2px solid #000000;"
             )
+            # 녹화 스레드에서 엔진을 만들지 않도록 미리 준비
+            self.get_engine()
             self.start_listening_for_clicks()
         self.is_recording = not self.is_recording
 
@@ -292,19 +360,18 @@ class CustomWindow(QMainWindow):
         dialog.exec_()
 
     def save_click_data(self):
-        """기록된 클릭 데이터를 JSON 파일로 저장합니다."""
+        """기록된 클릭 데이터를 JSON 또는 바이너리(.mlnk) 파일로 저장합니다."""
         if not self.click_data_list:
             self.show_custom_message("저장", "저장할 데이터가 없습니다.")
             return
 
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getSaveFileName(
-            self, "파일 저장", "", "JSON Files (*.json);;All Files (*)", options=options
+            self, "파일 저장", "", MACRO_FILE_FILTER, options=options
         )
         if file_name:
             try:
-                with open(file_name, "w", encoding="utf-8") as f:
-                    json.dump(self.click_data_list, f, ensure_ascii=False, indent=4)
+                save_macro(file_name, self.click_data_list)
                 self.show_custom_message("저장 완료", "데이터가 저장되었습니다.")
             except Exception as e:
                 self.show_custom_message(
@@ -312,168 +379,141 @@ class CustomWindow(QMainWindow):
                 )
 
     def load_click_data(self):
-        """JSON 파일에서 클릭 데이터를 불러와 기존 데이터를 대체합니다."""
+        """JSON 또는 바이너리(.mlnk) 파일에서 클릭 데이터를 불러와 기존 데이터를 대체합니다."""
         options = QFileDialog.Options()
         file_name, _ = QFileDialog.getOpenFileName(
-            self, "파일 열기", "", "JSON Files (*.json);;All Files (*)", options=options
+            self, "파일 열기", "", MACRO_FILE_FILTER, options=options
         )
         if file_name:
+            previous = self.step_model.steps
             try:
-                with open(file_name, "r", encoding="utf-8") as f:
-                    loaded_data = json.load(f)
-                # 기존 데이터 대체
-                self.click_data_list = loaded_data
-                # 리스트 위젯 업데이트
-                self.list_widget.clear()
-                for click_info in self.click_data_list:
-                    summary = self.create_summary(click_info)
-                    self.list_widget.addItem(summary)
+                # 읽는 대로 묶음 단위로 모델에 넣음 (요약은 뷰가 보이는 행을 그릴 때만 만들어짐)
+                self.step_model.clear()
+                steps = iter_macro(file_name)
+                while True:
+                    chunk = list(islice(steps, LOAD_CHUNK))
+                    if not chunk:
+                        break
+                    self.step_model.insert(len(self.step_model.steps), chunk)
+                # 매크로가 참조하는 템플릿을 백그라운드에서 미리 디코딩
+                from template_store import referenced_image_paths
+
+                self.get_engine().template_store.preload(
+                    referenced_image_paths(self.click_data_list)
+                )
                 self.show_custom_message("불러오기 완료", "데이터가 불러와졌습니다.")
             except Exception as e:
+                # 실패하면 기존 데이터로 되돌림
+                self.step_model.set_steps(previous)
                 self.show_custom_message(
                     "불러오기 실패", f"데이터 불러오기 중 오류가 발생했습니다:\n{e}"
                 )
 
     def start_listening_for_clicks(self):
-        """마우스 클릭 이벤트 리스너를 시작합니다."""
-        self.mouse_listener = mouse.Listener(on_click=self.on_click)
-        self.mouse_listener.start()
+        """마우스 클릭 이벤트 리스너를 시작합니다.
 
-    def on_click(self, x, y, button, pressed):
-        """마우스 클릭 이벤트를 처리합니다."""
-        if self.is_recording and pressed:
-            hwnd = win32gui.WindowFromPoint((x, y))
-            # 자신의 GUI나 설정 다이얼로그에서의 클릭은 무시
-            if hwnd in self.excluded_hwnds:
-                return
-            self.record_click(hwnd, button, x, y)
-
-    def record_click(self, hwnd, button, x, y):
-        """클릭 정보를 기록하고 리스트에 추가합니다."""
-        # 상대 좌표 계산
-        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-        relative_x = x - left
-        relative_y = y - top
-
-        # 클릭 타입 설정
-        click_type = "Click" if button == mouse.Button.left else "Right Click"
-        window_class = win32gui.GetClassName(hwnd)
-        window_text = win32gui.GetWindowText(hwnd)
-        program = self.get_program_name_from_hwnd(hwnd)
-        depth = self.get_window_depth(hwnd)
-        window_title = win32gui.GetWindowText(hwnd)  # 윈도우 창 이름
-
-        # 클릭 정보 딕셔너리 생성 (hwnd는 저장하지 않음)
-        click_info = {
-            "x": relative_x,
-            "y": relative_y,
-            "click_type": click_type,
-            "window_class": window_class,
-            "window_text": window_text,
-            "window_title": window_title,
-            "depth": depth,
-            "program": program,
-            # 추가된 필드 초기화
-            "is_skip": False,
-            "skip_image_path": "",
-            "skip_image_target": {},
-            "is_wait": False,
-            "wait_image_path": "",
-            "wait_image_target": {},
-            "keyboard": "",
-            "is_cursor_move": False,  # <- 추가된 필드
-            # 새로운 필드 추가
-            "is_auto_position": False,
-            "auto_position_path": "",
-            "auto_position_target": {},
-        }
-
-        # 클릭 시그널 발송 (메인 스레드에서 GUI 업데이트)
-        self.click_signal.emit(click_info, hwnd)
+        훅 콜백은 원시 이벤트를 넣기만 하고, 윈도우 정보는 녹화 스레드에서 채웁니다.
+        """
+        from pynput import mouse
+
+        from recorder import ClickRecorder
+
+        from pynput import keyboard
+
+        self.recorder = ClickRecorder(
+            self.get_engine().window_backend,
+            on_click=self.click_signal.emit,
+            on_keys=self.keys_signal.emit,
+            excluded_hwnds=self.excluded_hwnds,
+        ).start()
+        self.mouse_listener = mouse.Listener(on_click=self.recorder.on_mouse_click)
+        self.mouse_listener.start()
+        self.keyboard_listener = keyboard.Listener(on_press=self.recorder.on_key_press)
+        self.keyboard_listener.start()
 
     def handle_click_signal(self, click_info, hwnd):
         """메인 스레드에서 클릭 정보를 처리합니다."""
-        self.click_data_list.append(click_info)
-        summary = self.create_summary(click_info)
-        self.list_widget.addItem(summary)
-        # 이미지 레이블 업데이트
-        self.update_image_label(hwnd)
-
-    def create_summary(self, click_info):
-        """리스트 아이템에 표시할 요약 정보를 생성합니다."""
-        summary = f"({click_info['x']}, {click_info['y']}) {click_info['window_title']} {click_info['program']}"
-        max_length = 80
-        if len(summary) > max_length:
-            summary = summary[: max_length - 3] + "..."
-        return summary
+        self.step_model.append(click_info)
+        # 이미지 레이블 업데이트 (작업 스레드에서 캡처)
+        self.request_preview(hwnd)
+
+    def handle_keys_signal(self, text):
+        """녹화 중 입력한 키를 마지막 단계의 keyboard 에 붙입니다."""
+        if self.click_data_list:
+            click_info = self.click_data_list[-1]
+            click_info["keyboard"] = click_info.get("keyboard", "") + text
+            self.step_model.refresh(len(self.click_data_list) - 1)
+
+    @property
+    def click_data_list(self):
+        """기록된 클릭 단계 목록입니다. (모델이 보관)"""
+        return self.step_model.steps
 
     def get_program_name_from_hwnd(self, hwnd):
         """hwnd로부터 프로그램 이름을 가져옵니다."""
-        _, pid = win32process.GetWindowThreadProcessId(hwnd)
-        try:
-            process = psutil.Process(pid)
-            return process.name()
-        except psutil.NoSuchProcess:
-            return "Unknown"
+        return self.get_engine().get_program_name_from_hwnd(hwnd)
 
     def get_window_depth(self, hwnd):
         """윈도우의 깊이를 계산합니다."""
+        import win32gui
+
         depth = 0
         while hwnd:
             hwnd = win32gui.GetParent(hwnd)
             depth += 1
         return depth
 
-    def move_item_up(self):
-        """선택된 아이템을 위로 이동합니다."""
-        current_row = self.list_widget.currentRow()
-        if current_row > 0:
-            self.click_data_list.insert(
-                current_row - 1, self.click_data_list.pop(current_row)
+    def selected_rows(self):
+        """선택된 행 번호들을 반환합니다."""
+        selected = self.list_view.selectionModel().selectedRows()
+        return sorted(index.row() for index in selected)
+
+    def select_rows(self, rows):
+        """rows 를 선택하고 첫 행을 현재 행으로 합니다."""
+        selection = self.list_view.selectionModel()
+        selection.clearSelection()
+        for row in rows:
+            selection.select(self.step_model.index(row), QItemSelectionModel.Select)
+        if rows:
+            selection.setCurrentIndex(
+                self.step_model.index(rows[0]), QItemSelectionModel.NoUpdate
             )
-            item = self.list_widget.takeItem(current_row)
-            self.list_widget.insertItem(current_row - 1, item)
-            self.list_widget.setCurrentRow(current_row - 1)
+            self.list_view.scrollTo(self.step_model.index(rows[0]))
+
+    def move_item_up(self):
+        """선택된 아이템들을 위로 이동합니다."""
+        rows = self.selected_rows()
+        if rows:
+            self.select_rows(self.step_model.move(rows, -1))
 
     def move_item_down(self):
-        """선택된 아이템을 아래로 이동합니다."""
-        current_row = self.list_widget.currentRow()
-        if current_row < self.list_widget.count() - 1:
-            self.click_data_list.insert(
-                current_row + 1, self.click_data_list.pop(current_row)
-            )
-            item = self.list_widget.takeItem(current_row)
-            self.list_widget.insertItem(current_row + 1, item)
-            self.list_widget.setCurrentRow(current_row + 1)
+        """선택된 아이템들을 아래로 이동합니다."""
+        rows = self.selected_rows()
+        if rows:
+            self.select_rows(self.step_model.move(rows, 1))
 
     def duplicate_item(self):
-        """선택된 아이템을 복제합니다."""
-        current_row = self.list_widget.currentRow()
-        if current_row != -1:
-            self.click_data_list.insert(
-                current_row + 1, self.click_data_list[current_row].copy()
-            )
-            item_text = self.list_widget.item(current_row).text()
-            self.list_widget.insertItem(current_row + 1, item_text)
+        """선택된 아이템들을 복제합니다."""
+        rows = self.selected_rows()
+        if rows:
+            self.select_rows(self.step_model.duplicate(rows))
 
     def delete_item(self):
-        """선택된 아이템을 삭제합니다."""
-        current_row = self.list_widget.currentRow()
-        if current_row != -1:
-            del self.click_data_list[current_row]
-            self.list_widget.takeItem(current_row)
+        """선택된 아이템들을 삭제합니다."""
+        rows = self.selected_rows()
+        if rows:
+            self.step_model.remove(rows)
 
     def open_settings(self):
         """설정 다이얼로그를 엽니다."""
-        current_row = self.list_widget.currentRow()
+        current_row = self.list_view.currentIndex().row()
         if current_row != -1:
             click_info = self.click_data_list[current_row]
             dialog = SettingsDialog(click_info, parent=self)
             dialog_hwnd = int(dialog.winId())
             self.excluded_hwnds.append(dialog_hwnd)
             if dialog.exec_() == QDialog.Accepted:
-                summary = self.create_summary(click_info)
-                self.list_widget.item(current_row).setText(summary)
+                self.step_model.refresh(current_row)
             self.excluded_hwnds.remove(dialog_hwnd)
 
     def toggle_execution(self):
@@ -481,8 +521,20 @@ class CustomWindow(QMainWindow):
         if self.is_executing:
             # 실행 중지
             self.is_executing = False  # 먼저 실행 중지
+            # 대기 중인 스레드를 바로 깨움
+            self.get_engine().stop()
         else:
-            # 실행 시작
+            # 실행 시작 전에 매크로를 검증 (잘못된 단계가 있으면 아무것도 클릭하지 않음)
+            from macro_plan import PlanError
+
+            engine = self.get_engine()
+            try:
+                plan = engine.compile(self.click_data_list)
+            except PlanError as e:
+                self.show_custom_message(
+                    "실행 실패", f"매크로를 실행할 수 없습니다:\n{e}"
+                )
+                return
             if self.is_recording:
                 self.toggle_recording()
             self.execute_button.setText("중지")
@@ -490,9 +542,12 @@ class CustomWindow(QMainWindow):
                 "background-color: #000000; color: #FFFFFF; border: 2px solid #000000;"
             )
             self.is_executing = True
+            engine.speed = self.speed_combo.currentData()
+            engine.masker = None
+            if self.mask_checkbox.isChecked():
+                engine.masker = self.get_overlay_manager()
             # 실행 스레드 시작
-            self.execution_thread = threading.Thread(target=self.execute_clicks)
-            self.execution_thread.start()
+            self.execution_thread = engine.start(plan)
 
     def on_execution_finished(self):
         """실행 완료 후 UI를 업데이트합니다."""
@@ -502,539 +557,31 @@ class CustomWindow(QMainWindow):
             "background-color: #FFFFFF; color: #000000; border: 2px solid #000000;"
         )
 
-    def execute_clicks(self):
-        """기록된 클릭들을 실행합니다."""
-        for idx, click_info in enumerate(self.click_data_list):
-            if not self.is_executing:
-                break
-
-            hwnd = None
-            # 최대 60초 동안 1초 간격으로 hwnd를 찾습니다.
-            max_wait_time = 60
-            waited_time = 0
-            while hwnd is None and waited_time < max_wait_time:
-                hwnd = self.find_matching_hwnd(click_info)
-                if hwnd:
-                    break
-                else:
-                    time.sleep(1)
-                    waited_time += 1
-                    print(f"Waiting for hwnd... {waited_time} seconds elapsed.")
-
-            if hwnd:
-                # is_skip 처리
-                if click_info.get("is_skip"):
-                    should_skip = self.check_skip_condition(click_info)
-                    if should_skip:
-                        print(f"Skipping action at index {idx} due to skip condition.")
-                        continue
-
-                # is_wait 처리
-                if click_info.get("is_wait"):
-                    self.handle_wait_condition(click_info)
-
-                # is_cursor_move 처리
-                if click_info.get("is_cursor_move"):
-                    self.move_cursor_before_click()
-
-                # is_auto_position 처리
-                if click_info.get("is_auto_position"):
-                    success = self.handle_auto_position(click_info)
-                    if not success:
-                        print(f"Auto-position failed at index {idx}, skipping action.")
-                        continue
-
-                self.send_click(hwnd, click_info)
-                self.update_image_signal.emit(hwnd)
-                self.center_item_signal.emit(idx)
-            else:
-                print(
-                    f"Could not find hwnd for click_info: {click_info} after {max_wait_time} seconds."
-                )
-                matching_hwnds = self.find_hwnds_by_class(click_info["window_class"])
-                print(
-                    f"Found {len(matching_hwnds)} hwnds with window_class '{click_info['window_class']}':"
-                )
-                for hwnd_info in matching_hwnds:
-                    print(hwnd_info)
-                    print(
-                        f"Enabled: {hwnd_info['enabled']}, Visible: {hwnd_info['visible']}"
-                    )
-                time.sleep(0.1)
-
-        self.execution_finished_signal.emit()
-
-    def move_cursor_before_click(self):
-        """클릭하기 전에 마우스 커서 위치를 이동합니다."""
-        current_x, current_y = win32api.GetCursorPos()
-        screen_width = win32api.GetSystemMetrics(win32con.SM_CXSCREEN)
-        screen_height = win32api.GetSystemMetrics(win32con.SM_CYSCREEN)
-
-        delta = 20
-
-        new_x = (
-            current_x + delta if current_x + 25 < screen_width else current_x - delta
-        )
-        new_y = (
-            current_y + delta if current_y + 25 < screen_height else current_y - delta
-        )
+    def on_engine_step(self, idx, hwnd):
+        """엔진 스레드에서 클릭 직후 호출됩니다. UI 갱신은 시그널로 넘깁니다."""
+        self.request_preview(hwnd)
+        self.center_item_signal.emit(idx)
 
-        # 새로운 좌표로 마우스 커서 이동
-        win32api.SetCursorPos((new_x, new_y))
-
-    def handle_auto_position(self, click_info):
-        """Auto-position 기능을 처리합니다."""
-        target_info = click_info.get("auto_position_target")
-        image_path = click_info.get("auto_position_path")
-        if not target_info or not image_path:
-            return False
-
-        hwnd = self.find_matching_hwnd(target_info)
-        if not hwnd:
-            print("Auto-position target window not found.")
-            return False
-
-        max_attempts = 10
-        previous_image = None
-
-        for attempt in range(max_attempts):
-            position, similarity = self.find_image_in_window(hwnd, image_path)
-            if similarity >= 0.8:
-                click_info["x"], click_info["y"] = position
-                print(
-                    f"Image found at position {position} with similarity {similarity}"
-                )
-                return True
-            else:
-                # 현재 윈도우 이미지 캡처
-                current_image = self.capture_hwnd_image_pil(hwnd)
-                if previous_image is not None:
-                    # 이미지 비교
-                    difference = self.compare_images(previous_image, current_image)
-                    if difference < 0.01:
-                        print("No more content to scroll, moving to next click.")
-                        return False
-                previous_image = current_image
-
-                # 스크롤 다운
-                self.scroll_window(hwnd)
-                time.sleep(0.5)  # 스크롤 적용 대기
-
-        print("Image not found after scrolling, moving to next click.")
-        return False
-
-    def find_image_in_window(self, hwnd, image_path):
-        """윈도우에서 이미지 매칭을 수행하고 위치와 유사도를 반환합니다."""
-        try:
-            # Convert path to absolute and normalize
-            if not os.path.isabs(image_path):
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                image_path = os.path.join(script_dir, image_path)
-
-            image_path = os.path.normpath(image_path)
-
-            if not os.path.exists(image_path):
-                print(f"Image file not found: {image_path}")
-                return (0, 0), 0
-
-            # Capture window image
-            window_image = self.capture_hwnd_image_pil(hwnd)
-            if window_image is None:
-                print("Failed to capture window image")
-                return (0, 0), 0
-
-            # Convert PIL image to numpy array
-            window_array = np.array(window_image)
-            window_gray = cv2.cvtColor(window_array, cv2.COLOR_RGB2GRAY)
-
-            # Load target image
-            target_gray = cv2.imdecode(
-                np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE
-            )
+    def request_preview(self, hwnd):
+        """hwnd 미리보기를 요청합니다. 캡처와 크기 조정은 작업 스레드에서 합니다."""
+        self.get_engine()
+        self.preview.request(hwnd)
 
-            if target_gray is None:
-                print(f"Failed to load target image: {image_path}")
-                return (0, 0), 0
-
-            # Perform template matching
-            result = cv2.matchTemplate(window_gray, target_gray, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-            h, w = target_gray.shape
-            center_x = max_loc[0] + w // 2
-            center_y = max_loc[1] + h // 2
-
-            return (center_x, center_y), max_val
-
-        except Exception as e:
-            print(f"Error in find_image_in_window: {str(e)}")
-            import traceback
-
-            traceback.print_exc()
-            return (0, 0), 0
-
-    def scroll_window(self, hwnd):
-        """윈도우를 아래로 스크롤합니다."""
-        scroll_amount = -1  # 음수면 아래로 스크롤
-        win32api.PostMessage(hwnd, win32con.WM_MOUSEWHEEL, scroll_amount * 120, 0)
-
-    def compare_images(self, img1, img2):
-        """두 이미지를 비교하고 차이의 백분율을 반환합니다."""
-        arr1 = np.array(img1).astype("float")
-        arr2 = np.array(img2).astype("float")
-        diff = np.abs(arr1 - arr2)
-        mean_diff = np.mean(diff)
-        return mean_diff / 255
-
-    def check_skip_condition(self, click_info):
-        """Skip 조건을 확인합니다."""
-        target_info = click_info.get("skip_image_target")
-        image_path = click_info.get("skip_image_path")
-        if not target_info or not image_path:
-            return False
-
-        hwnd = self.find_matching_hwnd(target_info)
-        if hwnd:
-            # 이미지 매칭 수행
-            similarity = self.compare_window_image_with_target(hwnd, image_path)
-            print(f"Skip condition similarity: {similarity}")
-            if similarity >= 0.99:
-                return True
-        return False
-
-    def handle_wait_condition(self, click_info):
-        """Wait 조건을 처리합니다."""
-        target_info = click_info.get("wait_image_target")
-        image_path = click_info.get("wait_image_path")
-        if not target_info or not image_path:
-            return
-
-        max_wait_time = 300
-        waited_time = 0
-        while waited_time < max_wait_time:
-            hwnd = self.find_matching_hwnd(target_info)
-            if hwnd:
-                similarity = self.compare_window_image_with_target(hwnd, image_path)
-                print(f"Wait condition similarity: {similarity}")
-                if similarity >= 0.99:
-                    break
-            time.sleep(1)
-            waited_time += 1
-            print(f"Waiting for condition... {waited_time} seconds elapsed.")
-
-    def compare_window_image_with_target(self, hwnd, image_path):
-        """윈도우의 이미지 내에서 타겟 이미지를 찾아 유사도를 반환합니다."""
-        try:
-            # 테스트 폴더 생성
-            test_dir = "./test"
-            if not os.path.exists(test_dir):
-                os.makedirs(test_dir)
-
-            # Convert path to absolute and normalize
-            if not os.path.isabs(image_path):
-                script_dir = os.path.dirname(os.path.abspath(__file__))
-                image_path = os.path.join(script_dir, image_path)
-
-            image_path = os.path.normpath(image_path)
-
-            if not os.path.exists(image_path):
-                print(f"Image file not found: {image_path}")
-                return 0
-
-            # Capture window image
-            window_image = self.capture_hwnd_image_pil(hwnd)
-            if window_image is None:
-                print("Failed to capture window image")
-                return 0
-
-            # 현재 시간과 UUID를 조합하여 고유한 파일명 생성
-            timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            unique_id = str(uuid.uuid4())[:8]
-            base_filename = f"{timestamp}_{unique_id}"
-
-            # 윈도우 캡처 이미지 저장
-            window_capture_path = os.path.join(test_dir, f"{base_filename}_window.png")
-            window_image.save(window_capture_path)
-
-            # Convert PIL image to numpy array
-            window_array = np.array(window_image)
-            window_gray = cv2.cvtColor(window_array, cv2.COLOR_RGB2GRAY)
-
-            # Load target image with explicit encoding handling
-            target_gray = cv2.imdecode(
-                np.fromfile(image_path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE
-            )
-
-            if target_gray is None:
-                print(f"Failed to load target image: {image_path}")
-                return 0
-
-            print(f"Window image shape: {window_gray.shape}")
-            print(f"Target image shape: {target_gray.shape}")
-
-            # Perform template matching
-            result = cv2.matchTemplate(window_gray, target_gray, cv2.TM_CCOEFF_NORMED)
-            _, max_val, _, max_loc = cv2.minMaxLoc(result)
-
-            # 매칭 결과 이미지 생성 및 저장
-            result_image = window_array.copy()
-            h, w = target_gray.shape
-            x, y = max_loc
-            cv2.rectangle(result_image, (x, y), (x + w, y + h), (0, 255, 0), 2)
-
-            result_path = os.path.join(test_dir, f"{base_filename}_result.png")
-            cv2.imwrite(result_path, cv2.cvtColor(result_image, cv2.COLOR_RGB2BGR))
-
-            print(f"Saved window capture: {window_capture_path}")
-            print(f"Saved matching result: {result_path}")
-            print(f"Match location: {max_loc}")
-            print(f"Similarity: {max_val:.4f}")
-
-            return max_val
-
-        except Exception as e:
-            print(f"Image comparison error: {str(e)}")
-            import traceback
-
-            traceback.print_exc()
-            return 0
-
-    def find_hwnds_by_class(self, window_class):
-        """주어진 window_class와 일치하는 모든 hwnd의 정보를 반환합니다."""
-        hwnds_info = []
-        all_hwnds = self.get_all_hwnds()
-        for hwnd in all_hwnds:
-            current_window_class = win32gui.GetClassName(hwnd)
-            if current_window_class == window_class:
-                window_text = win32gui.GetWindowText(hwnd)
-                depth = self.get_window_depth(hwnd)
-                program = self.get_program_name_from_hwnd(hwnd)
-                window_title = win32gui.GetWindowText(hwnd)
-                enabled = win32gui.IsWindowEnabled(hwnd)
-                visible = win32gui.IsWindowVisible(hwnd)
-
-                hwnd_info = {
-                    "hwnd": hwnd,
-                    "window_class": current_window_class,
-                    "window_text": window_text,
-                    "window_title": window_title,
-                    "depth": depth,
-                    "program": program,
-                    "enabled": enabled,  # Enabled 상태 추가
-                    "visible": visible,  # Visible 상태 추가
-                }
-                hwnds_info.append(hwnd_info)
-        return hwnds_info
-
-    def find_matching_hwnd(self, click_info):
-        """기록된 정보와 일치하는 hwnd를 찾습니다."""
-        all_hwnds = self.get_all_hwnds()
-        for hwnd in all_hwnds:
-            if not win32gui.IsWindowEnabled(hwnd) or not win32gui.IsWindowVisible(hwnd):
-                continue
-            window_class = win32gui.GetClassName(hwnd)
-            window_text = win32gui.GetWindowText(hwnd)
-            depth = self.get_window_depth(hwnd)
-            program = self.get_program_name_from_hwnd(hwnd)
-            window_title = win32gui.GetWindowText(hwnd)  # 윈도우 창 이름
-
-            if (
-                window_class == click_info["window_class"]
-                and window_text == click_info["window_text"]
-                and window_title == click_info["window_title"]
-                and depth == click_info["depth"]
-                and program == click_info["program"]
-            ):
-                return hwnd
-        return None
-
-    def send_click(self, hwnd, click_info):
-        """지정된 좌표에서 hwnd로 클릭 메시지를 전송합니다."""
-        x = click_info["x"]
-        y = click_info["y"]
-        click_type = click_info["click_type"]
-        window_class = click_info["window_class"]
-
-        if window_class == "#32768":
-            # 메뉴 윈도우의 경우, 화면 좌표 사용
-            left, top, _, _ = win32gui.GetWindowRect(hwnd)
-            screen_x = left + x
-            screen_y = top + y
-
-            # lParam에 화면 좌표를 넣습니다.
-            lParam = win32api.MAKELONG(screen_x, screen_y)
-
-            if click_type == "Click":
-                win32api.PostMessage(
-                    hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, lParam)
-            elif click_type == "Right Click":
-                win32api.PostMessage(
-                    hwnd, win32con.WM_RBUTTONDOWN, win32con.MK_RBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_RBUTTONUP, 0, lParam)
-            elif click_type == "Double Click":
-                win32api.PostMessage(
-                    hwnd, win32con.WM_LBUTTONDBLCLK, win32con.MK_LBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, lParam)
-        else:
-            # 일반 윈도우의 경우, 클라이언트 좌표 사용
-            lParam = win32api.MAKELONG(x, y)
-            if click_type == "Click":
-                # WM_LBUTTONDOWN 및 WM_LBUTTONUP 전송
-                win32api.PostMessage(
-                    hwnd, win32con.WM_LBUTTONDOWN, win32con.MK_LBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, lParam)
-            elif click_type == "Right Click":
-                # WM_RBUTTONDOWN 및 WM_RBUTTONUP 전송
-                win32api.PostMessage(
-                    hwnd, win32con.WM_RBUTTONDOWN, win32con.MK_RBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_RBUTTONUP, 0, lParam)
-            elif click_type == "Double Click":
-                # WM_LBUTTONDBLCLK 및 WM_LBUTTONUP 전송
-                win32api.PostMessage(
-                    hwnd, win32con.WM_LBUTTONDBLCLK, win32con.MK_LBUTTON, lParam
-                )
-                win32api.PostMessage(hwnd, win32con.WM_LBUTTONUP, 0, lParam)
-
-    def get_all_hwnds(self):
-        """현재 세션의 모든 hwnd를 가져옵니다."""
-        hwnds = []
-        win32gui.EnumWindows(self.enum_windows_callback, hwnds)
-        all_hwnds = []
-        for hwnd in hwnds:
-            all_hwnds.append(hwnd)
-            all_hwnds.extend(self.get_all_descendants(hwnd))
-        return all_hwnds
-
-    def enum_windows_callback(self, hwnd, hwnds):
-        """EnumWindows 콜백 함수"""
-        hwnds.append(hwnd)
-
-    def get_all_descendants(self, hwnd):
-        """모든 자식 hwnd를 재귀적으로 가져옵니다."""
-        hwnd_list = []
-        child_hwnds = []
-
-        def callback(child_hwnd, _):
-            child_hwnds.append(child_hwnd)
-
-        win32gui.EnumChildWindows(hwnd, callback, None)
-        for child_hwnd in child_hwnds:
-            hwnd_list.append(child_hwnd)
-            hwnd_list.extend(self.get_all_descendants(child_hwnd))
-        return hwnd_list
-
-    def update_image_label(self, hwnd):
-        """hwnd의 이미지를 image_label에 업데이트합니다."""
-        # hwnd의 이미지를 캡처하여 표시
-        pixmap = self.capture_hwnd_image(hwnd)
-        if pixmap:
-            self.image_label.setPixmap(pixmap)
-        else:
+    def on_preview_frame(self, hwnd, image):
+        """작업 스레드가 줄여 둔 가장 최근 프레임을 image_label에 표시합니다."""
+        if image is None:
             self.image_label.setText("No Image Available")
-
-    def on_update_image(self, hwnd):
-        """update_image_signal 시그널을 처리하여 image_label을 업데이트합니다."""
-        self.update_image_label(hwnd)
-
-    def capture_hwnd_image(self, hwnd):
-        """Windows API를 사용하여 hwnd의 이미지를 캡처합니다."""
-        import win32ui
-        from PIL import Image
-        import io
-
-        # 윈도우 사각형 얻기
-        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-        width = right - left
-        height = bottom - top
-        # 디바이스 컨텍스트 생성
-        hwndDC = win32gui.GetWindowDC(hwnd)
-        mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-        saveDC = mfcDC.CreateCompatibleDC()
-        saveBitMap = win32ui.CreateBitmap()
-        saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-        saveDC.SelectObject(saveBitMap)
-        # BitBlt
-        result = saveDC.BitBlt((0, 0), (width, height), mfcDC, (0, 0), win32con.SRCCOPY)
-        if result == 0:
-            # BitBlt 실패
-            return None
-        # 비트맵 정보를 메모리에 저장
-        bmpinfo = saveBitMap.GetInfo()
-        bmpstr = saveBitMap.GetBitmapBits(True)
-        im = Image.frombuffer(
-            "RGB",
-            (bmpinfo["bmWidth"], bmpinfo["bmHeight"]),
-            bmpstr,
-            "raw",
-            "BGRX",
-            0,
-            1,
-        )
-        # 클린업
-        win32gui.DeleteObject(saveBitMap.GetHandle())
-        saveDC.DeleteDC()
-        mfcDC.DeleteDC()
-        win32gui.ReleaseDC(hwnd, hwndDC)
-        # PIL 이미지를 QPixmap으로 변환
-        buffer = io.BytesIO()
-        im.save(buffer, format="PNG")
-        qt_image = QImage.fromData(buffer.getvalue())
-        pixmap = QPixmap.fromImage(qt_image)
-        # image_label 크기에 맞게 픽스맵 크기 조정
-        pixmap = pixmap.scaled(self.image_label.size(), Qt.KeepAspectRatio)
-        return pixmap
-
-    def capture_hwnd_image_pil(self, hwnd):
-        """hwnd의 이미지를 PIL 이미지로 반환합니다."""
-        import win32ui
-        from PIL import Image
-
-        # 윈도우 사각형 얻기
-        left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-        width = right - left
-        height = bottom - top
-        # 디바이스 컨텍스트 생성
-        hwndDC = win32gui.GetWindowDC(hwnd)
-        mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-        saveDC = mfcDC.CreateCompatibleDC()
-        saveBitMap = win32ui.CreateBitmap()
-        saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-        saveDC.SelectObject(saveBitMap)
-        # BitBlt
-        result = saveDC.BitBlt((0, 0), (width, height), mfcDC, (0, 0), win32con.SRCCOPY)
-        if result == 0:
-            # BitBlt 실패
-            return None
-        # 비트맵 정보를 메모리에 저장
-        bmpinfo = saveBitMap.GetInfo()
-        bmpstr = saveBitMap.GetBitmapBits(True)
-        im = Image.frombuffer(
-            "RGB",
-            (bmpinfo["bmWidth"], bmpinfo["bmHeight"]),
-            bmpstr,
-            "raw",
-            "BGRX",
-            0,
-            1,
-        )
-        # 클린업
-        win32gui.DeleteObject(saveBitMap.GetHandle())
-        saveDC.DeleteDC()
-        mfcDC.DeleteDC()
-        win32gui.ReleaseDC(hwnd, hwndDC)
-        return im
+            return
+        height, width = image.shape[:2]
+        # BGRX == Format_RGB32. fromImage 가 복사하므로 배열은 이 함수 안에서만 쓰임
+        qimage = QImage(image.data, width, height, width * 4, QImage.Format_RGB32)
+        self.image_label.setPixmap(QPixmap.fromImage(qimage))
 
     def center_list_widget_on_item(self, idx):
-        """리스트 위젯을 idx에 해당하는 아이템에 중앙 정렬합니다."""
-        item = self.list_widget.item(idx)
-        self.list_widget.scrollToItem(item, QAbstractItemView.PositionAtCenter)
-        self.list_widget.setCurrentRow(idx)
+        """리스트를 idx에 해당하는 아이템에 중앙 정렬합니다."""
+        index = self.step_model.index(idx)
+        self.list_view.scrollTo(index, QAbstractItemView.PositionAtCenter)
+        self.list_view.setCurrentIndex(index)
 
 
 class SettingsDialog(QDialog):
@@ -1068,6 +615,9 @@ class SettingsDialog(QDialog):
         # 설정 필드들 초기화
         self.click_type = QComboBox(self)
         self.click_type.addItems(["Click", "Double Click", "Right Click"])
+        if "end_x" in click_info:
+            # 드래그는 녹화할 때만 끝 좌표가 생김
+            self.click_type.addItem("Drag")
         self.click_type.setCurrentText(click_info.get("click_type", "Click"))
 
         self.window_class = QLineEdit(self)
@@ -1119,6 +669,11 @@ class SettingsDialog(QDialog):
 
         self.keyboard = QLineEdit(self)
         self.keyboard.setText(click_info.get("keyboard", ""))
+        self.keyboard.setToolTip("특수 키는 {enter}, {tab} 처럼, '{' 문자는 {{ 로 입력")
+
+        self.delay = QLineEdit(self)
+        self.delay.setText(str(click_info.get("delay", 0)))
+        self.delay.setToolTip("직전 단계와의 간격(초). 실시간/배속 재생에서 사용")
 
         self.is_cursor_move = QCheckBox(self)  # <- 추가된 위젯
         self.is_cursor_move.setChecked(click_info.get("is_cursor_move", False))
@@ -1158,6 +713,7 @@ class SettingsDialog(QDialog):
         form_layout.addRow("Wait Image:", self.wait_image)
         form_layout.addRow("Wait Target:", self.wait_target_button)
         form_layout.addRow("Keyboard:", self.keyboard)
+        form_layout.addRow("Delay:", self.delay)
         form_layout.addRow("Cursor Move:", self.is_cursor_move)  # <- 추가된 부분
         form_layout.addRow("Auto Position:", self.is_auto_position)  # <- 추가된 부분
         form_layout.addRow("Auto Position Image:", self.auto_position_image)
@@ -1301,6 +857,8 @@ class SettingsDialog(QDialog):
 
     def select_skip_target(self):
         """Skip Target 선택"""
+        from pynput import mouse
+
         self.hide()
         self.is_selecting_target = True
         self.mouse_listener = mouse.Listener(on_click=self.on_skip_target_click)
@@ -1310,6 +868,8 @@ class SettingsDialog(QDialog):
         if pressed and self.is_selecting_target:
             self.is_selecting_target = False
             self.mouse_listener.stop()
+            import win32gui
+
             hwnd = win32gui.WindowFromPoint((x, y))
             # 자신의 윈도우는 제외
             if hwnd == int(self.winId()) or hwnd == int(self.parent().winId()):
@@ -1338,6 +898,8 @@ class SettingsDialog(QDialog):
 
     def select_wait_target(self):
         """Wait Target 선택"""
+        from pynput import mouse
+
         self.hide()
         self.is_selecting_target = True
         self.mouse_listener = mouse.Listener(on_click=self.on_wait_target_click)
@@ -1347,6 +909,8 @@ class SettingsDialog(QDialog):
         if pressed and self.is_selecting_target:
             self.is_selecting_target = False
             self.mouse_listener.stop()
+            import win32gui
+
             hwnd = win32gui.WindowFromPoint((x, y))
             # 자신의 윈도우는 제외
             if hwnd == int(self.winId()) or hwnd == int(self.parent().winId()):
@@ -1375,6 +939,8 @@ class SettingsDialog(QDialog):
 
     def select_auto_position_target(self):
         """Auto Position Target 선택"""
+        from pynput import mouse
+
         self.hide()
         self.is_selecting_target = True
         self.mouse_listener = mouse.Listener(
@@ -1386,6 +952,8 @@ class SettingsDialog(QDialog):
         if pressed and self.is_selecting_target:
             self.is_selecting_target = False
             self.mouse_listener.stop()
+            import win32gui
+
             hwnd = win32gui.WindowFromPoint((x, y))
             # 자신의 윈도우는 제외
             if hwnd == int(self.winId()) or hwnd == int(self.parent().winId()):
@@ -1437,6 +1005,10 @@ class SettingsDialog(QDialog):
         self.click_info["wait_image_path"] = getattr(self, "wait_image_path", "")
         self.click_info["wait_image_target"] = self.wait_target_info
         self.click_info["keyboard"] = self.keyboard.text()
+        try:
+            self.click_info["delay"] = max(0.0, float(self.delay.text()))
+        except ValueError:
+            self.click_info["delay"] = 0
         self.click_info["is_cursor_move"] = self.is_cursor_move.isChecked()
         self.click_info["is_auto_position"] = self.is_auto_position.isChecked()
         self.click_info["auto_position_path"] = getattr(self, "auto_position_path", "")
@@ -1447,7 +1019,16 @@ class SettingsDialog(QDialog):
 
 # 애플리케이션 실행
 if __name__ == "__main__":
+    from logs import get_logger, setup_logging
+
+    # 실행 스레드의 로그는 큐를 거쳐 리스너 스레드에서 출력 (MIDAS_LINKER_LOG 로 수준 조절)
+    setup_logging()
     app = QApplication(sys.argv)
     window = CustomWindow()
     window.show()
+    get_logger("startup").info(
+        "Window shown after %.0f ms", import_timer.elapsed() * 1000
+    )
+    # 창을 띄운 뒤 무거운 모듈을 백그라운드에서 미리 불러옴
+    QTimer.singleShot(0, lambda: warm_up(import_timer))
     sys.exit(app.exec_())
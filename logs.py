@@ -0,0 +1,283 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+# 모든 서브시스템 로거의 부모. get_logger("match") -> "midas_linker.match"
+ROOT = "midas_linker"
+SUBSYSTEMS = (
+    "engine",
+    "hwnd",
+    "match",
+    "wait",
+    "overlay",
+    "recorder",
+    "preview",
+    "template",
+    "diagnostics",
+    "startup",
+)
+# 같은 메시지 틀은 이 간격(초)에 한 번만 내보냄
+RATE_LIMIT_SECONDS = 5.0
+
+# LogRecord 의 기본 속성. 나머지는 extra= 로 넘긴 필드라서 JSON 에 그대로 넣음
+STANDARD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {
+    "message",
+    "asctime",
+    "template",
+}
+
+listener = None
+
+
+def get_logger(subsystem):
+    """서브시스템 로거를 반환합니다."""
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+def parse_levels(spec):
+    """"info,match=debug,wait=warning" 을 {서브시스템: 수준} 으로 바꿉니다. 기본 수준의 키는 "" 입니다.
+
+    잘못된 수준 이름은 ValueError 입니다.
+    """
+    levels = {}
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        subsystem, _, name = item.rpartition("=")
+        level = logging.getLevelName(name.strip().upper())
+        if not isinstance(level, int):
+            raise ValueError(f"unknown log level '{name}'")
+        levels[subsystem.strip()] = level
+    return levels
+
+
+class RateLimitFilter(logging.Filter):
+    """같은 로거, 같은 메시지 틀의 기록을 interval 초에 한 번만 통과시킵니다.
+
+    "Wait condition similarity: %s" 처럼 인자만 바뀌는 반복 메시지를 줄입니다. 다시 통과할 때
+    그동안 버린 개수를 record.suppressed 에 넣습니다. ERROR 이상은 항상 통과합니다.
+    """
+
+    def __init__(self, interval=RATE_LIMIT_SECONDS, clock=time.monotonic):
+        super().__init__()
+        self.interval = interval
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.state = {}  # (로거, 메시지 틀) -> [다음 허용 시각, 버린 개수]
+        self.suppressed = 0
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or self.interval <= 0:
+            return True
+        key = (record.name, getattr(record, "template", record.msg))
+        now = self.clock()
+        with self.lock:
+            state = self.state.get(key)
+            if state is None:
+                self.state[key] = [now + self.interval, 0]
+                return True
+            if now < state[0]:
+                state[1] += 1
+                self.suppressed += 1
+                return False
+            dropped = state[1]
+            state[0] = now + self.interval
+            state[1] = 0
+        if dropped:
+            record.suppressed = dropped
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """기록 하나를 JSON 한 줄로 만듭니다. extra= 로 넘긴 필드도 함께 저장합니다."""
+
+    def format(self, record):
+        entry = {
+            "time": round(record.created, 6),
+            "level": record.levelname,
+            "subsystem": record.name.rpartition(".")[2],
+            "thread": record.threadName,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in STANDARD_ATTRS and key not in entry:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """INFO 이하는 메시지만, WARNING 이상은 수준과 서브시스템을 앞에 붙입니다."""
+
+    def format(self, record):
+        message = record.getMessage()
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar suppressed)"
+        if record.exc_text:
+            message = f"{message}\n{record.exc_text}"
+        if record.levelno >= logging.WARNING:
+            subsystem = record.name.rpartition(".")[2]
+            return f"[{record.levelname} {subsystem}] {message}"
+        return message
+
+
+class PreparedQueueHandler(logging.handlers.QueueHandler):
+    """큐에 넣기 전에 메시지와 예외만 문자열로 만들고 extra 필드는 그대로 둡니다.
+
+    인자를 합치기 전 메시지 틀은 record.template 에 남겨 반복 메시지 제한에 씁니다.
+    """
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.template = record.msg
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+def setup_logging(levels=None, json_path=None, stream=None, rate_interval=None):
+    """로그를 큐 뒤의 리스너 스레드에서 쓰도록 설정합니다. 리스너를 반환합니다.
+
+    로그를 남기는 스레드는 큐에 넣기만 하므로 콘솔이나 파일 I/O 로 막히지 않습니다.
+    levels 는 parse_levels 형식 문자열이며 기본값은 MIDAS_LINKER_LOG (없으면 "info") 입니다.
+    json_path (기본값 MIDAS_LINKER_LOG_JSON) 를 주면 모든 기록을 JSON Lines 로도 저장합니다.
+    반복 메시지 제한은 JSON 저장이 없으면 큐에 넣기 전에, 있으면 콘솔 출력에만 적용합니다.
+    """
+    global listener
+    shutdown_logging()
+    if levels is None:
+        levels = os.environ.get("MIDAS_LINKER_LOG", "info")
+    if json_path is None:
+        json_path = os.environ.get("MIDAS_LINKER_LOG_JSON")
+    levels = parse_levels(levels) if isinstance(levels, str) else dict(levels)
+
+    console = logging.StreamHandler(stream or sys.stdout)
+    # 콘솔 출력은 기존 print 와 같은 모양 (WARNING 이상만 수준 표시)
+    console.setFormatter(ConsoleFormatter())
+    handlers = [console]
+    if json_path:
+        sink = logging.FileHandler(json_path, encoding="utf-8")
+        sink.setFormatter(JsonLinesFormatter())
+        handlers.append(sink)
+
+    # SimpleQueue 는 크기 제한이 없어 put 이 절대 막히지 않음
+    log_queue = queue.SimpleQueue()
+    handler = PreparedQueueHandler(log_queue)
+
+    if rate_interval is None:
+        rate_interval = RATE_LIMIT_SECONDS
+    rate_limit = RateLimitFilter(rate_interval)
+    if json_path:
+        # JSON Lines 에는 모든 기록을 남기므로 반복 메시지 제한은 콘솔에만 적용
+        console.addFilter(rate_limit)
+    else:
+        # 콘솔뿐이면 prepare() 전에 호출한 스레드에서 버려 포맷과 큐 비용도 아낌
+        handler.addFilter(rate_limit)
+
+    root = logging.getLogger(ROOT)
+    for old in list(root.handlers):
+        root.removeHandler(old)
+    root.addHandler(handler)
+    root.propagate = False
+    root.setLevel(levels.pop("", logging.INFO))
+    for subsystem in SUBSYSTEMS:
+        get_logger(subsystem).setLevel(logging.NOTSET)
+    for subsystem, level in levels.items():
+        get_logger(subsystem).setLevel(level)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+    return listener
+
+
+def shutdown_logging():
+    """남은 기록을 모두 쓰고 리스너를 멈춥니다."""
+    global listener
+    if listener is None:
+        return
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+    listener = None
+
+
+atexit.register(shutdown_logging)
+
+
+if __name__ == "__main__":
+    # 느린 콘솔에서 print 와 큐 로깅의 호출 스레드 비용을 비교합니다.
+    import tempfile
+
+    class SlowConsole:
+        """줄마다 write 가 delay 초 걸리는 콘솔입니다. (윈도우 콘솔 창 흉내)"""
+
+        def __init__(self, delay=0.0002):
+            self.delay = delay
+            self.lines = 0
+
+        def write(self, text):
+            time.sleep(self.delay)
+            self.lines += text.count("\n")
+
+        def flush(self):
+            pass
+
+    count = 2000
+    console = SlowConsole()
+    start = time.perf_counter()
+    for i in range(count):
+        print(f"Wait condition similarity: {i / count}", file=console)
+    printed = time.perf_counter() - start
+    print(f"print to slow console:      {printed / count * 1e6:7.1f} us per call")
+
+    def bench(label, json_sink=True, **kwargs):
+        console = SlowConsole()
+        path = os.path.join(tempfile.gettempdir(), "midas_linker_log.jsonl")
+        if os.path.exists(path):
+            os.remove(path)
+        setup_logging(stream=console, json_path=path if json_sink else "", **kwargs)
+        log = get_logger("wait")
+        start = time.perf_counter()
+        for i in range(count):
+            log.info("Wait condition similarity: %s", i / count, extra={"step": 3})
+        elapsed = time.perf_counter() - start
+        shutdown_logging()
+        records = 0
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                records = sum(1 for _ in f)
+        print(
+            f"{label:<27} {elapsed / count * 1e6:7.1f} us per call, "
+            f"{console.lines} console lines, {records} JSON records"
+        )
+        return path
+
+    bench("queue logging, no limit:", rate_interval=0)
+    bench("console only, rate limit:", json_sink=False)
+    path = bench("JSON + console rate limit:")
+    with open(path, encoding="utf-8") as f:
+        print("JSON record:", f.readline().strip())
+
+    setup_logging(levels="info,match=warning", stream=SlowConsole())
+    log = get_logger("match")
+    start = time.perf_counter()
+    for i in range(count * 10):
+        log.debug("Similarity: %.4f", i / count)
+    disabled = time.perf_counter() - start
+    shutdown_logging()
+    print(f"disabled debug call:        {disabled / count / 10 * 1e6:7.2f} us per call")
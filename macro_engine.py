@@ -0,0 +1,876 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from window_index import WindowTreeSnapshot, Win32WindowBackend
+from window_walk import walk_windows
+from process_cache import ProcessNameCache, PsutilProcessProvider
+from window_watcher import WindowWatcher, WinEventSource
+from diagnostics import MatchDiagnostics
+from template_store import TemplateStore
+from macro_plan import MacroPlan, compile_plan
+from matcher import IncrementalMatcher
+from capture import CaptureEngine, GdiFrameSource
+from wait_scheduler import WaitScheduler
+from logs import get_logger
+from profiler import NULL_PROFILER
+
+log = get_logger("engine")
+hwnd_log = get_logger("hwnd")
+match_log = get_logger("match")
+wait_log = get_logger("wait")
+
+# 윈도우 트리 스냅샷을 재사용할 최대 시간(초). 놓친 이벤트에 대비해 찾지 못하면 다시 열거
+SNAPSHOT_MAX_AGE = 1.0
+# 윈도우 이벤트로 스냅샷이 낡았을 때 다시 열거하는 최소 간격(초)
+SNAPSHOT_MIN_INTERVAL = 0.1
+
+# 단계 실행 결과
+CLICKED = "clicked"
+SKIPPED = "skipped"
+NOT_FOUND = "not_found"
+AUTO_POSITION_FAILED = "auto_position_failed"
+CANCELLED = "cancelled"
+FAILED_STATUSES = (NOT_FOUND, AUTO_POSITION_FAILED)
+
+# 재생 속도. 0 이면 녹화된 간격을 무시하고 조건이 허락하는 대로 바로 실행
+SPEED_FAST = 0.0
+SPEED_REALTIME = 1.0
+SPEED_NAMES = {"fast": SPEED_FAST, "realtime": SPEED_REALTIME}
+
+# 드래그할 때 시작과 끝 사이에 보내는 WM_MOUSEMOVE 수
+DRAG_MOVES = 8
+
+# 특수 키 이름 -> win32con 가상 키 이름
+VIRTUAL_KEYS = {
+    "enter": "VK_RETURN",
+    "tab": "VK_TAB",
+    "esc": "VK_ESCAPE",
+    "backspace": "VK_BACK",
+    "delete": "VK_DELETE",
+    "insert": "VK_INSERT",
+    "up": "VK_UP",
+    "down": "VK_DOWN",
+    "left": "VK_LEFT",
+    "right": "VK_RIGHT",
+    "home": "VK_HOME",
+    "end": "VK_END",
+    "page_up": "VK_PRIOR",
+    "page_down": "VK_NEXT",
+}
+
+
+def parse_speed(value):
+    """"fast", "realtime" 또는 배속 숫자를 재생 속도로 바꿉니다. 잘못되면 ValueError 입니다."""
+    if value in SPEED_NAMES:
+        return SPEED_NAMES[value]
+    speed = float(value)
+    if speed <= 0:
+        raise ValueError(f"speed must be positive: {value!r}")
+    return speed
+
+
+class Win32InputBackend:
+    """PostMessage 로 대상 윈도우에 입력을 보냅니다. (포커스가 필요 없습니다)"""
+
+    def __init__(self):
+        import win32api
+        import win32con
+        import win32gui
+
+        self.win32api = win32api
+        self.win32con = win32con
+        self.win32gui = win32gui
+
+    def send_click(self, hwnd, x, y, click_type, menu=False):
+        """지정된 좌표에서 hwnd로 클릭 메시지를 전송합니다. menu 면 화면 좌표를 사용합니다."""
+        if menu:
+            # 메뉴 윈도우의 경우, 화면 좌표 사용
+            left, top, _, _ = self.win32gui.GetWindowRect(hwnd)
+            screen_x = left + x
+            screen_y = top + y
+
+            # lParam에 화면 좌표를 넣습니다.
+            lParam = self.win32api.MAKELONG(screen_x, screen_y)
+
+            if click_type == "Click":
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_LBUTTONDOWN, self.win32con.MK_LBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_LBUTTONUP, 0, lParam)
+            elif click_type == "Right Click":
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_RBUTTONDOWN, self.win32con.MK_RBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_RBUTTONUP, 0, lParam)
+            elif click_type == "Double Click":
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_LBUTTONDBLCLK, self.win32con.MK_LBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_LBUTTONUP, 0, lParam)
+        else:
+            # 일반 윈도우의 경우, 클라이언트 좌표 사용
+            lParam = self.win32api.MAKELONG(x, y)
+            if click_type == "Click":
+                # WM_LBUTTONDOWN 및 WM_LBUTTONUP 전송
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_LBUTTONDOWN, self.win32con.MK_LBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_LBUTTONUP, 0, lParam)
+            elif click_type == "Right Click":
+                # WM_RBUTTONDOWN 및 WM_RBUTTONUP 전송
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_RBUTTONDOWN, self.win32con.MK_RBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_RBUTTONUP, 0, lParam)
+            elif click_type == "Double Click":
+                # WM_LBUTTONDBLCLK 및 WM_LBUTTONUP 전송
+                self.win32api.PostMessage(
+                    hwnd, self.win32con.WM_LBUTTONDBLCLK, self.win32con.MK_LBUTTON, lParam
+                )
+                self.win32api.PostMessage(hwnd, self.win32con.WM_LBUTTONUP, 0, lParam)
+
+    def point_lparam(self, hwnd, x, y, menu):
+        """좌표를 lParam 으로 만듭니다. menu 면 화면 좌표를 사용합니다."""
+        if menu:
+            left, top, _, _ = self.win32gui.GetWindowRect(hwnd)
+            x += left
+            y += top
+        return self.win32api.MAKELONG(x, y)
+
+    def send_drag(self, hwnd, x, y, end_x, end_y, menu=False):
+        """왼쪽 버튼을 누른 채 (x, y) 에서 (end_x, end_y) 로 끄는 메시지를 한 번에 보냅니다."""
+        post = self.win32api.PostMessage
+        con = self.win32con
+        post(hwnd, con.WM_LBUTTONDOWN, con.MK_LBUTTON, self.point_lparam(hwnd, x, y, menu))
+        for i in range(1, DRAG_MOVES + 1):
+            move_x = x + (end_x - x) * i // DRAG_MOVES
+            move_y = y + (end_y - y) * i // DRAG_MOVES
+            lParam = self.point_lparam(hwnd, move_x, move_y, menu)
+            post(hwnd, con.WM_MOUSEMOVE, con.MK_LBUTTON, lParam)
+        post(hwnd, con.WM_LBUTTONUP, 0, self.point_lparam(hwnd, end_x, end_y, menu))
+
+    def send_keys(self, hwnd, keys):
+        """키 입력을 메시지로 만든 뒤 중간에 쉬지 않고 한 번에 보냅니다.
+
+        keys 는 macro_plan.parse_keys 결과입니다. 문자는 WM_CHAR, 특수 키는 WM_KEYDOWN/UP 입니다.
+        """
+        con = self.win32con
+        messages = []
+        for value, special in keys:
+            if special:
+                vk = getattr(con, VIRTUAL_KEYS.get(value, f"VK_{value.upper()}"))
+                # lParam: 반복 횟수 1, 키를 뗄 때는 이전 상태/전환 비트 설정
+                messages.append((con.WM_KEYDOWN, vk, 1))
+                messages.append((con.WM_KEYUP, vk, 0xC0000001))
+            else:
+                messages.append((con.WM_CHAR, ord(value), 1))
+        post = self.win32api.PostMessage
+        for message, wParam, lParam in messages:
+            post(hwnd, message, wParam, lParam)
+
+    def move_cursor_before_click(self):
+        """클릭하기 전에 마우스 커서 위치를 이동합니다."""
+        current_x, current_y = self.win32api.GetCursorPos()
+        screen_width = self.win32api.GetSystemMetrics(self.win32con.SM_CXSCREEN)
+        screen_height = self.win32api.GetSystemMetrics(self.win32con.SM_CYSCREEN)
+
+        delta = 20
+
+        new_x = (
+            current_x + delta if current_x + 25 < screen_width else current_x - delta
+        )
+        new_y = (
+            current_y + delta if current_y + 25 < screen_height else current_y - delta
+        )
+
+        # 새로운 좌표로 마우스 커서 이동
+        self.win32api.SetCursorPos((new_x, new_y))
+
+    def scroll_window(self, hwnd):
+        """윈도우를 아래로 스크롤합니다."""
+        scroll_amount = -1  # 음수면 아래로 스크롤
+        self.win32api.PostMessage(hwnd, self.win32con.WM_MOUSEWHEEL, scroll_amount * 120, 0)
+
+
+class StepResult:
+    """단계 하나의 실행 결과와 소요 시간입니다."""
+
+    __slots__ = ("index", "status", "started", "duration", "waits")
+
+    def __init__(self, index, status, started, duration, waits):
+        self.index = index
+        self.status = status
+        self.started = started
+        self.duration = duration
+        self.waits = waits
+
+    def to_dict(self):
+        return {
+            "index": self.index,
+            "status": self.status,
+            "started": round(self.started, 6),
+            "duration": round(self.duration, 6),
+            "waits": [
+                {
+                    "label": record.label,
+                    "waited": round(record.waited, 6),
+                    "polls": record.polls,
+                    "outcome": record.outcome,
+                }
+                for record in self.waits
+            ],
+        }
+
+
+class Desktop:
+    """여러 엔진이 함께 쓰는 데스크톱 자원입니다.
+
+    윈도우 트리 스냅샷, 윈도우 알림, 캡처 엔진, 템플릿 캐시를 공유하여 동시에 실행되는
+    매크로들이 같은 열거와 디코딩을 반복하지 않도록 합니다.
+    """
+
+    def __init__(
+        self,
+        window_backend=None,
+        frame_source=None,
+        event_source=None,
+        process_cache=None,
+    ):
+        # pid 별 프로그램 이름 캐시 (녹화, 검색, 타겟 선택 모두 공유)
+        if process_cache is None:
+            process_cache = ProcessNameCache(PsutilProcessProvider())
+        self.process_cache = process_cache
+
+        # 윈도우 트리 스냅샷 (hwnd 검색 시 매번 전체를 다시 훑지 않도록 색인)
+        if window_backend is None:
+            window_backend = Win32WindowBackend(self.process_cache)
+        self.window_backend = window_backend
+        self.window_snapshot = None
+        self.snapshot_lock = threading.Lock()
+        self.snapshots_built = 0
+
+        # 윈도우 생성/파괴/이름 변경 알림 (hwnd 대기 시 폴링 대신 사용)
+        self.window_watcher = WindowWatcher(event_source or WinEventSource())
+        self.window_watcher.listeners.append(self.on_window_event)
+        self.watcher_users = 0
+        self.watcher_lock = threading.Lock()
+        # 실행 중인 매크로가 찾는 프로그램 -> 사용자 수. 다른 프로그램의 이벤트는 무시
+        self.watched_programs = {}
+        # 프로그램을 알리지 않은 사용자 수. 0 이 아니면 모든 이벤트를 반영
+        self.unfiltered_users = 0
+        self.events_ignored = 0
+
+        # 이미지 매칭 디버그 이미지 저장 (기본값: 저장하지 않음)
+        self.diagnostics = MatchDiagnostics.from_environment()
+
+        # 템플릿 이미지 캐시 (매 매칭마다 디코딩하지 않도록)
+        self.template_store = TemplateStore()
+
+        # 매칭과 미리보기가 함께 쓰는 캡처 엔진 (같은 크기면 DC/비트맵 재사용)
+        self.capture_engine = CaptureEngine(frame_source or GdiFrameSource())
+
+    def start_watching(self, programs=None):
+        """윈도우 알림을 켭니다. 마지막 사용자가 stop_watching 할 때까지 유지됩니다.
+
+        programs 를 주면 그 프로그램들의 윈도우 이벤트만 스냅샷을 낡게 만듭니다.
+        """
+        with self.watcher_lock:
+            # 알림을 켜지 못하면 (예외) 사용자 수를 늘리지 않음
+            if self.watcher_users == 0:
+                self.window_watcher.start()
+            self.watcher_users += 1
+            if programs is None:
+                self.unfiltered_users += 1
+            else:
+                for program in programs:
+                    count = self.watched_programs.get(program, 0)
+                    self.watched_programs[program] = count + 1
+
+    def stop_watching(self, programs=None):
+        with self.watcher_lock:
+            if programs is None:
+                self.unfiltered_users = max(0, self.unfiltered_users - 1)
+            else:
+                for program in programs:
+                    count = self.watched_programs.get(program, 0) - 1
+                    if count > 0:
+                        self.watched_programs[program] = count
+                    else:
+                        self.watched_programs.pop(program, None)
+            self.watcher_users = max(0, self.watcher_users - 1)
+            if self.watcher_users == 0:
+                self.window_watcher.stop()
+
+    def on_window_event(self, kind, hwnd):
+        """관련 있는 윈도우가 바뀌면 스냅샷을 낡은 것으로 표시합니다.
+
+        바로 버리지 않으므로 이벤트가 많아도 다시 열거하는 것은 검색할 때, 최대
+        SNAPSHOT_MIN_INTERVAL 마다 한 번입니다.
+        """
+        snapshot = self.window_snapshot
+        if snapshot is None or snapshot.dirty:
+            return
+        info = snapshot.by_hwnd.get(hwnd)
+        if info is not None:
+            program = info.program
+        elif kind in ("name", "destroy", "state"):
+            # 색인에 없는 윈도우의 이름, 상태 변경이나 파괴는 검색 결과를 바꾸지 않음
+            self.events_ignored += 1
+            return
+        else:
+            program = self.event_program(hwnd)
+        if (
+            program is not None
+            and not self.unfiltered_users
+            and self.watched_programs
+            and program not in self.watched_programs
+        ):
+            self.events_ignored += 1
+            return
+        snapshot.dirty = True
+
+    def event_program(self, hwnd):
+        """이벤트가 온 윈도우의 프로그램 이름을 반환합니다. 알 수 없으면 None 입니다."""
+        try:
+            backend = self.window_backend
+            return backend.get_process_name(backend.get_process_id(hwnd))
+        except Exception:
+            # 이벤트 직후 사라진 윈도우 등
+            return None
+
+    def refresh_window_snapshot(self, seen=None):
+        """윈도우 트리를 새로 열거하여 스냅샷을 갱신합니다.
+
+        seen 은 호출한 쪽이 본 스냅샷입니다. 그사이 다른 스레드가 새로 만들었으면 그것을 사용합니다.
+        """
+        with self.snapshot_lock:
+            current = self.window_snapshot
+            if (
+                current is not None
+                and current is not seen
+                and current.age() < SNAPSHOT_MAX_AGE
+            ):
+                return current
+            self.window_snapshot = WindowTreeSnapshot(self.window_backend)
+            self.snapshots_built += 1
+            return self.window_snapshot
+
+    def find_matching_hwnd(self, target, pid=None):
+        """Target 과 일치하는 hwnd를 찾습니다. pid 를 주면 그 프로세스에서만 찾습니다."""
+        key = target.key
+        snapshot = self.window_snapshot
+        if snapshot is not None:
+            hwnd = snapshot.lookup_key(key, target.window_title, pid)
+            if hwnd and snapshot.is_still_valid(hwnd):
+                return hwnd
+            age = snapshot.age()
+            if age < SNAPSHOT_MAX_AGE and (
+                not snapshot.dirty or age < SNAPSHOT_MIN_INTERVAL
+            ):
+                # 관련 이벤트가 없었으면 다시 열거해도 같은 결과. 있었어도 간격 제한
+                return None
+        # 스냅샷이 오래됐거나 낡았는데 일치하는 윈도우가 없으면 새로 열거
+        snapshot = self.refresh_window_snapshot(snapshot)
+        return snapshot.lookup_key(key, target.window_title, pid)
+
+    def process_ids(self, program):
+        """program 을 실행 중인 프로세스(인스턴스)의 pid 목록을 반환합니다."""
+        return self.refresh_window_snapshot(self.window_snapshot).process_ids(program)
+
+
+class MacroEngine:
+    """Qt 없이 클릭 매크로를 실행하는 엔진입니다. GUI 와 명령줄 실행기가 함께 사용합니다.
+
+    desktop 을 주면 다른 엔진과 스냅샷과 캡처를 공유하고, target_pid 를 주면 그 프로세스의
+    윈도우만 대상으로 합니다. 백엔드를 주지 않으면 실제 Win32 데스크톱용 백엔드를 사용합니다.
+    """
+
+    def __init__(
+        self,
+        window_backend=None,
+        frame_source=None,
+        event_source=None,
+        input_backend=None,
+        process_cache=None,
+        on_step=None,
+        on_finished=None,
+        desktop=None,
+        target_pid=None,
+        speed=SPEED_FAST,
+        masker=None,
+        profiler=None,
+    ):
+        if desktop is None:
+            desktop = Desktop(window_backend, frame_source, event_source, process_cache)
+        self.desktop = desktop
+        self.target_pid = target_pid
+        # 녹화된 단계 간격을 나눌 배속 (SPEED_FAST 면 간격을 무시)
+        self.speed = speed
+        # 실행 중인 단계의 대상 윈도우를 가리는 오버레이 관리자 (overlay.OverlayManager)
+        self.masker = masker
+        self.masked_hwnd = None
+        # 단계별 구간 기록 (profiler.StepProfiler). 끄면 아무것도 하지 않는 프로파일러
+        self.profiler = profiler or NULL_PROFILER
+        # 세부 구간(capture, match, scroll)을 어느 단계에 넣을지
+        self.current_step = None
+        self.process_cache = desktop.process_cache
+        self.window_backend = desktop.window_backend
+        self.window_watcher = desktop.window_watcher
+        self.template_store = desktop.template_store
+        self.capture_engine = desktop.capture_engine
+        self.diagnostics = desktop.diagnostics
+        self.last_match = None
+
+        # 조건별 직전 매칭 위치 (relative_to: previous_match 검색 영역용)
+        self.previous_matches = {}
+        # 화면이 바뀌지 않았으면 같은 조건의 매칭을 건너뜀
+        self.incremental_matcher = IncrementalMatcher()
+
+        # 동작 직후에는 빠르게, 이후에는 점점 느리게 폴링하는 대기 스케줄러 (엔진별 취소)
+        self.wait_scheduler = WaitScheduler()
+
+        self.input_backend = input_backend or Win32InputBackend()
+
+        # 클릭 후 (idx, hwnd), 실행 완료 후 () 로 호출되는 콜백
+        self.on_step = on_step
+        self.on_finished = on_finished
+
+        self.running = False
+        # stop() 으로 중지를 요청했는지, 실행 스레드를 끝낸 예외
+        self.stop_requested = False
+        self.error = None
+        self.step_results = []
+        self.thread = None
+
+    def compile(self, click_data_list):
+        """click_data_list 를 실행 계획으로 컴파일합니다. 이미 계획이면 그대로 반환합니다."""
+        if isinstance(click_data_list, MacroPlan):
+            return click_data_list
+        return compile_plan(click_data_list, self.template_store)
+
+    def start(self, click_data_list):
+        """별도 스레드에서 실행을 시작합니다.
+
+        매크로가 잘못되었으면 아무것도 클릭하기 전에 호출한 스레드에서 PlanError 가 발생합니다.
+        """
+        plan = self.compile(click_data_list)
+        self.prepare()
+        self.thread = threading.Thread(target=self.execute_in_thread, args=(plan,))
+        self.thread.start()
+        return self.thread
+
+    def run(self, click_data_list):
+        """현재 스레드에서 실행하고 단계별 결과를 반환합니다."""
+        plan = self.compile(click_data_list)
+        self.prepare()
+        return self.execute(plan)
+
+    def prepare(self):
+        self.running = True
+        self.stop_requested = False
+        self.error = None
+        self.wait_scheduler.reset()
+        self.step_results = []
+
+    def stop(self):
+        """실행을 중지하고 대기 중인 스레드를 바로 깨웁니다."""
+        self.stop_requested = True
+        self.running = False
+        self.wait_scheduler.cancel()
+        self.window_watcher.wake()
+
+    def execute_in_thread(self, plan):
+        """실행 스레드의 본체입니다. 단계가 던진 예외는 self.error 에 남깁니다."""
+        try:
+            self.execute(plan)
+        except Exception as e:
+            self.error = e
+            log.exception("Macro execution failed at step %s", self.current_step)
+
+    def execute(self, plan):
+        """컴파일된 실행 계획을 실행합니다."""
+        programs = plan.programs()
+        watching = False
+        run_started = time.monotonic()
+        try:
+            self.desktop.start_watching(programs)
+            watching = True
+            for step in plan:
+                if not self.running:
+                    break
+                started = time.monotonic()
+                first_wait = len(self.wait_scheduler.records)
+                self.current_step = step.index
+                with self.profiler.span("step", step.index):
+                    status = self.execute_step(step)
+                self.step_results.append(
+                    StepResult(
+                        step.index,
+                        status,
+                        started - run_started,
+                        time.monotonic() - started,
+                        self.wait_scheduler.records[first_wait:],
+                    )
+                )
+                if status == CANCELLED:
+                    break
+        finally:
+            # 단계가 예외를 던져도 알림 구독, 오버레이, GUI 상태를 반드시 정리
+            if watching:
+                self.desktop.stop_watching(programs)
+            self.mask_target(None)
+            self.diagnostics.flush()
+            log.info("Process name cache: %s", self.process_cache.stats())
+            log.info("Window snapshots built: %d", self.desktop.snapshots_built)
+            log.info("Image matches: %s", self.incremental_matcher.stats())
+            log.info("Waits: %s", self.wait_scheduler.summary())
+            self.running = False
+            if self.on_finished is not None:
+                self.on_finished()
+        return self.step_results
+
+    def execute_step(self, step):
+        """단계 하나를 실행하고 결과 상태를 반환합니다."""
+        idx = step.index
+        span = self.profiler.span
+        # 기본 최대 60초 동안 윈도우 이벤트가 오거나 폴링 시점마다 hwnd를 찾습니다.
+        with span("lookup", idx):
+            hwnd = self.wait_for_matching_hwnd(
+                step.target, step.hwnd_timeout, f"hwnd {idx}"
+            )
+        if not self.running:
+            return CANCELLED
+
+        if not hwnd:
+            hwnd_log.warning(
+                "Could not find hwnd for step %d: %s after %s seconds.",
+                idx,
+                step.target,
+                step.hwnd_timeout,
+                extra={"step": idx},
+            )
+            if hwnd_log.isEnabledFor(logging.INFO):
+                window_class = step.target.window_class
+                matching_hwnds = self.find_hwnds_by_class(window_class)
+                hwnd_log.info(
+                    "Found %d hwnds with window_class '%s':",
+                    len(matching_hwnds),
+                    window_class,
+                )
+                for hwnd_info in matching_hwnds:
+                    hwnd_log.info(
+                        "%s\nEnabled: %s, Visible: %s",
+                        hwnd_info,
+                        hwnd_info["enabled"],
+                        hwnd_info["visible"],
+                    )
+            time.sleep(0.1)
+            return NOT_FOUND
+
+        # 사용자가 실수로 누르지 않도록 이번 단계의 대상 윈도우를 가림
+        self.mask_target(hwnd)
+
+        # is_skip 처리
+        if step.skip is not None:
+            with span("skip", idx):
+                should_skip = self.check_skip_condition(step.skip)
+            if should_skip:
+                log.info("Skipping action at index %d due to skip condition.", idx)
+                return SKIPPED
+
+        # is_wait 처리
+        if step.wait is not None:
+            with span("wait", idx):
+                self.handle_wait_condition(step.wait, f"wait {idx}")
+            if not self.running:
+                return CANCELLED
+
+        # is_cursor_move 처리
+        if step.cursor_move:
+            with span("cursor_move", idx):
+                self.move_cursor_before_click()
+
+        # is_auto_position 처리 (찾은 위치는 이번 실행에서만 사용)
+        x, y = step.x, step.y
+        if step.auto_position is not None:
+            with span("auto_position", idx):
+                position = self.handle_auto_position(step.auto_position)
+            if position is None:
+                log.info("Auto-position failed at index %d, skipping action.", idx)
+                return AUTO_POSITION_FAILED
+            x, y = position
+
+        # 재생 속도에 맞춰 직전 동작 이후 녹화된 간격만큼 기다림 (조건 대기 시간 포함)
+        if self.speed and step.delay:
+            with span("pace", idx):
+                paced = self.pace(step.delay / self.speed, idx)
+            if not paced:
+                return CANCELLED
+
+        with span("click", idx):
+            if step.end is not None:
+                self.send_drag(hwnd, x, y, step.end[0], step.end[1], step.menu)
+            else:
+                self.send_click(hwnd, x, y, step.click_type, step.menu)
+            if step.keys:
+                self.send_keys(hwnd, step.keys)
+        self.wait_scheduler.mark_action()
+        if self.on_step is not None:
+            with span("preview", idx):
+                self.on_step(idx, hwnd)
+        return CLICKED
+
+    def send_click(self, hwnd, x, y, click_type, menu=False):
+        """지정된 좌표에서 hwnd로 클릭 메시지를 전송합니다."""
+        self.input_backend.send_click(hwnd, x, y, click_type, menu)
+
+    def send_drag(self, hwnd, x, y, end_x, end_y, menu=False):
+        """hwnd 안에서 (x, y) 부터 (end_x, end_y) 까지 드래그합니다."""
+        self.input_backend.send_drag(hwnd, x, y, end_x, end_y, menu)
+
+    def send_keys(self, hwnd, keys):
+        """hwnd로 키 입력을 한 번에 보냅니다."""
+        self.input_backend.send_keys(hwnd, keys)
+
+    def mask_target(self, hwnd):
+        """가린 윈도우를 hwnd 로 바꿉니다. None 이면 가린 윈도우를 모두 드러냅니다."""
+        if self.masker is None or hwnd == self.masked_hwnd:
+            return
+        if self.masked_hwnd is not None:
+            self.masker.unmask(self.masked_hwnd)
+        if hwnd is not None:
+            self.masker.mask(hwnd)
+        self.masked_hwnd = hwnd
+
+    def pace(self, interval, idx):
+        """마지막 동작 후 interval 초가 될 때까지 기다립니다. 취소되면 False 를 반환합니다."""
+        scheduler = self.wait_scheduler
+        start = scheduler.clock.now()
+        remaining = scheduler.last_action + interval - start
+        if remaining <= 0:
+            return True
+        if scheduler.clock.sleep(remaining, scheduler.cancelled):
+            scheduler.finish(f"pace {idx}", start, 0, "cancelled", None)
+            return False
+        scheduler.finish(f"pace {idx}", start, 0, "ok", None)
+        return True
+
+    def move_cursor_before_click(self):
+        """클릭하기 전에 마우스 커서 위치를 이동합니다."""
+        self.input_backend.move_cursor_before_click()
+
+    def scroll_window(self, hwnd):
+        """윈도우를 아래로 스크롤합니다."""
+        self.input_backend.scroll_window(hwnd)
+
+    def get_program_name_from_hwnd(self, hwnd):
+        """hwnd로부터 프로그램 이름을 가져옵니다."""
+        backend = self.window_backend
+        return backend.get_process_name(backend.get_process_id(hwnd))
+
+    def handle_auto_position(self, condition):
+        """Auto-position 기능을 처리합니다. 찾은 클릭 위치를 반환하고, 실패하면 None 을 반환합니다."""
+        hwnd = self.find_matching_hwnd(condition.target)
+        if not hwnd:
+            hwnd_log.warning("Auto-position target window not found.")
+            return None
+
+        max_attempts = 10
+        previous_image = None
+
+        for attempt in range(max_attempts):
+            position, similarity = self.find_image_in_window(hwnd, condition, 0.8)
+            if similarity >= 0.8:
+                match_log.info(
+                    "Image found at position %s with similarity %s", position, similarity
+                )
+                return position
+            else:
+                # 현재 윈도우 이미지 캡처
+                current_frame = self.capture_engine.capture(hwnd)
+                current_image = current_frame.bgrx if current_frame else None
+                if previous_image is not None and current_image is not None:
+                    # 이미지 비교
+                    difference = self.compare_images(previous_image, current_image)
+                    if difference < 0.01:
+                        match_log.info(
+                            "No more content to scroll, moving to next click."
+                        )
+                        return None
+                previous_image = current_image
+
+                # 스크롤 다운
+                with self.profiler.span("scroll", self.current_step):
+                    self.scroll_window(hwnd)
+                    time.sleep(0.5)  # 스크롤 적용 대기
+
+        match_log.info("Image not found after scrolling, moving to next click.")
+        return None
+
+    def find_image_in_window(self, hwnd, condition, threshold=0.8):
+        """윈도우에서 이미지 매칭을 수행하고 위치와 유사도를 반환합니다.
+
+        검색 영역이 있으면 그 영역만 먼저 탐색하고, threshold 미만이면 전체 윈도우를 탐색합니다.
+        """
+        try:
+            # 템플릿은 계획을 컴파일할 때 이미 디코딩됨
+            template = condition.template
+
+            # Capture window image
+            with self.profiler.span("capture", self.current_step):
+                frame = self.capture_engine.capture(hwnd)
+            if frame is None:
+                match_log.warning("Failed to capture window image")
+                return (0, 0), 0
+
+            # 검색 영역 → 전체 윈도우 순서로, 피라미드 탐색 사용
+            with self.profiler.span("match", self.current_step):
+                max_val, max_loc = self.incremental_matcher.match(
+                    (hwnd, condition.path),
+                    frame.gray(),
+                    template,
+                    condition.region,
+                    self.previous_matches.get(condition.path),
+                    threshold,
+                )
+            if max_val >= threshold:
+                self.previous_matches[condition.path] = max_loc
+
+            h, w = template.shape
+            center_x = max_loc[0] + w // 2
+            center_y = max_loc[1] + h // 2
+
+            return (center_x, center_y), max_val
+
+        except Exception as e:
+            match_log.exception("Error in find_image_in_window: %s", e)
+            return (0, 0), 0
+
+    def compare_images(self, img1, img2):
+        """두 이미지를 비교하고 차이의 백분율을 반환합니다."""
+        arr1 = np.array(img1).astype("float")
+        arr2 = np.array(img2).astype("float")
+        diff = np.abs(arr1 - arr2)
+        mean_diff = np.mean(diff)
+        return mean_diff / 255
+
+    def check_skip_condition(self, condition):
+        """Skip 조건을 확인합니다."""
+        hwnd = self.find_matching_hwnd(condition.target)
+        if hwnd:
+            # 이미지 매칭 수행
+            similarity = self.compare_window_image_with_target(hwnd, condition)
+            match_log.debug("Skip condition similarity: %s", similarity)
+            if similarity >= 0.99:
+                return True
+        return False
+
+    def handle_wait_condition(self, condition, label="wait"):
+        """Wait 조건을 처리합니다."""
+        # 검색 영역이 있으면 전체 윈도우 탐색은 몇 번에 한 번만 수행
+        full_search_every = 10
+        polls = 0
+
+        def poll():
+            nonlocal polls
+            polls += 1
+            hwnd = self.find_matching_hwnd(condition.target)
+            if not hwnd:
+                return False
+            similarity = self.compare_window_image_with_target(
+                hwnd, condition, fallback=polls % full_search_every == 1
+            )
+            wait_log.debug("Wait condition similarity: %s", similarity)
+            return similarity >= 0.99
+
+        self.last_match = None
+        if self.wait_scheduler.wait_until(poll, condition.timeout, label):
+            return
+        record = self.wait_scheduler.records[-1]
+        wait_log.info(
+            "Wait condition %s after %.2f seconds.", record.outcome, record.waited
+        )
+
+        # 최종 실패 시에만 마지막 매칭 결과를 저장
+        if record.outcome == "timeout" and self.last_match is not None:
+            self.diagnostics.on_final_failure("wait", *self.last_match)
+
+    def compare_window_image_with_target(
+        self, hwnd, condition, threshold=0.99, fallback=True
+    ):
+        """윈도우의 이미지 내에서 타겟 이미지를 찾아 유사도를 반환합니다.
+
+        검색 영역이 있으면 그 영역만 먼저 탐색하고, fallback 이면 threshold 미만일 때 전체 윈도우를 탐색합니다.
+        """
+        try:
+            # 템플릿은 계획을 컴파일할 때 이미 디코딩됨
+            template = condition.template
+
+            # Capture window image
+            with self.profiler.span("capture", self.current_step):
+                frame = self.capture_engine.capture(hwnd)
+            if frame is None:
+                match_log.warning("Failed to capture window image")
+                return 0
+
+            # Perform template matching
+            with self.profiler.span("match", self.current_step):
+                max_val, max_loc = self.incremental_matcher.match(
+                    (hwnd, condition.path),
+                    frame.gray(),
+                    template,
+                    condition.region,
+                    self.previous_matches.get(condition.path),
+                    threshold,
+                    fallback,
+                )
+            if max_val >= threshold:
+                self.previous_matches[condition.path] = max_loc
+
+            # 디버그 이미지는 진단 수준에 따라 백그라운드에서만 저장
+            self.last_match = (frame.bgrx, template.shape, max_loc, max_val)
+            self.diagnostics.on_match("compare", *self.last_match)
+
+            match_log.debug("Match location: %s, similarity: %.4f", max_loc, max_val)
+
+            return max_val
+
+        except Exception as e:
+            match_log.exception("Image comparison error: %s", e)
+            return 0
+
+    def find_hwnds_by_class(self, window_class):
+        """주어진 window_class와 일치하는 모든 hwnd의 정보를 반환합니다."""
+        snapshot = self.desktop.refresh_window_snapshot(self.desktop.window_snapshot)
+        return [info.to_dict() for info in snapshot.find_by_class(window_class)]
+
+    def wait_for_matching_hwnd(self, target, timeout, label="hwnd"):
+        """일치하는 윈도우가 나타날 때까지 기다립니다. 실행이 중지되면 바로 반환합니다."""
+        hwnd = self.wait_scheduler.wait_until(
+            lambda: self.find_matching_hwnd(target),
+            timeout,
+            label,
+            wait=self.window_watcher.wait_event,
+            token=self.window_watcher.token,
+        )
+        record = self.wait_scheduler.records[-1]
+        if record.waited >= 0.1:
+            hwnd_log.info(
+                "Waited for hwnd %.2f seconds (%s).", record.waited, record.outcome
+            )
+        return hwnd
+
+    def find_matching_hwnd(self, target):
+        """기록된 정보(Target)와 일치하는 hwnd를 찾습니다."""
+        return self.desktop.find_matching_hwnd(target, self.target_pid)
+
+    def get_all_hwnds(self):
+        """현재 세션의 모든 hwnd를 가져옵니다. (각 윈도우는 한 번씩만 포함됩니다)"""
+        return [hwnd for hwnd, _, _ in walk_windows(self.window_backend)]
+
+    def get_all_descendants(self, hwnd):
+        """모든 자손 hwnd를 가져옵니다. EnumChildWindows 가 이미 재귀적으로 열거합니다."""
+        return self.window_backend.child_windows(hwnd)
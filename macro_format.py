@@ -0,0 +1,484 @@
+import copy
+import json
+import struct
+
+# 파일 머리: 매직 4바이트 + 버전 1바이트
+MAGIC = b"MLNK"
+VERSION = 1
+EXTENSION = ".mlnk"
+
+# 레코드 태그. 단계가 처음 쓰는 문자열, 객체, 모양은 그 단계보다 먼저 기록되므로
+# 파일을 앞에서부터 한 번만 읽으며 단계를 하나씩 돌려줄 수 있습니다.
+R_STRING = 0x01  # varint 길이 + UTF-8, 문자열 표에 추가
+R_OBJECT = 0x02  # 태그된 값 하나, 객체 표에 추가 (반복되는 타겟 dict 등)
+R_SHAPE = 0x03  # varint 필드 수 + (키 문자열 번호, 타입 코드) 들, 모양 표에 추가
+R_STEP = 0x04  # varint 모양 번호 + 모양의 struct 에 맞는 고정 길이 값들
+R_VALUE = 0x05  # dict 가 아닌 단계 (varint 객체 번호)
+R_END = 0x0F
+
+# 단계 필드 타입 코드 -> struct 형식
+FIELD_FORMATS = {
+    "n": "B",  # null (0 한 바이트)
+    "b": "?",  # bool
+    "i": "q",  # 64비트 정수
+    "d": "d",  # 실수
+    "s": "I",  # 문자열 표 번호
+    "o": "I",  # 객체 표 번호
+}
+
+# 객체 값 태그
+T_NULL = 0
+T_FALSE = 1
+T_TRUE = 2
+T_INT = 3  # zigzag varint (크기 제한 없음)
+T_FLOAT = 4
+T_STR = 5  # 문자열 표 번호
+T_LIST = 6
+T_DICT = 7
+
+DOUBLE = struct.Struct("<d")
+INT64_MIN = -(1 << 63)
+INT64_MAX = (1 << 63) - 1
+
+
+class MacroFormatError(ValueError):
+    """바이너리 매크로 파일이 손상되었거나 형식이 다를 때 발생합니다."""
+
+
+def write_varint(out, value):
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return
+
+
+def field_type(value):
+    """단계 필드 하나의 타입 코드를 정합니다."""
+    if value is None:
+        return "n"
+    if value is True or value is False:
+        return "b"
+    if isinstance(value, int):
+        return "i" if INT64_MIN <= value <= INT64_MAX else "o"
+    if isinstance(value, float):
+        return "d"
+    if isinstance(value, str):
+        return "s"
+    return "o"
+
+
+class Shape:
+    """같은 키와 같은 값 타입을 가진 단계들의 공통 구조입니다."""
+
+    __slots__ = ("keys", "types", "struct", "strings", "objects", "nulls")
+
+    def __init__(self, keys, types):
+        self.keys = keys
+        self.types = types
+        self.struct = struct.Struct(
+            "<" + "".join(FIELD_FORMATS[code] for code in types)
+        )
+        self.strings = [i for i, code in enumerate(types) if code == "s"]
+        self.objects = [i for i, code in enumerate(types) if code == "o"]
+        self.nulls = [i for i, code in enumerate(types) if code == "n"]
+
+
+class MacroWriter:
+    """단계를 하나씩 바이너리 형식으로 씁니다.
+
+    반복되는 문자열, 타겟 dict 같은 객체, 단계의 키 구성은 처음 한 번만 기록하고 이후에는 번호로 참조합니다.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.strings = {}  # 문자열 -> 번호
+        self.objects = {}  # JSON 텍스트 -> 번호
+        self.shapes = {}  # (키, 타입 코드) -> (번호, Shape)
+        stream.write(MAGIC + bytes([VERSION]))
+
+    def string_ref(self, out, value):
+        index = self.strings.get(value)
+        if index is None:
+            index = self.strings[value] = len(self.strings)
+            data = value.encode("utf-8")
+            out.append(R_STRING)
+            write_varint(out, len(data))
+            out += data
+        return index
+
+    def object_ref(self, out, value):
+        # 1, 1.0, true 와 키 순서를 구분하도록 정렬하지 않은 JSON 텍스트로 비교
+        key = json.dumps(value, ensure_ascii=False)
+        index = self.objects.get(key)
+        if index is None:
+            body = bytearray()
+            self.encode(out, body, value)
+            out.append(R_OBJECT)
+            out += body
+            index = self.objects[key] = len(self.objects)
+        return index
+
+    def shape_ref(self, out, keys, types):
+        entry = self.shapes.get((keys, types))
+        if entry is None:
+            refs = [self.string_ref(out, key) for key in keys]
+            out.append(R_SHAPE)
+            write_varint(out, len(keys))
+            for ref, code in zip(refs, types):
+                write_varint(out, ref)
+                out.append(ord(code))
+            entry = self.shapes[(keys, types)] = (len(self.shapes), Shape(keys, types))
+        return entry
+
+    def write_step(self, click_info):
+        out = bytearray()
+        if not isinstance(click_info, dict) or not all(
+            isinstance(key, str) for key in click_info
+        ):
+            index = self.object_ref(out, click_info)
+            out.append(R_VALUE)
+            write_varint(out, index)
+            self.stream.write(out)
+            return
+
+        keys = tuple(click_info)
+        values = list(click_info.values())
+        types = tuple(field_type(value) for value in values)
+        shape_index, shape = self.shape_ref(out, keys, types)
+        for i in shape.strings:
+            values[i] = self.string_ref(out, values[i])
+        for i in shape.objects:
+            values[i] = self.object_ref(out, values[i])
+        for i in shape.nulls:
+            values[i] = 0
+        out.append(R_STEP)
+        write_varint(out, shape_index)
+        out += shape.struct.pack(*values)
+        self.stream.write(out)
+
+    def close(self):
+        self.stream.write(bytes([R_END]))
+
+    def encode(self, out, body, value):
+        """객체 값을 태그와 함께 body 에 씁니다. 새 문자열 레코드는 out 에 먼저 씁니다."""
+        # bool 은 int 의 하위 타입이므로 먼저 확인
+        if value is None:
+            body.append(T_NULL)
+        elif value is True:
+            body.append(T_TRUE)
+        elif value is False:
+            body.append(T_FALSE)
+        elif isinstance(value, int):
+            body.append(T_INT)
+            write_varint(body, value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif isinstance(value, float):
+            body.append(T_FLOAT)
+            body += DOUBLE.pack(value)
+        elif isinstance(value, str):
+            body.append(T_STR)
+            write_varint(body, self.string_ref(out, value))
+        elif isinstance(value, (list, tuple)):
+            body.append(T_LIST)
+            write_varint(body, len(value))
+            for item in value:
+                self.encode(out, body, item)
+        elif isinstance(value, dict):
+            body.append(T_DICT)
+            write_varint(body, len(value))
+            for key, item in value.items():
+                if not isinstance(key, str):
+                    raise TypeError(
+                        f"dict keys must be strings, not {type(key).__name__}"
+                    )
+                body.append(T_STR)
+                write_varint(body, self.string_ref(out, key))
+                self.encode(out, body, item)
+        else:
+            raise TypeError(f"cannot encode {type(value).__name__}")
+
+
+def copier(value):
+    """공유된 객체를 단계마다 따로 쓰도록 복사하는 함수를 고릅니다."""
+    if isinstance(value, dict):
+        if all(not isinstance(item, (dict, list)) for item in value.values()):
+            return value.copy
+    elif isinstance(value, list):
+        if all(not isinstance(item, (dict, list)) for item in value):
+            return value.copy
+    else:
+        return lambda: value
+    return lambda: copy.deepcopy(value)
+
+
+class MacroReader:
+    """바이너리 매크로를 스트리밍으로 읽습니다. 파일 전체를 메모리에 올리지 않습니다."""
+
+    def __init__(self, stream, chunk_size=256 * 1024):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buffer = b""
+        self.pos = 0
+        self.strings = []
+        self.objects = []  # 복사 함수 목록
+        self.shapes = []
+        header = self.read(len(MAGIC) + 1)
+        if header[: len(MAGIC)] != MAGIC:
+            raise MacroFormatError("not a binary macro file")
+        if header[-1] != VERSION:
+            raise MacroFormatError(f"unsupported version {header[-1]}")
+
+    def fill(self, size):
+        """버퍼에 적어도 size 바이트가 남도록 채웁니다."""
+        while len(self.buffer) - self.pos < size:
+            chunk = self.stream.read(max(self.chunk_size, size))
+            if not chunk:
+                raise MacroFormatError("unexpected end of file")
+            self.buffer = self.buffer[self.pos :] + chunk
+            self.pos = 0
+
+    def read(self, size):
+        self.fill(size)
+        data = self.buffer[self.pos : self.pos + size]
+        self.pos += size
+        return data
+
+    def read_byte(self):
+        if self.pos >= len(self.buffer):
+            self.fill(1)
+        byte = self.buffer[self.pos]
+        self.pos += 1
+        return byte
+
+    def read_varint(self):
+        shift = 0
+        value = 0
+        while True:
+            byte = self.read_byte()
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+
+    def string(self, index):
+        if index >= len(self.strings):
+            raise MacroFormatError(f"unknown string {index}")
+        return self.strings[index]
+
+    def decode(self):
+        """태그된 객체 값을 하나 읽습니다."""
+        tag = self.read_byte()
+        if tag == T_STR:
+            return self.string(self.read_varint())
+        if tag == T_DICT:
+            result = {}
+            for _ in range(self.read_varint()):
+                if self.read_byte() != T_STR:
+                    raise MacroFormatError("dict key is not a string")
+                key = self.string(self.read_varint())
+                result[key] = self.decode()
+            return result
+        if tag == T_INT:
+            raw = self.read_varint()
+            return raw >> 1 if not raw & 1 else -((raw + 1) >> 1)
+        if tag == T_TRUE:
+            return True
+        if tag == T_FALSE:
+            return False
+        if tag == T_NULL:
+            return None
+        if tag == T_FLOAT:
+            return DOUBLE.unpack(self.read(8))[0]
+        if tag == T_LIST:
+            return [self.decode() for _ in range(self.read_varint())]
+        raise MacroFormatError(f"unknown value tag {tag:#x}")
+
+    def read_step(self, shape):
+        size = shape.struct.size
+        if len(self.buffer) - self.pos < size:
+            self.fill(size)
+        values = list(shape.struct.unpack_from(self.buffer, self.pos))
+        self.pos += size
+        try:
+            for i in shape.strings:
+                values[i] = self.strings[values[i]]
+            for i in shape.objects:
+                values[i] = self.objects[values[i]]()
+        except IndexError:
+            raise MacroFormatError("step refers to an unknown string or object")
+        for i in shape.nulls:
+            values[i] = None
+        return dict(zip(shape.keys, values))
+
+    def __iter__(self):
+        while True:
+            record = self.read_byte()
+            if record == R_STEP:
+                index = self.read_varint()
+                if index >= len(self.shapes):
+                    raise MacroFormatError(f"unknown shape {index}")
+                yield self.read_step(self.shapes[index])
+            elif record == R_STRING:
+                self.strings.append(self.read(self.read_varint()).decode("utf-8"))
+            elif record == R_OBJECT:
+                self.objects.append(copier(self.decode()))
+            elif record == R_SHAPE:
+                keys = []
+                types = []
+                for _ in range(self.read_varint()):
+                    keys.append(self.string(self.read_varint()))
+                    code = chr(self.read_byte())
+                    if code not in FIELD_FORMATS:
+                        raise MacroFormatError(f"unknown field type {code!r}")
+                    types.append(code)
+                self.shapes.append(Shape(tuple(keys), tuple(types)))
+            elif record == R_VALUE:
+                index = self.read_varint()
+                if index >= len(self.objects):
+                    raise MacroFormatError(f"unknown object {index}")
+                yield self.objects[index]()
+            elif record == R_END:
+                return
+            else:
+                raise MacroFormatError(f"unknown record tag {record:#x}")
+
+
+def is_binary_macro(path):
+    with open(path, "rb") as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def save_binary(path, click_data_list):
+    with open(path, "wb") as f:
+        writer = MacroWriter(f)
+        for click_info in click_data_list:
+            writer.write_step(click_info)
+        writer.close()
+
+
+def iter_macro(path):
+    """매크로 파일의 단계를 하나씩 돌려줍니다. 바이너리면 스트리밍으로, JSON 이면 한 번에 읽습니다."""
+    if is_binary_macro(path):
+        with open(path, "rb") as f:
+            yield from MacroReader(f)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            click_data_list = json.load(f)
+        if not isinstance(click_data_list, list):
+            raise MacroFormatError("macro file must contain a list of clicks")
+        yield from click_data_list
+
+
+def load_macro(path):
+    """JSON 또는 바이너리 매크로 파일을 읽어 click_data_list 를 반환합니다."""
+    return list(iter_macro(path))
+
+
+def save_macro(path, click_data_list):
+    """확장자가 .mlnk 이면 바이너리로, 그 밖에는 기존처럼 JSON 으로 저장합니다."""
+    if path.lower().endswith(EXTENSION):
+        save_binary(path, click_data_list)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(click_data_list, f, ensure_ascii=False, indent=4)
+
+
+def synthetic_recording(steps, seed=0):
+    """녹화와 같은 형식의 긴 매크로를 만듭니다. 벤치마크용입니다."""
+    import random
+
+    rng = random.Random(seed)
+    programs = ["MidasGen.exe", "MidasCivil.exe", "explorer.exe"]
+    windows = [
+        ("#32770", "Load Cases"),
+        ("Button", "OK"),
+        ("Button", "Apply"),
+        ("Edit", ""),
+        ("AfxFrameOrView140u", "MIDAS/Gen"),
+        ("#32768", ""),
+        ("SysListView32", "Section"),
+    ]
+    click_data_list = []
+    for _ in range(steps):
+        window_class, window_text = rng.choice(windows)
+        target = {
+            "window_class": window_class,
+            "window_text": window_text,
+            "window_title": window_text,
+            "depth": rng.randint(1, 4),
+            "program": rng.choice(programs),
+        }
+        is_wait = rng.random() < 0.1
+        click_data_list.append(
+            {
+                "x": rng.randint(0, 1920),
+                "y": rng.randint(0, 1080),
+                "click_type": rng.choice(
+                    ["Click", "Click", "Double Click", "Right Click"]
+                ),
+                "window_class": target["window_class"],
+                "window_text": target["window_text"],
+                "window_title": target["window_title"],
+                "depth": target["depth"],
+                "program": target["program"],
+                "is_skip": False,
+                "skip_image_path": "",
+                "skip_image_target": {},
+                "is_wait": is_wait,
+                "wait_image_path": "images/wait_ok.png" if is_wait else "",
+                "wait_image_target": dict(target) if is_wait else {},
+                "keyboard": "",
+                "is_cursor_move": False,
+                "is_auto_position": False,
+                "auto_position_path": "",
+                "auto_position_target": {},
+            }
+        )
+    return click_data_list
+
+
+if __name__ == "__main__":
+    # 긴 녹화를 JSON 과 바이너리로 저장한 뒤 읽는 시간과 크기를 비교합니다.
+    import os
+    import tempfile
+    import time
+
+    steps = 50000
+    click_data_list = synthetic_recording(steps)
+    # 스키마 밖의 값도 그대로 돌아오는지 확인
+    click_data_list[0]["extra"] = [1, 2.5, None, {"nested": [True, "x"]}, 1 << 70]
+    directory = tempfile.mkdtemp()
+    json_path = os.path.join(directory, "macro.json")
+    binary_path = os.path.join(directory, "macro" + EXTENSION)
+    save_macro(json_path, click_data_list)
+    save_macro(binary_path, click_data_list)
+
+    start = time.perf_counter()
+    with open(json_path, "r", encoding="utf-8") as f:
+        from_json = json.load(f)
+    json_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    from_binary = load_macro(binary_path)
+    binary_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first = next(iter_macro(binary_path))
+    first_time = time.perf_counter() - start
+
+    identical = from_binary == from_json == click_data_list and json.dumps(
+        from_binary
+    ) == json.dumps(from_json)
+    print(f"{steps} steps, round-trip identical: {identical}")
+    print(
+        f"JSON:   {os.path.getsize(json_path) / 1024:8.0f} KiB, "
+        f"load {json_time * 1000:6.0f} ms"
+    )
+    print(
+        f"Binary: {os.path.getsize(binary_path) / 1024:8.0f} KiB, "
+        f"load {binary_time * 1000:6.0f} ms, "
+        f"first step after {first_time * 1000:.2f} ms"
+    )
@@ -0,0 +1,408 @@
+import os
+
+from template_store import resolve_image_path
+from window_index import WindowTreeSnapshot
+
+# 저장된 click_type 값 (소문자 별칭 -> 정식 이름)
+CLICK_TYPES = {
+    "click": "Click",
+    "left": "Click",
+    "double click": "Double Click",
+    "double": "Double Click",
+    "right click": "Right Click",
+    "right": "Right Click",
+    "drag": "Drag",
+}
+# 메뉴 윈도우는 화면 좌표로 클릭
+MENU_WINDOW_CLASS = "#32768"
+
+DEFAULT_HWND_TIMEOUT = 60
+DEFAULT_WAIT_TIMEOUT = 300
+REGION_FIELDS = ("x", "y", "width", "height", "margin")
+
+# keyboard 필드에서 {이름} 으로 쓰는 특수 키 (pynput Key 이름과 같음). 나머지는 문자 그대로
+KEY_NAMES = frozenset(
+    [
+        "enter",
+        "tab",
+        "esc",
+        "backspace",
+        "delete",
+        "insert",
+        "up",
+        "down",
+        "left",
+        "right",
+        "home",
+        "end",
+        "page_up",
+        "page_down",
+    ]
+    + [f"f{number}" for number in range(1, 13)]
+)
+
+
+def parse_keys(text):
+    """keyboard 문자열을 입력 순서대로 (문자 또는 키 이름, 특수 키 여부) 튜플로 나눕니다.
+
+    "{enter}" 같은 이름은 특수 키이고 "{{" 는 "{" 문자입니다. 이 문법 이전에 저장된 매크로는
+    keyboard 를 글자 그대로 저장했으므로, 모르는 이름이나 닫히지 않은 "{" 는 문자 그대로 입력합니다.
+    """
+    keys = []
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char != "{":
+            keys.append((char, False))
+            position += 1
+        elif text.startswith("{{", position):
+            keys.append(("{", False))
+            position += 2
+        else:
+            end = text.find("}", position) + 1
+            name = text[position + 1 : end - 1].lower() if end else None
+            if name in KEY_NAMES:
+                keys.append((name, True))
+                position = end
+            else:
+                # "{" 만 문자로 넣고 나머지는 이어서 나눔
+                keys.append(("{", False))
+                position += 1
+    return tuple(keys)
+
+
+class PlanError(ValueError):
+    """매크로를 실행 계획으로 바꿀 수 없을 때 발생합니다. problems 는 (단계 번호, 메시지) 목록입니다."""
+
+    def __init__(self, problems):
+        self.problems = problems
+        lines = [f"step {index}: {message}" for index, message in problems]
+        super().__init__("invalid macro:\n" + "\n".join(lines))
+
+
+class Target:
+    """찾을 윈도우의 정보와 미리 계산된 색인 키입니다."""
+
+    __slots__ = (
+        "program",
+        "window_class",
+        "window_text",
+        "window_title",
+        "depth",
+        "key",
+    )
+
+    def __init__(self, program, window_class, window_text, window_title, depth):
+        self.program = program
+        self.window_class = window_class
+        self.window_text = window_text
+        self.window_title = window_title
+        self.depth = depth
+        self.key = WindowTreeSnapshot.make_key(
+            program, window_class, window_text, depth
+        )
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "key"):
+            raise AttributeError("Target is immutable")
+        object.__setattr__(self, name, value)
+
+    def __repr__(self):
+        return (
+            f"Target({self.program!r}, {self.window_class!r}, "
+            f"{self.window_text!r}, {self.depth})"
+        )
+
+
+class ImageCondition:
+    """skip/wait/auto-position 조건 하나입니다. 템플릿은 컴파일할 때 미리 디코딩됩니다."""
+
+    __slots__ = ("target", "path", "template", "region", "timeout")
+
+    def __init__(self, target, path, template, region, timeout=None):
+        self.target = target
+        self.path = path
+        self.template = template
+        self.region = region
+        self.timeout = timeout
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "timeout"):
+            raise AttributeError("ImageCondition is immutable")
+        object.__setattr__(self, name, value)
+
+
+class Step:
+    """실행 계획의 단계 하나입니다. 실행 중에는 dict 를 다시 읽지 않습니다."""
+
+    __slots__ = (
+        "index",
+        "target",
+        "x",
+        "y",
+        "click_type",
+        "menu",
+        "hwnd_timeout",
+        "skip",
+        "wait",
+        "auto_position",
+        "end",
+        "keys",
+        "delay",
+        "cursor_move",
+    )
+
+    def __init__(
+        self,
+        index,
+        target,
+        x,
+        y,
+        click_type,
+        hwnd_timeout,
+        skip=None,
+        wait=None,
+        auto_position=None,
+        cursor_move=False,
+        end=None,
+        keys=(),
+        delay=0,
+    ):
+        self.index = index
+        self.target = target
+        self.x = x
+        self.y = y
+        self.click_type = click_type
+        self.menu = target.window_class == MENU_WINDOW_CLASS
+        self.hwnd_timeout = hwnd_timeout
+        self.skip = skip
+        self.wait = wait
+        self.auto_position = auto_position
+        # 드래그 끝 좌표 (x, y). 드래그가 아니면 None
+        self.end = end
+        # 클릭 뒤 한 번에 보낼 키 입력 (parse_keys 결과)
+        self.keys = keys
+        # 녹화할 때 직전 단계와의 간격 (초). 재생 속도에 따라 사용
+        self.delay = delay
+        self.cursor_move = cursor_move
+
+    def __setattr__(self, name, value):
+        if hasattr(self, "cursor_move"):
+            raise AttributeError("Step is immutable")
+        object.__setattr__(self, name, value)
+
+    def __repr__(self):
+        return (
+            f"Step({self.index}, {self.click_type!r} "
+            f"at ({self.x}, {self.y}) in {self.target!r})"
+        )
+
+
+class MacroPlan:
+    """검증과 경로 해석, 템플릿 디코딩이 끝난 실행 계획입니다."""
+
+    __slots__ = ("steps",)
+
+    def __init__(self, steps):
+        object.__setattr__(self, "steps", tuple(steps))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("MacroPlan is immutable")
+
+    def __len__(self):
+        return len(self.steps)
+
+    def __iter__(self):
+        return iter(self.steps)
+
+    def __getitem__(self, index):
+        return self.steps[index]
+
+    def template_paths(self):
+        """계획이 사용하는 템플릿의 절대 경로를 중복 없이 반환합니다."""
+        paths = []
+        for step in self.steps:
+            for condition in (step.skip, step.wait, step.auto_position):
+                if condition is not None and condition.path not in paths:
+                    paths.append(condition.path)
+        return paths
+
+    def programs(self):
+        """계획의 단계와 조건이 찾는 윈도우의 프로그램 이름을 중복 없이 반환합니다."""
+        programs = []
+        for step in self.steps:
+            targets = [step.target] + [
+                condition.target
+                for condition in (step.skip, step.wait, step.auto_position)
+                if condition is not None
+            ]
+            for target in targets:
+                if target.program not in programs:
+                    programs.append(target.program)
+        return programs
+
+
+class PlanCompiler:
+    """click_data_list 를 검증하여 MacroPlan 으로 바꿉니다. 문제는 모아서 한 번에 보고합니다."""
+
+    def __init__(self, template_store):
+        self.template_store = template_store
+        self.problems = []
+        self.index = 0
+
+    def problem(self, message):
+        self.problems.append((self.index, message))
+
+    def compile(self, click_data_list):
+        if not isinstance(click_data_list, list):
+            raise PlanError([(-1, "macro must be a list of steps")])
+        steps = []
+        for index, click_info in enumerate(click_data_list):
+            self.index = index
+            if not isinstance(click_info, dict):
+                self.problem("step must be an object")
+                continue
+            step = self.compile_step(index, click_info)
+            if step is not None:
+                steps.append(step)
+        if self.problems:
+            raise PlanError(self.problems)
+        return MacroPlan(steps)
+
+    def compile_step(self, index, click_info):
+        target = self.target(click_info, "")
+        x = self.integer(click_info, "x")
+        y = self.integer(click_info, "y")
+        click_type = self.click_type(click_info.get("click_type", "Click"))
+        hwnd_timeout = self.seconds(click_info, "hwnd_timeout", DEFAULT_HWND_TIMEOUT)
+        delay = self.seconds(click_info, "delay", 0)
+        keys = self.keys(click_info.get("keyboard") or "")
+        end = None
+        if click_type == "Drag":
+            end = (self.integer(click_info, "end_x"), self.integer(click_info, "end_y"))
+            if None in end:
+                return None
+        skip = wait = auto_position = None
+        if click_info.get("is_skip"):
+            skip = self.condition(click_info, "skip_image")
+        if click_info.get("is_wait"):
+            wait = self.condition(
+                click_info,
+                "wait_image",
+                self.seconds(click_info, "wait_timeout", DEFAULT_WAIT_TIMEOUT),
+            )
+        if click_info.get("is_auto_position"):
+            auto_position = self.condition(click_info, "auto_position")
+        if None in (target, x, y, click_type, hwnd_timeout, delay, keys):
+            return None
+        return Step(
+            index,
+            target,
+            x,
+            y,
+            click_type,
+            hwnd_timeout,
+            skip,
+            wait,
+            auto_position,
+            bool(click_info.get("is_cursor_move")),
+            end,
+            keys,
+            delay,
+        )
+
+    def target(self, info, field):
+        """윈도우 정보를 검사하여 Target 을 만듭니다. field 는 오류 메시지용 이름입니다."""
+        prefix = f"{field}." if field else ""
+        if not isinstance(info, dict) or not info:
+            self.problem(f"{field or 'window'} is not set")
+            return None
+        values = []
+        for name in ("program", "window_class", "window_text"):
+            value = info.get(name)
+            if not isinstance(value, str):
+                self.problem(f"{prefix}{name} must be a string")
+                return None
+            values.append(value)
+        window_title = info.get("window_title", values[2])
+        if not isinstance(window_title, str):
+            self.problem(f"{prefix}window_title must be a string")
+            return None
+        depth = self.integer(info, "depth", prefix)
+        if depth is None:
+            return None
+        return Target(values[0], values[1], values[2], window_title, depth)
+
+    def integer(self, info, name, prefix=""):
+        value = info.get(name)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            self.problem(f"{prefix}{name} must be a number")
+            return None
+        if value != int(value):
+            self.problem(f"{prefix}{name} must be a whole number")
+            return None
+        return int(value)
+
+    def seconds(self, info, name, default):
+        value = info.get(name, default)
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+            self.problem(f"{name} must be a non-negative number")
+            return None
+        return value
+
+    def keys(self, value):
+        if not isinstance(value, str):
+            self.problem("keyboard must be a string")
+            return None
+        return parse_keys(value)
+
+    def click_type(self, value):
+        click_type = CLICK_TYPES.get(str(value).strip().lower())
+        if click_type is None:
+            self.problem(f"unknown click_type {value!r}")
+        return click_type
+
+    def condition(self, click_info, prefix, timeout=None):
+        """이미지 조건을 검사하고 템플릿을 미리 디코딩합니다."""
+        target = self.target(click_info.get(f"{prefix}_target"), f"{prefix}_target")
+        image_path = click_info.get(f"{prefix}_path")
+        if not image_path or not isinstance(image_path, str):
+            self.problem(f"{prefix}_path is not set")
+            return None
+        path = resolve_image_path(image_path)
+        if not os.path.isfile(path):
+            self.problem(f"{prefix}_path not found: {path}")
+            return None
+        template = self.template_store.get(path)
+        if template is None:
+            self.problem(f"{prefix}_path could not be decoded: {path}")
+            return None
+        region = self.region(click_info.get(f"{prefix}_region"), f"{prefix}_region")
+        if target is None or region is False:
+            return None
+        return ImageCondition(target, path, template, region, timeout)
+
+    def region(self, region, name):
+        """검색 영역을 검사합니다. 잘못되었으면 False 를 반환합니다."""
+        if not region:
+            return None
+        if not isinstance(region, dict):
+            self.problem(f"{name} must be an object")
+            return False
+        for field in REGION_FIELDS:
+            value = region.get(field)
+            if value is not None and (
+                isinstance(value, bool) or not isinstance(value, (int, float))
+            ):
+                self.problem(f"{name}.{field} must be a number")
+                return False
+        relative_to = region.get("relative_to")
+        if relative_to not in (None, "previous_match"):
+            self.problem(f"{name}.relative_to must be 'previous_match'")
+            return False
+        return dict(region)
+
+
+def compile_plan(click_data_list, template_store):
+    """click_data_list 를 실행 계획으로 컴파일합니다. 잘못된 단계가 있으면 PlanError 를 발생시킵니다."""
+    return PlanCompiler(template_store).compile(click_data_list)
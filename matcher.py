@@ -0,0 +1,315 @@
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from capture import changed_rect, fingerprint
+
+# 이 크기보다 작은 캡처는 피라미드 없이 전체 탐색
+MIN_PYRAMID_PIXELS = 640 * 480
+# 축소한 템플릿의 짧은 변이 이보다 작아지면 더 내려가지 않음
+MIN_TEMPLATE_SIDE = 16
+
+
+def as_levels(template):
+    """Template 객체 또는 그레이스케일 배열에서 피라미드 목록을 얻습니다."""
+    levels = getattr(template, "levels", None)
+    if levels is not None:
+        return levels
+    return [template]
+
+
+def choose_level(window_shape, levels):
+    """탐색을 시작할 피라미드 단계를 고릅니다. 0 이면 전체 해상도 탐색입니다."""
+    if window_shape[0] * window_shape[1] < MIN_PYRAMID_PIXELS:
+        return 0
+    level = 0
+    for i in range(1, len(levels)):
+        th, tw = levels[i].shape[:2]
+        if min(th, tw) < MIN_TEMPLATE_SIDE:
+            break
+        level = i
+    return level
+
+
+def find_peaks(result, count, suppress_w, suppress_h):
+    """결과 맵에서 서로 겹치지 않는 상위 count 개의 후보를 찾습니다."""
+    peaks = []
+    result = result.copy()
+    for _ in range(count):
+        _, max_val, _, max_loc = cv2.minMaxLoc(result)
+        if max_val <= -1.0:
+            break
+        peaks.append(max_loc)
+        x, y = max_loc
+        result[
+            max(0, y - suppress_h) : y + suppress_h + 1,
+            max(0, x - suppress_w) : x + suppress_w + 1,
+        ] = -2.0
+    return peaks
+
+
+def match_exhaustive(window_gray, template_gray):
+    """전체 해상도에서 TM_CCOEFF_NORMED 로 탐색합니다. (max_val, max_loc) 를 반환합니다."""
+    result = cv2.matchTemplate(window_gray, template_gray, cv2.TM_CCOEFF_NORMED)
+    _, max_val, _, max_loc = cv2.minMaxLoc(result)
+    return max_val, max_loc
+
+
+def match_template(window_gray, template, top_k=3):
+    """축소된 피라미드에서 후보를 찾고 전체 해상도에서 후보 주변만 다시 탐색합니다.
+
+    반환값은 match_exhaustive 와 같은 (max_val, max_loc) 입니다.
+    """
+    levels = as_levels(template)
+    template_gray = levels[0]
+    th, tw = template_gray.shape[:2]
+    wh, ww = window_gray.shape[:2]
+    if wh < th or ww < tw:
+        return match_exhaustive(window_gray, template_gray)
+
+    level = choose_level(window_gray.shape, levels)
+    if level == 0:
+        return match_exhaustive(window_gray, template_gray)
+
+    coarse = window_gray
+    for _ in range(level):
+        coarse = cv2.pyrDown(coarse)
+    coarse_template = levels[level]
+    ch, cw = coarse_template.shape[:2]
+    if coarse.shape[0] < ch or coarse.shape[1] < cw:
+        return match_exhaustive(window_gray, template_gray)
+
+    coarse_result = cv2.matchTemplate(coarse, coarse_template, cv2.TM_CCOEFF_NORMED)
+    candidates = find_peaks(coarse_result, top_k, cw // 2, ch // 2)
+
+    scale = 1 << level
+    margin = 2 * scale
+    best_val, best_loc = -1.0, (0, 0)
+    for cx, cy in candidates:
+        x0 = max(0, cx * scale - margin)
+        y0 = max(0, cy * scale - margin)
+        x1 = min(ww - tw, cx * scale + margin)
+        y1 = min(wh - th, cy * scale + margin)
+        if x1 < x0 or y1 < y0:
+            continue
+        region = window_gray[y0 : y1 + th, x0 : x1 + tw]
+        max_val, (lx, ly) = match_exhaustive(region, template_gray)
+        if max_val > best_val:
+            best_val, best_loc = max_val, (x0 + lx, y0 + ly)
+    return best_val, best_loc
+
+
+def crop_region(window_shape, region, template_shape, previous_loc=None):
+    """매크로 JSON 의 검색 영역을 (x0, y0, x1, y1) 로 계산합니다. 사용할 수 없으면 None 을 반환합니다.
+
+    region 예: {"x": 100, "y": 40, "width": 300, "height": 120, "margin": 20}
+    "relative_to": "previous_match" 이면 x, y 는 같은 조건의 직전 매칭 위치 기준이며
+    width/height 를 생략하면 템플릿 크기를 사용합니다.
+    """
+    if not region:
+        return None
+    th, tw = template_shape[:2]
+    wh, ww = window_shape[:2]
+    x = region.get("x", 0)
+    y = region.get("y", 0)
+    width = region.get("width")
+    height = region.get("height")
+    if region.get("relative_to") == "previous_match":
+        if previous_loc is None:
+            return None
+        x += previous_loc[0]
+        y += previous_loc[1]
+        width = width or tw
+        height = height or th
+    if not width or not height:
+        return None
+    margin = region.get("margin", 10)
+    x0 = max(0, x - margin)
+    y0 = max(0, y - margin)
+    x1 = min(ww, x + width + margin)
+    y1 = min(wh, y + height + margin)
+    if x1 - x0 < tw or y1 - y0 < th:
+        return None
+    return x0, y0, x1, y1
+
+
+def match_in_region(
+    window_gray, template, region=None, previous_loc=None, threshold=None, fallback=True
+):
+    """검색 영역을 잘라서 매칭하고, 찾지 못하면 전체 윈도우를 탐색합니다.
+
+    반환값은 윈도우 좌표 기준의 (max_val, max_loc) 입니다.
+    """
+    rect = crop_region(
+        window_gray.shape, region, as_levels(template)[0].shape, previous_loc
+    )
+    if rect is not None:
+        x0, y0, x1, y1 = rect
+        max_val, (lx, ly) = match_template(window_gray[y0:y1, x0:x1], template)
+        if threshold is None or max_val >= threshold or not fallback:
+            return max_val, (x0 + lx, y0 + ly)
+    return match_template(window_gray, template)
+
+
+class MatchEntry:
+    """직전 매칭에 사용한 프레임과 결과입니다."""
+
+    __slots__ = ("template", "params", "fingerprint", "gray", "result")
+
+    def __init__(self, template, params, fingerprint, gray, result):
+        self.template = template
+        self.params = params
+        self.fingerprint = fingerprint
+        self.gray = gray
+        self.result = result
+
+
+class IncrementalMatcher:
+    """같은 조건을 반복해서 폴링할 때 바뀌지 않은 화면의 매칭을 건너뜁니다.
+
+    - 지문이 같으면 직전 결과를 그대로 돌려줍니다. (skipped)
+    - 검색 영역이 없고 직전 최고점이 바뀐 영역 밖에 있으면, 바뀐 영역과 겹칠 수 있는
+      위치만 다시 탐색합니다. (partial)
+    - 그 밖에는 전체를 다시 매칭합니다. (full)
+    """
+
+    def __init__(self, max_entries=8, max_partial_ratio=0.5):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.max_partial_ratio = max_partial_ratio
+        self.skipped = 0
+        self.partial = 0
+        self.full = 0
+
+    def match(
+        self,
+        key,
+        window_gray,
+        template,
+        region=None,
+        previous_loc=None,
+        threshold=None,
+        fallback=True,
+    ):
+        """match_in_region 과 같은 (max_val, max_loc) 를 반환합니다."""
+        params = (repr(region) if region else None, previous_loc, threshold, fallback)
+        current = fingerprint(window_gray)
+        entry = self.entries.get(key)
+        if entry is not None and entry.template is template and entry.params == params:
+            if entry.fingerprint == current:
+                self.skipped += 1
+                self.entries.move_to_end(key)
+                return entry.result
+            if region is None and entry.gray.shape == window_gray.shape:
+                result = self.match_changed(entry, window_gray, template)
+                if result is not None:
+                    self.partial += 1
+                    self.store(key, template, params, current, window_gray, result)
+                    return result
+
+        self.full += 1
+        result = match_in_region(
+            window_gray, template, region, previous_loc, threshold, fallback
+        )
+        self.store(key, template, params, current, window_gray, result)
+        return result
+
+    def match_changed(self, entry, window_gray, template):
+        """바뀐 영역과 겹치는 위치만 다시 매칭합니다. 전체 매칭이 필요하면 None 을 반환합니다."""
+        rect = changed_rect(entry.gray, window_gray)
+        if rect is None:
+            return entry.result
+        x, y, w, h = rect
+        wh, ww = window_gray.shape[:2]
+        if w * h > ww * wh * self.max_partial_ratio:
+            return None
+        th, tw = as_levels(template)[0].shape[:2]
+        # 바뀐 픽셀을 덮을 수 있는 템플릿 왼쪽 위 좌표의 범위
+        ax0 = max(0, x - tw + 1)
+        ay0 = max(0, y - th + 1)
+        ax1 = min(ww - tw, x + w - 1)
+        ay1 = min(wh - th, y + h - 1)
+        previous_val, (px, py) = entry.result
+        if ax0 <= px <= ax1 and ay0 <= py <= ay1:
+            # 직전 최고점이 바뀌었으므로 다른 곳이 최고점이 될 수 있음
+            return None
+        if ax1 < ax0 or ay1 < ay0:
+            return entry.result
+        crop = window_gray[ay0 : ay1 + th, ax0 : ax1 + tw]
+        max_val, (lx, ly) = match_template(crop, template)
+        if max_val > previous_val:
+            return max_val, (ax0 + lx, ay0 + ly)
+        return entry.result
+
+    def store(self, key, template, params, current, window_gray, result):
+        self.entries[key] = MatchEntry(template, params, current, window_gray, result)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def stats(self):
+        """건너뛴 매칭과 실행한 매칭 수를 반환합니다."""
+        return {"skipped": self.skipped, "partial": self.partial, "full": self.full}
+
+
+def synthetic_screenshot(width, height, rng):
+    """사각형과 글자 모양 잡음으로 이루어진 가짜 UI 스크린샷을 만듭니다."""
+    image = np.full((height, width), 235, dtype=np.uint8)
+    for _ in range(width * height // 4000):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        w, h = int(rng.integers(10, 300)), int(rng.integers(8, 120))
+        color = int(rng.integers(0, 255))
+        cv2.rectangle(image, (x, y), (x + w, y + h), color, int(rng.choice([-1, 1, 2])))
+    for _ in range(width * height // 8000):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        cv2.putText(
+            image,
+            str(int(rng.integers(0, 10**6))),
+            (x, y),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            float(rng.uniform(0.3, 0.8)),
+            int(rng.integers(0, 120)),
+            1,
+        )
+    return image
+
+
+if __name__ == "__main__":
+    # 합성 스크린샷에서 전체 탐색과 피라미드 탐색의 정확도와 속도를 비교합니다.
+    import time
+
+    from template_store import Template
+
+    rng = np.random.default_rng(0)
+    trials = 20
+    mismatches = 0
+    exhaustive_time = pyramid_time = 0.0
+    for trial in range(trials):
+        screen = synthetic_screenshot(2560, 1440, rng)
+        tw, th = int(rng.integers(60, 240)), int(rng.integers(30, 120))
+        x, y = int(rng.integers(0, 2560 - tw)), int(rng.integers(0, 1440 - th))
+        template = Template("", screen[y : y + th, x : x + tw].copy(), 0, 0)
+        # 캡처마다 약간의 잡음
+        noisy = cv2.add(screen, rng.integers(0, 3, screen.shape, dtype=np.uint8))
+
+        start = time.perf_counter()
+        exhaustive_val, exhaustive_loc = match_exhaustive(noisy, template.gray)
+        exhaustive_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        pyramid_val, pyramid_loc = match_template(noisy, template)
+        pyramid_time += time.perf_counter() - start
+
+        dx = abs(pyramid_loc[0] - exhaustive_loc[0])
+        dy = abs(pyramid_loc[1] - exhaustive_loc[1])
+        if dx > 1 or dy > 1:
+            mismatches += 1
+            print(
+                f"trial {trial}: exhaustive {exhaustive_loc} {exhaustive_val:.4f}, "
+                f"pyramid {pyramid_loc} {pyramid_val:.4f}"
+            )
+
+    print(f"Exhaustive: {exhaustive_time / trials * 1000:.1f} ms/match")
+    print(f"Pyramid:    {pyramid_time / trials * 1000:.1f} ms/match")
+    print(f"Results within 1 px: {trials - mismatches}/{trials}")
@@ -1,19 +1,476 @@
-import win32gui
-import win32api
-import win32con
-import ctypes
-from ctypes import wintypes
+import threading
+from collections import deque
+
+from logs import get_logger
+from window_watcher import (
+    CHILDID_SELF,
+    OBJID_WINDOW,
+    START_TIMEOUT,
+    WINEVENT_OUTOFCONTEXT,
+    WINEVENT_SKIPOWNPROCESS,
+    WM_QUIT,
+)
+
+log = get_logger("overlay")
+
+# WinEvent 상수
+EVENT_SYSTEM_FOREGROUND = 0x0003
+EVENT_SYSTEM_MINIMIZESTART = 0x0016
+EVENT_SYSTEM_MINIMIZEEND = 0x0017
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_REORDER = 0x8004
+EVENT_OBJECT_LOCATIONCHANGE = 0x800B
+
+OVERLAY_EVENT_KINDS = {
+    EVENT_SYSTEM_FOREGROUND: "foreground",
+    EVENT_SYSTEM_MINIMIZESTART: "minimize",
+    EVENT_SYSTEM_MINIMIZEEND: "restore",
+    EVENT_OBJECT_DESTROY: "destroy",
+    EVENT_OBJECT_REORDER: "reorder",
+    EVENT_OBJECT_LOCATIONCHANGE: "location",
+}
+
+# 대상 프로세스로 한정하는 훅 (LOCATIONCHANGE 는 잦으므로 다른 프로세스 것은 받지 않음)
+TARGET_HOOK_RANGES = [
+    (EVENT_OBJECT_DESTROY, EVENT_OBJECT_DESTROY),
+    (EVENT_OBJECT_REORDER, EVENT_OBJECT_REORDER),
+    (EVENT_OBJECT_LOCATIONCHANGE, EVENT_OBJECT_LOCATIONCHANGE),
+]
+# 다른 윈도우가 앞으로 나오면 Z-order 가 바뀌므로 전체 데스크톱에서 받는 훅
+GLOBAL_HOOK_RANGES = [
+    (EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND),
+    (EVENT_SYSTEM_MINIMIZESTART, EVENT_SYSTEM_MINIMIZEEND),
+]
+
+HWND_TOPMOST = -1
+GA_ROOT = 2
+# 오버레이가 대상 윈도우보다 바깥으로 나오는 여백 (픽셀)
+MARGIN = 10
+# 놓친 이벤트를 복구하기 위한 느린 확인 주기 (밀리초)
+FALLBACK_INTERVAL_MS = 1000
+
+
+def overlay_rect(rect, margin=MARGIN):
+    """대상 윈도우의 (left, top, right, bottom) 으로 오버레이의 (x, y, width, height) 를 구합니다."""
+    left, top, right, bottom = rect
+    return (
+        left - margin,
+        top - margin,
+        right - left + margin * 2,
+        bottom - top + margin * 2,
+    )
+
+
+class OverlayTracker:
+    """대상 윈도우의 이벤트를 받아 오버레이의 위치와 Z-order 를 맞춥니다.
+
+    Win32 호출은 api 에 맡기므로 가짜 api 와 이벤트로 리눅스에서 검증할 수 있습니다.
+    위치가 바뀌었을 때만 옮기고, 오버레이가 이미 대상 바로 위에 있으면 Z-order 도 건드리지 않습니다.
+    대상이 MIDAS 창 안의 자식 창이면 이동 이벤트와 Z-order 는 최상위 창(root_hwnd) 기준입니다.
+    overlay_hwnds 는 같은 최상위 창 위에 겹쳐 쌓일 수 있는 다른 오버레이들입니다.
+    """
+
+    def __init__(
+        self, api, overlay_hwnd, target_hwnd, margin=MARGIN, overlay_hwnds=None
+    ):
+        self.api = api
+        self.overlay_hwnd = overlay_hwnd
+        self.target_hwnd = target_hwnd
+        self.root_hwnd = api.root(target_hwnd) or target_hwnd
+        self.overlay_hwnds = overlay_hwnds if overlay_hwnds is not None else set()
+        self.margin = margin
+        self.rect = None
+        self.closed = False
+        # 통계
+        self.events = 0
+        self.ignored = 0
+        self.repositions = 0
+        self.restacks = 0
+
+    def on_event(self, kind, hwnd):
+        """WinEvent 하나를 처리합니다. kind 는 OVERLAY_EVENT_KINDS 의 값입니다."""
+        if self.closed:
+            return
+        self.events += 1
+        if kind == "foreground":
+            # 어느 윈도우든 앞으로 나오면 대상 위의 윈도우가 바뀔 수 있음
+            self.restack()
+        elif hwnd != self.target_hwnd and hwnd != self.root_hwnd:
+            self.ignored += 1
+        elif kind == "destroy":
+            self.close()
+        else:
+            # 최상위 창을 끌면 자식 창에는 이동 이벤트가 오지 않으므로 최상위 창 이벤트로 맞춤
+            self.sync()
+
+    def sync(self):
+        """대상 윈도우의 위치와 Z-order 를 확인하여 필요한 만큼만 오버레이를 옮깁니다."""
+        if self.closed:
+            return
+        if not self.api.is_window(self.target_hwnd):
+            # 대상 윈도우가 사라짐
+            self.close()
+            return
+        rect = overlay_rect(self.api.get_window_rect(self.target_hwnd), self.margin)
+        if rect == self.rect:
+            self.restack()
+            return
+        self.rect = rect
+        self.repositions += 1
+        self.api.set_window_pos(self.overlay_hwnd, self.insert_after(), rect)
+
+    def insert_after(self):
+        """오버레이를 넣을 위치를 반환합니다. 이미 대상 바로 위에 있으면 None 입니다.
+
+        최상위 창 바로 위에 쌓인 오버레이들 사이에 있으면 그대로 둡니다.
+        """
+        above = self.api.window_above(self.root_hwnd)
+        while above and above in self.overlay_hwnds:
+            if above == self.overlay_hwnd:
+                return None
+            above = self.api.window_above(above)
+        if above == self.overlay_hwnd:
+            return None
+        # 대상이 맨 위면 오버레이를 최상위로
+        return above or HWND_TOPMOST
+
+    def restack(self):
+        insert_after = self.insert_after()
+        if insert_after is None:
+            return
+        self.restacks += 1
+        self.api.set_window_pos(self.overlay_hwnd, insert_after, None)
+
+    def close(self):
+        self.closed = True
+        self.api.destroy(self.overlay_hwnd)
+
+    def z_order_report(self):
+        """오버레이와 대상의 Z-order 를 문자열로 반환합니다. 필요할 때만 호출합니다. (전체 윈도우를 훑음)"""
+        overlay_z_order = self.api.z_order(self.overlay_hwnd)
+        target_z_order = self.api.z_order(self.root_hwnd)
+        return f"Overlay Z-order: {overlay_z_order}, Target Z-order: {target_z_order}"
+
+    def summary(self):
+        return (
+            f"Overlay events {self.events}, ignored {self.ignored}, "
+            f"repositions {self.repositions}, restacks {self.restacks}"
+        )
+
+
+class PositionBatch:
+    """set_window_pos 호출을 모았다가 flush() 에서 한 번에 적용합니다.
+
+    같은 오버레이에 대한 여러 변경은 마지막 위치와 마지막 Z-order 하나로 합칩니다.
+    나머지 메서드는 감싼 api 로 넘깁니다.
+    """
+
+    def __init__(self, api):
+        self.api = api
+        self.pending = {}  # 오버레이 hwnd -> [insert_after, rect]
+        self.flushes = 0
+
+    def __getattr__(self, name):
+        return getattr(self.api, name)
+
+    def set_window_pos(self, hwnd, insert_after, rect):
+        entry = self.pending.setdefault(hwnd, [None, None])
+        if insert_after is not None:
+            entry[0] = insert_after
+        if rect is not None:
+            entry[1] = rect
+
+    def destroy(self, hwnd):
+        self.pending.pop(hwnd, None)
+        self.api.destroy(hwnd)
+
+    def flush(self):
+        if not self.pending:
+            return
+        positions = [
+            (hwnd, insert_after, rect)
+            for hwnd, (insert_after, rect) in self.pending.items()
+        ]
+        self.pending = {}
+        self.flushes += 1
+        self.api.set_window_positions(positions)
+
+
+class OverlaySet:
+    """여러 대상 윈도우의 오버레이를 관리합니다. 이벤트는 해당 대상의 추적기에만 전달합니다.
+
+    api 는 Win32OverlayApi 나 FakeOverlayApi 이며 보통 PositionBatch 로 감쌉니다.
+    대상이 사라져 오버레이가 닫히면 on_removed(target_hwnd) 를 호출합니다.
+    """
+
+    def __init__(self, api, margin=MARGIN, on_removed=None):
+        self.api = api
+        self.margin = margin
+        self.on_removed = on_removed
+        self.trackers = {}  # 대상 hwnd -> OverlayTracker
+        self.by_root = {}  # 최상위 창 hwnd -> 그 안의 대상 추적기 목록
+        self.overlay_hwnds = set()
+        self.ignored = 0
+
+    def __contains__(self, target_hwnd):
+        return target_hwnd in self.trackers
+
+    def add(self, target_hwnd):
+        """대상 윈도우를 가립니다. 이미 가리고 있으면 False 를 반환합니다."""
+        if target_hwnd in self.trackers:
+            return False
+        overlay_hwnd = self.api.create_overlay()
+        self.overlay_hwnds.add(overlay_hwnd)
+        tracker = OverlayTracker(
+            self.api, overlay_hwnd, target_hwnd, self.margin, self.overlay_hwnds
+        )
+        self.trackers[target_hwnd] = tracker
+        self.by_root.setdefault(tracker.root_hwnd, []).append(tracker)
+        tracker.sync()
+        self.discard_closed(tracker)
+        return True
+
+    def remove(self, target_hwnd):
+        tracker = self.trackers.pop(target_hwnd, None)
+        if tracker is None:
+            return
+        if not tracker.closed:
+            tracker.close()
+        self.overlay_hwnds.discard(tracker.overlay_hwnd)
+        siblings = self.by_root.get(tracker.root_hwnd, [])
+        if tracker in siblings:
+            siblings.remove(tracker)
+        if not siblings:
+            self.by_root.pop(tracker.root_hwnd, None)
+        if self.on_removed is not None:
+            self.on_removed(target_hwnd)
+
+    def clear(self):
+        for target_hwnd in list(self.trackers):
+            self.remove(target_hwnd)
+
+    def discard_closed(self, tracker):
+        if tracker.closed:
+            self.remove(tracker.target_hwnd)
+
+    def on_event(self, kind, hwnd):
+        if kind == "foreground":
+            # 전경 윈도우가 바뀌면 모든 오버레이의 Z-order 를 확인
+            for tracker in list(self.trackers.values()):
+                tracker.on_event(kind, hwnd)
+            return
+        # 대상 자신의 이벤트와, 대상이 속한 최상위 창의 이벤트를 함께 전달
+        trackers = list(self.by_root.get(hwnd, ()))
+        tracker = self.trackers.get(hwnd)
+        if tracker is not None and tracker not in trackers:
+            trackers.append(tracker)
+        if not trackers:
+            self.ignored += 1
+            return
+        for tracker in trackers:
+            tracker.on_event(kind, hwnd)
+            self.discard_closed(tracker)
+
+    def sync_all(self):
+        """놓친 이벤트를 위해 모든 오버레이를 확인합니다."""
+        for tracker in list(self.trackers.values()):
+            tracker.sync()
+            self.discard_closed(tracker)
+
+    def summary(self):
+        trackers = self.trackers.values()
+        return (
+            f"Overlays {len(self.trackers)}, "
+            f"events {sum(tracker.events for tracker in trackers)}, "
+            f"ignored {self.ignored}, "
+            f"repositions {sum(tracker.repositions for tracker in trackers)}, "
+            f"restacks {sum(tracker.restacks for tracker in trackers)}"
+        )
+
+
+# 오버레이 윈도우 클래스는 프로세스에서 한 번만 등록
+OVERLAY_CLASS_NAME = "MidasLinkerOverlay"
+overlay_class_atom = None
+# 화면 캡처에서 제외 (이미지 매칭 캡처에 오버레이가 찍히지 않도록). Windows 10 2004 이상
+WDA_EXCLUDEFROMCAPTURE = 0x11
+WM_APP = 0x8000
+PM_REMOVE = 0x0001
+
+
+def overlay_wnd_proc(hwnd, msg, wParam, lParam):
+    """모든 오버레이가 함께 쓰는 윈도우 프로시저입니다. 마우스 입력을 막습니다."""
+    import win32con
+    import win32gui
+
+    if msg == win32con.WM_PAINT:
+        hdc, ps = win32gui.BeginPaint(hwnd)
+        # No painting required
+        win32gui.EndPaint(hwnd, ps)
+        return 0
+    elif msg in (
+        win32con.WM_LBUTTONDOWN,
+        win32con.WM_RBUTTONDOWN,
+        win32con.WM_MBUTTONDOWN,
+        win32con.WM_LBUTTONUP,
+        win32con.WM_RBUTTONUP,
+        win32con.WM_MBUTTONUP,
+        win32con.WM_MOUSEMOVE,
+        win32con.WM_MOUSEWHEEL,
+    ):
+        # Block mouse events from passing through
+        return 0
+    elif msg == win32con.WM_SETCURSOR:
+        # 마우스 커서 설정
+        win32gui.SetCursor(win32gui.LoadCursor(None, win32con.IDC_ARROW))
+        return True
+    return win32gui.DefWindowProc(hwnd, msg, wParam, lParam)
+
+
+def register_overlay_class():
+    """오버레이 윈도우 클래스를 등록합니다. 이미 등록했으면 그 atom 을 반환합니다."""
+    global overlay_class_atom
+    if overlay_class_atom is None:
+        import win32api
+        import win32con
+        import win32gui
+
+        wndClass = win32gui.WNDCLASS()
+        wndClass.style = win32con.CS_HREDRAW | win32con.CS_VREDRAW
+        wndClass.lpfnWndProc = overlay_wnd_proc
+        wndClass.hInstance = win32api.GetModuleHandle()
+        wndClass.hCursor = win32gui.LoadCursor(None, win32con.IDC_ARROW)
+        wndClass.hbrBackground = win32gui.CreateSolidBrush(win32api.RGB(0, 0, 0))
+        wndClass.lpszClassName = OVERLAY_CLASS_NAME
+        overlay_class_atom = win32gui.RegisterClass(wndClass)
+    return overlay_class_atom
+
+
+class Win32OverlayApi:
+    """win32gui 로 오버레이를 만들고 옮깁니다. 메시지 루프 스레드에서만 사용합니다."""
+
+    def __init__(self):
+        import ctypes
+        from ctypes import wintypes
+
+        import win32api
+        import win32con
+        import win32gui
+
+        self.win32con = win32con
+        self.win32gui = win32gui
+        self.hInstance = win32api.GetModuleHandle()
+        self.class_atom = register_overlay_class()
+
+        user32 = ctypes.windll.user32
+        user32.BeginDeferWindowPos.restype = wintypes.HANDLE
+        user32.BeginDeferWindowPos.argtypes = [ctypes.c_int]
+        user32.DeferWindowPos.restype = wintypes.HANDLE
+        user32.DeferWindowPos.argtypes = [
+            wintypes.HANDLE,
+            wintypes.HWND,
+            wintypes.HWND,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            ctypes.c_int,
+            wintypes.UINT,
+        ]
+        user32.EndDeferWindowPos.argtypes = [wintypes.HANDLE]
+        self.user32 = user32
+
+    def create_overlay(self):
+        """검은 반투명 오버레이 창을 만들고 hwnd 를 반환합니다."""
+        win32con = self.win32con
+        win32gui = self.win32gui
+        hwnd = win32gui.CreateWindowEx(
+            win32con.WS_EX_LAYERED | win32con.WS_EX_TOOLWINDOW,
+            self.class_atom,
+            None,  # No window title
+            win32con.WS_POPUP,
+            0,
+            0,
+            0,
+            0,
+            None,
+            None,
+            self.hInstance,
+            None,
+        )
+        # Set window to black background and 50% transparency
+        win32gui.SetLayeredWindowAttributes(hwnd, 0, int(255 * 0.5), win32con.LWA_ALPHA)
+        # 실패해도 (오래된 Windows) 오버레이는 동작함
+        self.user32.SetWindowDisplayAffinity(hwnd, WDA_EXCLUDEFROMCAPTURE)
+        win32gui.ShowWindow(hwnd, win32con.SW_SHOWNOACTIVATE)
+        return hwnd
+
+    def is_window(self, hwnd):
+        return bool(self.win32gui.IsWindow(hwnd))
+
+    def get_window_rect(self, hwnd):
+        return self.win32gui.GetWindowRect(hwnd)
+
+    def root(self, hwnd):
+        """자식 창이면 그 최상위 창을 반환합니다. (오버레이는 최상위 창끼리만 Z-order 비교 가능)"""
+        return self.win32gui.GetAncestor(hwnd, GA_ROOT)
+
+    def window_above(self, hwnd):
+        return self.win32gui.GetWindow(hwnd, self.win32con.GW_HWNDPREV)
+
+    def position_flags(self, insert_after, rect):
+        """(insert_after, rect, flags) 를 반환합니다. None 인 값은 바꾸지 않습니다."""
+        flags = self.win32con.SWP_NOACTIVATE
+        if rect is None:
+            flags |= self.win32con.SWP_NOMOVE | self.win32con.SWP_NOSIZE
+            rect = (0, 0, 0, 0)
+        if insert_after is None:
+            flags |= self.win32con.SWP_NOZORDER
+            insert_after = 0
+        return insert_after, rect, flags
+
+    def set_window_pos(self, hwnd, insert_after, rect):
+        """rect 가 None 이면 위치를, insert_after 가 None 이면 Z-order 를 유지합니다."""
+        insert_after, rect, flags = self.position_flags(insert_after, rect)
+        self.win32gui.SetWindowPos(hwnd, insert_after, *rect, flags)
+
+    def set_window_positions(self, positions):
+        """(hwnd, insert_after, rect) 목록을 DeferWindowPos 로 한 번에 적용합니다."""
+        positions = [entry for entry in positions if self.is_window(entry[0])]
+        if not positions:
+            return
+        defer = self.user32.DeferWindowPos
+        hdwp = self.user32.BeginDeferWindowPos(len(positions))
+        for hwnd, insert_after, rect in positions:
+            if not hdwp:
+                break
+            insert_after, rect, flags = self.position_flags(insert_after, rect)
+            hdwp = defer(hdwp, hwnd, insert_after, *rect, flags)
+        if hdwp:
+            self.user32.EndDeferWindowPos(hdwp)
+            return
+        # 일괄 적용에 실패하면 (DeferWindowPos 가 핸들을 해제함) 하나씩 적용
+        for hwnd, insert_after, rect in positions:
+            self.set_window_pos(hwnd, insert_after, rect)
+
+    def destroy(self, hwnd):
+        if self.win32gui.IsWindow(hwnd):
+            self.win32gui.DestroyWindow(hwnd)
+
+    def z_order(self, hwnd):
+        return get_window_z_order(hwnd)
+
 
 def get_target_window_info(target_hwnd):
+    import win32gui
+
     rect = win32gui.GetWindowRect(target_hwnd)
-    x = rect[0]
-    y = rect[1]
-    width = rect[2] - rect[0]
-    height = rect[3] - rect[1]
-    return x, y, width, height
+    return overlay_rect(rect, 0)
+
 
 def get_window_z_order(hwnd):
     """특정 윈도우의 Z-Order를 반환하는 함수"""
+    import win32con
+    import win32gui
+
     z = 0
     current_hwnd = win32gui.GetTopWindow(None)
     while current_hwnd:
@@ -23,124 +480,396 @@ def get_window_z_order(hwnd):
         z += 1
     return -1  # 윈도우를 찾지 못한 경우
 
-class OverlayWindow:
-    def __init__(self, target_hwnd):
-        self.target_hwnd = target_hwnd
-        self.prev_x = self.prev_y = self.prev_width = self.prev_height = None
-
-        hInstance = win32api.GetModuleHandle()
-        className = 'MyOverlayWindowClass'
-        
-        # Define window class
-        wndClass                = win32gui.WNDCLASS()
-        wndClass.style          = win32con.CS_HREDRAW | win32con.CS_VREDRAW
-        wndClass.lpfnWndProc    = self.WndProc
-        wndClass.hInstance      = hInstance
-        wndClass.hCursor        = win32gui.LoadCursor(None, win32con.IDC_ARROW)
-        wndClass.hbrBackground  = win32gui.CreateSolidBrush(win32api.RGB(0, 0, 0))
-        wndClass.lpszClassName  = className
-
-        self.classAtom = win32gui.RegisterClass(wndClass)
-        
-        exStyle = win32con.WS_EX_LAYERED
-        style = win32con.WS_POPUP
-
-        # Create the window
-        self.hwnd = win32gui.CreateWindowEx(
-            exStyle,
-            self.classAtom,
-            None,  # No window title
-            style,
-            0, 0, 0, 0,
-            None, None, hInstance, None)
 
-        # Set window to black background and 50% transparency
-        win32gui.SetLayeredWindowAttributes(self.hwnd, 0, int(255 * 0.5), win32con.LWA_ALPHA)
-        # Show the window
-        win32gui.ShowWindow(self.hwnd, win32con.SW_SHOW)
-
-        # Set a timer using ctypes
-        self.timer_id = ctypes.windll.user32.SetTimer(self.hwnd, 1, 10, None)
-        if not self.timer_id:
-            print("Failed to create timer.")
-            win32gui.DestroyWindow(self.hwnd)
-
-    def WndProc(self, hwnd, msg, wParam, lParam):
-        if msg == win32con.WM_DESTROY:
-            ctypes.windll.user32.KillTimer(self.hwnd, self.timer_id)
-            win32gui.PostQuitMessage(0)
-            return 0
-        elif msg == win32con.WM_TIMER:
-            self.on_timer()
-            return 0
-        elif msg == win32con.WM_PAINT:
-            hdc, ps = win32gui.BeginPaint(hwnd)
-            # No painting required
-            win32gui.EndPaint(hwnd, ps)
-            return 0
-        elif msg in (win32con.WM_LBUTTONDOWN, win32con.WM_RBUTTONDOWN, win32con.WM_MBUTTONDOWN,
-                     win32con.WM_LBUTTONUP, win32con.WM_RBUTTONUP, win32con.WM_MBUTTONUP,
-                     win32con.WM_MOUSEMOVE, win32con.WM_MOUSEWHEEL):
-            # Block mouse events from passing through
-            return 0
-        elif msg == win32con.WM_SETCURSOR:
-            # 마우스 커서 설정
-            win32gui.SetCursor(win32gui.LoadCursor(None, win32con.IDC_ARROW))
+class OverlayManager:
+    """여러 대상 윈도우를 가리는 오버레이를 메시지 루프 스레드 하나에서 관리합니다.
+
+    mask/unmask 는 어느 스레드에서나 호출할 수 있으며 명령은 루프 스레드에서 처리됩니다.
+    대상 프로세스별 WinEvent 훅은 그 프로세스의 대상이 하나라도 있을 때만 걸어 둡니다.
+    메시지를 한 번 꺼낼 때 쌓여 있던 이벤트를 모두 처리한 뒤 위치 변경을 한 번에 적용합니다.
+    """
+
+    def __init__(self, debug=False):
+        self.debug = debug
+        self.commands = deque()
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+        self.error = None
+        self.lock = threading.Lock()
+        self.masked_targets = set()
+        # 루프 스레드에서만 사용
+        self.overlays = None
+        self.target_pids = {}  # 대상 hwnd -> pid
+        self.process_hooks = {}  # pid -> 훅 목록
+
+    def start(self):
+        """루프 스레드를 시작합니다. 준비에 실패하면 그 예외를 호출한 스레드에서 발생시킵니다."""
+        if self.thread is None:
+            self.ready.clear()
+            self.error = None
+            self.thread = threading.Thread(target=self.run, daemon=True)
+            self.thread.start()
+            if not self.ready.wait(START_TIMEOUT):
+                raise RuntimeError("overlay message loop did not start")
+            if self.error is not None:
+                self.thread = None
+                raise self.error
+        return self
+
+    def stop(self, timeout=1):
+        if self.thread is None:
+            return
+        self.post("quit")
+        self.thread.join(timeout)
+        self.thread = None
+
+    def post(self, *command):
+        import ctypes
+
+        self.start()
+        self.commands.append(command)
+        ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_APP, 0, 0)
+
+    def mask(self, target_hwnd):
+        """대상 윈도우를 오버레이로 가립니다."""
+        with self.lock:
+            self.masked_targets.add(target_hwnd)
+        self.post("mask", target_hwnd)
+
+    def unmask(self, target_hwnd):
+        with self.lock:
+            self.masked_targets.discard(target_hwnd)
+        self.post("unmask", target_hwnd)
+
+    def unmask_all(self):
+        with self.lock:
+            self.masked_targets.clear()
+        self.post("unmask_all")
+
+    def masked(self):
+        with self.lock:
+            return set(self.masked_targets)
+
+    def run(self):
+        import ctypes
+        from ctypes import wintypes
+
+        try:
+            user32 = ctypes.windll.user32
+            kernel32 = ctypes.windll.kernel32
+            self.user32 = user32
+
+            batch = PositionBatch(Win32OverlayApi())
+            self.overlays = OverlaySet(batch, on_removed=self.target_removed)
+            self.setup_hook_proc()
+            global_hooks = self.set_hooks(GLOBAL_HOOK_RANGES, 0, 0)
+            # 스레드 타이머 (hwnd 없이 WM_TIMER 가 스레드 큐로 옴)
+            timer_id = user32.SetTimer(None, 0, FALLBACK_INTERVAL_MS, None)
+            self.thread_id = kernel32.GetCurrentThreadId()
+        except Exception as e:
+            # 준비 신호를 기다리는 스레드가 멈추지 않도록 오류를 넘기고 끝냄
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+
+        # WinEvent 콜백도 GetMessage/PeekMessage 안에서 호출되므로 함께 모아서 적용됨
+        msg = wintypes.MSG()
+        running = True
+        while running and user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            running = self.handle_message(msg)
+            while running and user32.PeekMessageW(
+                ctypes.byref(msg), None, 0, 0, PM_REMOVE
+            ):
+                if msg.message == WM_QUIT:
+                    running = False
+                    break
+                running = self.handle_message(msg)
+            batch.flush()
+
+        self.overlays.clear()
+        user32.KillTimer(None, timer_id)
+        for hook in global_hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+        log.info("%s", self.overlays.summary())
+
+    def handle_message(self, msg):
+        """메시지 하나를 처리합니다. 루프를 끝내야 하면 False 를 반환합니다."""
+        import ctypes
+        import win32con
+
+        if not msg.hWnd and msg.message == WM_APP:
+            return self.run_commands()
+        if not msg.hWnd and msg.message == win32con.WM_TIMER:
+            self.overlays.sync_all()
             return True
-        else:
-            return win32gui.DefWindowProc(hwnd, msg, wParam, lParam)
-        
-    def on_timer(self):
-        if not win32gui.IsWindow(self.target_hwnd):
-            # Target window no longer exists
-            win32gui.DestroyWindow(self.hwnd)
-            return
-
-        x, y, width, height = get_target_window_info(self.target_hwnd)
-        x -= 10
-        y -= 10
-        width += 20
-        height += 20
-
-        if (x != self.prev_x or y != self.prev_y or width != self.prev_width or height != self.prev_height):
-            # Update overlay window position and size
-            flags = win32con.SWP_NOACTIVATE
-            # Get the window above the target window
-            prev_hwnd = win32gui.GetWindow(self.target_hwnd, win32con.GW_HWNDPREV)
-            if prev_hwnd == 0:
-                # If target window is at the top, set overlay to topmost
-                hWndInsertAfter = win32con.HWND_TOPMOST
-            else:
-                hWndInsertAfter = prev_hwnd
-            win32gui.SetWindowPos(self.hwnd, hWndInsertAfter, x, y, width, height, flags)
-            self.prev_x, self.prev_y, self.prev_width, self.prev_height = x, y, width, height
-        else:
-            # Ensure overlay window is above target_hwnd
-            flags = win32con.SWP_NOMOVE | win32con.SWP_NOSIZE | win32con.SWP_NOACTIVATE
-            prev_hwnd = win32gui.GetWindow(self.target_hwnd, win32con.GW_HWNDPREV)
-            if prev_hwnd == 0:
-                hWndInsertAfter = win32con.HWND_TOPMOST
+        self.user32.TranslateMessage(ctypes.byref(msg))
+        self.user32.DispatchMessageW(ctypes.byref(msg))
+        return True
+
+    def run_commands(self):
+        import win32process
+
+        while self.commands:
+            command = self.commands.popleft()
+            if command[0] == "quit":
+                return False
+            if command[0] == "mask":
+                target_hwnd = command[1]
+                if target_hwnd in self.overlays:
+                    continue
+                _, pid = win32process.GetWindowThreadProcessId(target_hwnd)
+                if not pid:
+                    continue
+                self.target_pids[target_hwnd] = pid
+                if pid not in self.process_hooks:
+                    self.process_hooks[pid] = self.set_hooks(TARGET_HOOK_RANGES, pid, 0)
+                self.overlays.add(target_hwnd)
+            elif command[0] == "unmask":
+                self.overlays.remove(command[1])
+            elif command[0] == "unmask_all":
+                self.overlays.clear()
+        return True
+
+    def target_removed(self, target_hwnd):
+        """대상의 오버레이가 닫혔을 때 그 프로세스의 마지막 대상이면 훅을 해제합니다."""
+        with self.lock:
+            self.masked_targets.discard(target_hwnd)
+        pid = self.target_pids.pop(target_hwnd, None)
+        if pid is None or pid in self.target_pids.values():
+            return
+        for hook in self.process_hooks.pop(pid, ()):
+            if hook:
+                self.user32.UnhookWinEvent(hook)
+
+    def setup_hook_proc(self):
+        import ctypes
+        from ctypes import wintypes
+
+        WinEventProcType = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+        self.user32.SetWinEventHook.restype = wintypes.HANDLE
+        self.user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HMODULE,
+            WinEventProcType,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        ]
+        self.user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+        # 콜백이 가비지 컬렉션되지 않도록 보관
+        self.proc = WinEventProcType(self.handle_event)
+
+    def set_hooks(self, ranges, pid, thread_id):
+        return [
+            self.user32.SetWinEventHook(
+                low,
+                high,
+                None,
+                self.proc,
+                pid,
+                thread_id,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS,
+            )
+            for low, high in ranges
+        ]
+
+    def handle_event(self, hook, event, hwnd, id_object, id_child, thread, event_time):
+        # 윈도우 자체에 대한 이벤트만 전달 (캐럿, 커서 등은 무시)
+        if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+            return
+        kind = OVERLAY_EVENT_KINDS.get(event)
+        if not kind:
+            return
+        trackers = list(self.overlays.by_root.get(hwnd, ()))
+        restacks = [tracker.restacks for tracker in trackers]
+        self.overlays.on_event(kind, hwnd)
+        if self.debug:
+            for tracker, before in zip(trackers, restacks):
+                if tracker.restacks != before:
+                    log.info("%s", tracker.z_order_report())
+
+
+class FakeOverlayApi:
+    """메모리 안의 Z-order 와 윈도우 위치입니다. 리눅스에서 OverlayTracker 를 검증할 때 사용합니다."""
+
+    def __init__(self):
+        self.stack = []  # 위에서 아래 순서의 최상위 hwnd
+        self.rects = {}
+        self.roots = {}  # 자식 hwnd -> 최상위 hwnd
+        self.moves = 0
+        self.batches = 0
+        self.z_walks = 0
+        self.next_overlay = 0x900000
+
+    def add_window(self, hwnd, rect=(0, 0, 0, 0)):
+        """윈도우를 맨 위에 추가합니다."""
+        self.stack.insert(0, hwnd)
+        self.rects[hwnd] = rect
+
+    def add_child(self, hwnd, root, rect=(0, 0, 0, 0)):
+        """최상위 창 root 안의 자식 창을 추가합니다. 자식 창은 Z-order 목록에 없습니다."""
+        self.roots[hwnd] = root
+        self.rects[hwnd] = rect
+
+    def create_overlay(self):
+        hwnd = self.next_overlay
+        self.next_overlay += 1
+        self.add_window(hwnd)
+        return hwnd
+
+    def bring_to_front(self, hwnd):
+        self.stack.remove(hwnd)
+        self.stack.insert(0, hwnd)
+
+    def is_window(self, hwnd):
+        return hwnd in self.rects
+
+    def get_window_rect(self, hwnd):
+        return self.rects[hwnd]
+
+    def root(self, hwnd):
+        return self.roots.get(hwnd, hwnd)
+
+    def window_above(self, hwnd):
+        position = self.stack.index(hwnd)
+        return self.stack[position - 1] if position else 0
+
+    def set_window_pos(self, hwnd, insert_after, rect):
+        self.moves += 1
+        if rect is not None:
+            x, y, width, height = rect
+            self.rects[hwnd] = (x, y, x + width, y + height)
+        if insert_after is not None:
+            self.stack.remove(hwnd)
+            if insert_after == HWND_TOPMOST:
+                self.stack.insert(0, hwnd)
             else:
-                hWndInsertAfter = prev_hwnd
-            win32gui.SetWindowPos(self.hwnd, hWndInsertAfter, 0, 0, 0, 0, flags)
+                self.stack.insert(self.stack.index(insert_after) + 1, hwnd)
 
-        # Z-Order 출력
-        overlay_z_order = get_window_z_order(self.hwnd)
-        target_z_order = get_window_z_order(self.target_hwnd)
-        print(f"Overlay Z-order: {overlay_z_order}, Target Z-order: {target_z_order}")
+    def set_window_positions(self, positions):
+        self.batches += 1
+        for hwnd, insert_after, rect in positions:
+            if self.is_window(hwnd):
+                self.set_window_pos(hwnd, insert_after, rect)
 
-    def run(self):
-        win32gui.PumpMessages()
+    def destroy(self, hwnd):
+        if hwnd in self.rects:
+            if hwnd in self.stack:
+                self.stack.remove(hwnd)
+            del self.rects[hwnd]
+            self.roots.pop(hwnd, None)
+
+    def z_order(self, hwnd):
+        self.z_walks += 1
+        return self.stack.index(hwnd) if hwnd in self.stack else -1
+
+
+def main(target_hwnd, debug=False):
+    """대상 윈도우 하나를 가리고 대상이 닫힐 때까지 기다립니다."""
+    import time
+
+    manager = OverlayManager(debug).start()
+    manager.mask(target_hwnd)
+    try:
+        while manager.masked():
+            time.sleep(0.5)
+    finally:
+        manager.stop()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if "--simulate" in sys.argv:
+        # 가짜 이벤트로 10초 동안 MIDAS 자식 창 4개를 가리는 상황을 재현합니다. (리눅스)
+        # 루프가 메시지를 한 번 꺼낼 때마다 (여기서는 1 ms) 위치 변경을 한 번에 적용합니다.
+        seconds = 10
+        api = FakeOverlayApi()
+        for hwnd in range(1, 201):
+            api.add_window(hwnd, (0, 0, 100, 100))
+        # MIDAS 메인 창(최상위)과 그 안의 자식 창 4개
+        main_window = 100
+        api.bring_to_front(main_window)
+        panes = [1000, 1001, 1002, 1003]
+        for i, pane in enumerate(panes):
+            api.add_child(pane, main_window, (i * 120, 0, i * 120 + 100, 100))
+        batch = PositionBatch(api)
+        overlays = OverlaySet(batch)
+        for pane in panes:
+            overlays.add(pane)
+        batch.flush()
+
+        events = 0
+        for tick in range(seconds * 1000):
+            # 같은 프로세스의 다른 윈도우 이벤트 (초당 200번)
+            if tick % 5 == 0:
+                overlays.on_event("location", 50)
+                events += 1
+            # 2~4초에는 메인 창을 60 fps 로 끔. 이동 이벤트는 메인 창에만 오고
+            # 자식 창 네 개는 함께 움직임
+            if 2000 <= tick < 4000 and tick % 16 == 0:
+                for i, pane in enumerate(panes):
+                    x, y = tick + i * 120, tick % 300
+                    api.rects[pane] = (x, y, x + 100, y + 100)
+                overlays.on_event("location", main_window)
+                events += 1
+            # 1초마다 다른 윈도우가 앞으로 나왔다가 MIDAS 가 다시 앞으로 나옴
+            if tick % 1000 == 500:
+                api.bring_to_front(7)
+                overlays.on_event("foreground", 7)
+                events += 1
+            if tick % 1000 == 700:
+                api.bring_to_front(main_window)
+                overlays.on_event("foreground", main_window)
+                events += 1
+            batch.flush()
+        # 대상 하나가 닫힘
+        api.destroy(panes[-1])
+        overlays.on_event("destroy", panes[-1])
+        batch.flush()
+
+        print(
+            f"Event-driven, batched: {events} events, {api.batches} DeferWindowPos "
+            f"batches, {api.moves} window moves, {api.z_walks} z-order walks"
+        )
+        print(overlays.summary())
+        # 남은 오버레이 셋이 메인 창 바로 위에 모여 있고 자식 창 위치를 따라갔는지
+        top = api.stack.index(main_window)
+        stacked = set(api.stack[top - len(panes) + 1 : top])
+        above = stacked == {overlays.trackers[pane].overlay_hwnd for pane in panes[:-1]}
+        followed = all(
+            api.rects[overlays.trackers[pane].overlay_hwnd]
+            == (
+                api.rects[pane][0] - MARGIN,
+                api.rects[pane][1] - MARGIN,
+                api.rects[pane][2] + MARGIN,
+                api.rects[pane][3] + MARGIN,
+            )
+            for pane in panes[:-1]
+        )
+        print(f"Overlays directly above the main window: {above}")
+        print(f"Overlays follow their panes: {followed}")
+        sys.exit(0)
 
-def main(target_hwnd):
-    overlay = OverlayWindow(target_hwnd)
-    overlay.run()
+    import win32gui
 
-if __name__ == '__main__':
     # 대상 윈도우 제목을 사용하여 핸들 얻기
-    target_title = '파일 탐색기'  # 여기에 대상 윈도우의 제목을 입력하세요
+    target_title = "파일 탐색기"  # 여기에 대상 윈도우의 제목을 입력하세요
     target_hwnd = win32gui.FindWindow(None, target_title)
     if target_hwnd:
-        main(target_hwnd)
+        main(target_hwnd, debug="--debug-z-order" in sys.argv)
     else:
-        print('Target window not found.')
+        print("Target window not found.")
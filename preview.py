@@ -0,0 +1,165 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from logs import get_logger
+
+log = get_logger("preview")
+
+# 미리보기 최대 갱신 횟수 (초당). MIDAS_LINKER_PREVIEW_FPS 로 바꿀 수 있음
+DEFAULT_MAX_FPS = 10
+
+
+def fit_size(width, height, box_width, box_height):
+    """비율을 유지하면서 상자 안에 들어가는 가장 큰 크기를 반환합니다."""
+    scale = min(box_width / width, box_height / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def scale_frame(frame, box_width, box_height):
+    """프레임을 상자 크기에 맞게 줄인 (H, W, 4) BGRX 배열을 반환합니다."""
+    size = fit_size(frame.width, frame.height, box_width, box_height)
+    if size == (frame.width, frame.height):
+        return frame.bgrx.copy()
+    # INTER_AREA 는 2560x1440 에서 20배 가까이 느려서 미리보기에는 선형 보간을 씀
+    return cv2.resize(frame.bgrx, size, interpolation=cv2.INTER_LINEAR)
+
+
+class PreviewRenderer:
+    """클릭한 윈도우의 미리보기를 작업 스레드에서 캡처하고 줄입니다.
+
+    요청은 hwnd 하나만 보관하므로 그리는 속도보다 클릭이 빠르면 중간 요청은 버리고
+    가장 최근 것만 그립니다. 갱신 간격은 max_fps 로 제한합니다. on_frame(hwnd, image)
+    은 작업 스레드에서 호출되며 image 는 BGRX 배열이거나 캡처 실패 시 None 입니다.
+    """
+
+    def __init__(self, capture_engine, on_frame, size, max_fps=None):
+        self.capture_engine = capture_engine
+        self.on_frame = on_frame
+        self.size = size
+        if max_fps is None:
+            max_fps = float(os.environ.get("MIDAS_LINKER_PREVIEW_FPS", DEFAULT_MAX_FPS))
+        self.interval = 1 / max_fps if max_fps > 0 else 0
+        self.condition = threading.Condition()
+        self.pending = None
+        self.stopped = False
+        self.thread = None
+        # 통계
+        self.requested = 0
+        self.rendered = 0
+        self.dropped = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=1):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def request(self, hwnd):
+        """hwnd 미리보기를 요청합니다. 아직 그리지 않은 이전 요청은 버립니다."""
+        with self.condition:
+            self.requested += 1
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = hwnd
+            self.condition.notify()
+
+    def next_request(self, not_before):
+        """다음 요청을 기다립니다. not_before 전까지는 요청을 모으기만 합니다."""
+        with self.condition:
+            while not self.stopped:
+                now = time.perf_counter()
+                if self.pending is not None and now >= not_before:
+                    hwnd, self.pending = self.pending, None
+                    return hwnd
+                self.condition.wait(
+                    None if self.pending is None else not_before - now
+                )
+            return None
+
+    def run(self):
+        not_before = 0
+        while True:
+            hwnd = self.next_request(not_before)
+            if hwnd is None:
+                return
+            started = time.perf_counter()
+            not_before = started + self.interval
+            self.on_frame(hwnd, self.render(hwnd))
+            self.rendered += 1
+
+    def render(self, hwnd):
+        try:
+            frame = self.capture_engine.capture(hwnd)
+        except Exception as e:
+            log.warning("Preview capture failed for hwnd %s: %s", hwnd, e)
+            return None
+        if frame is None:
+            return None
+        return scale_frame(frame, *self.size)
+
+    def summary(self):
+        return (
+            f"Preview frames requested {self.requested}, rendered {self.rendered}, "
+            f"dropped {self.dropped}"
+        )
+
+
+if __name__ == "__main__":
+    # 빠른 클릭 폭주에서 미리보기가 요청을 합치고 FPS 를 지키는지 리눅스에서 측정합니다.
+    import sys
+
+    from capture import CaptureEngine, MemoryFrameSource
+
+    rng = np.random.default_rng(0)
+    hwnds = range(1, 5)
+    source = MemoryFrameSource(
+        {
+            hwnd: rng.integers(0, 255, (1440, 2560, 4), dtype=np.uint8)
+            for hwnd in hwnds
+        }
+    )
+    engine = CaptureEngine(source)
+    max_fps = float(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_MAX_FPS
+    clicks = 500
+    frame_times = []
+
+    def on_frame(hwnd, image):
+        frame_times.append(time.perf_counter())
+
+    renderer = PreviewRenderer(engine, on_frame, (800, 400), max_fps).start()
+
+    # 이전 방식: 클릭마다 호출한 스레드에서 캡처하고 줄임
+    start = time.perf_counter()
+    for i in range(50):
+        scale_frame(engine.capture(hwnds[i % len(hwnds)]), 800, 400)
+    inline = (time.perf_counter() - start) / 50
+    print(f"Inline capture + scale per click: {inline * 1000:.2f} ms")
+
+    start = time.perf_counter()
+    for i in range(clicks):
+        renderer.request(hwnds[i % len(hwnds)])
+        time.sleep(0.002)
+    posted = time.perf_counter() - start
+    time.sleep(renderer.interval + 0.2)
+    renderer.stop()
+    print(
+        f"{clicks} clicks posted in {posted:.2f} s "
+        f"({posted / clicks * 1e6:.0f} us per click incl. 2 ms sleep)"
+    )
+    print(renderer.summary())
+    if len(frame_times) > 1:
+        gaps = np.diff(frame_times)
+        print(
+            f"Preview rate {1 / gaps.mean():.1f} fps (cap {max_fps:g}), "
+            f"min gap {gaps.min() * 1000:.1f} ms"
+        )
@@ -0,0 +1,199 @@
+import threading
+import time
+from collections import OrderedDict
+
+# 프로세스가 없을 때의 이름
+UNKNOWN = "Unknown"
+
+
+class PsutilProcessProvider:
+    """psutil 로 프로세스 생성 시간과 이름을 조회합니다."""
+
+    def __init__(self):
+        import psutil
+
+        self.psutil = psutil
+
+    def create_time(self, pid):
+        """프로세스 생성 시간을 반환합니다. 프로세스가 없거나 읽을 수 없으면 None 을 반환합니다."""
+        try:
+            return self.psutil.Process(pid).create_time()
+        except (self.psutil.NoSuchProcess, self.psutil.AccessDenied):
+            return None
+
+    def lookup(self, pid):
+        """(생성 시간, 프로그램 이름) 을 한 번의 Process 생성으로 조회합니다.
+
+        생성 시간을 읽을 수 없으면 (AccessDenied) None 과 이름을, 프로세스가 없으면 (None, UNKNOWN) 을 반환합니다.
+        """
+        try:
+            process = self.psutil.Process(pid)
+        except self.psutil.NoSuchProcess:
+            return None, UNKNOWN
+        try:
+            create_time = process.create_time()
+        except self.psutil.AccessDenied:
+            create_time = None
+        except self.psutil.NoSuchProcess:
+            return None, UNKNOWN
+        try:
+            return create_time, process.name()
+        except self.psutil.NoSuchProcess:
+            return None, UNKNOWN
+
+
+class ProcessNameCache:
+    """(pid, 생성 시간) 으로 키를 잡는 LRU 프로세스 이름 캐시입니다.
+
+    PID 가 재사용되면 생성 시간이 달라지므로 다른 항목으로 취급됩니다.
+    검증은 verify_interval 초마다 pid 당 한 번만 수행합니다. 생성 시간을 읽을 수 없는 프로세스는
+    생성 시간 None 으로 저장하고 검증할 때 이름을 다시 조회해 비교합니다.
+    """
+
+    def __init__(self, provider, max_size=256, verify_interval=2.0, clock=time.monotonic):
+        self.provider = provider
+        self.max_size = max_size
+        self.verify_interval = verify_interval
+        self.clock = clock
+        self.names = OrderedDict()  # (pid, create_time) -> 프로그램 이름
+        self.identities = {}  # pid -> (create_time, 마지막 검증 시각)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def get_name(self, pid):
+        """pid 의 프로그램 이름을 반환합니다."""
+        now = self.clock()
+        with self.lock:
+            identity = self.identities.get(pid)
+            if identity is not None:
+                create_time, verified_at = identity
+                if now - verified_at < self.verify_interval:
+                    name = self.names.get((pid, create_time))
+                    if name is not None:
+                        self.names.move_to_end((pid, create_time))
+                        self.hits += 1
+                        return name
+
+        if identity is not None and identity[0] is None:
+            # 생성 시간이 없는 항목은 이름을 다시 조회해 같은 프로세스인지 확인
+            create_time, name = self.provider.lookup(pid)
+            with self.lock:
+                if create_time is None and name == self.names.get((pid, None)):
+                    self.identities[pid] = (None, now)
+                    self.names.move_to_end((pid, None))
+                    self.hits += 1
+                    return name
+                self.invalidate_locked(pid)
+                self.misses += 1
+                return self.store_locked(pid, create_time, name, now)
+
+        if identity is not None:
+            # 검증 주기가 지났으면 생성 시간만 다시 확인
+            current_time = self.provider.create_time(pid)
+            with self.lock:
+                name = self.names.get((pid, current_time))
+                if current_time is not None and name is not None:
+                    self.identities[pid] = (current_time, now)
+                    self.names.move_to_end((pid, current_time))
+                    self.hits += 1
+                    return name
+                # 종료됐거나, 생성 시간을 읽을 수 없게 됐거나, PID 가 다른 프로세스에 재사용됨
+                self.invalidate_locked(pid)
+
+        create_time, name = self.provider.lookup(pid)
+        with self.lock:
+            self.misses += 1
+            return self.store_locked(pid, create_time, name, now)
+
+    def store_locked(self, pid, create_time, name, now):
+        """조회 결과를 저장하고 이름을 반환합니다. 없는 프로세스는 저장하지 않습니다."""
+        if create_time is None and name == UNKNOWN:
+            return name
+        self.names[(pid, create_time)] = name
+        self.identities[pid] = (create_time, now)
+        while len(self.names) > self.max_size:
+            (old_pid, old_time), _ = self.names.popitem(last=False)
+            # 생성 시간이 None 인 항목도 있으므로 기본값으로 비교하지 않음
+            identity = self.identities.get(old_pid)
+            if identity is not None and identity[0] == old_time:
+                del self.identities[old_pid]
+            self.evictions += 1
+        return name
+
+    def invalidate(self, pid):
+        """프로세스가 종료되었을 때 해당 pid 의 항목을 제거합니다."""
+        with self.lock:
+            self.invalidate_locked(pid)
+
+    def invalidate_locked(self, pid):
+        identity = self.identities.pop(pid, None)
+        if identity is not None:
+            self.names.pop((pid, identity[0]), None)
+            self.invalidations += 1
+
+    def clear(self):
+        with self.lock:
+            self.names.clear()
+            self.identities.clear()
+
+    def stats(self):
+        """캐시 적중/실패 카운터를 반환합니다."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "evictions": self.evictions,
+                "size": len(self.names),
+            }
+
+
+class StubProcessProvider:
+    """테스트와 벤치마크용 가짜 프로세스 테이블입니다."""
+
+    def __init__(self, processes=None):
+        self.processes = dict(processes or {})  # pid -> (create_time, name)
+        self.queries = 0
+
+    def create_time(self, pid):
+        self.queries += 1
+        entry = self.processes.get(pid)
+        return entry[0] if entry else None
+
+    def lookup(self, pid):
+        self.queries += 1
+        entry = self.processes.get(pid)
+        if entry is None:
+            return None, UNKNOWN
+        return entry
+
+
+if __name__ == "__main__":
+    # 수천 개의 윈도우가 수십 개의 PID 에 속한 상황을 흉내냅니다.
+    provider = StubProcessProvider(
+        {pid: (1000.0 + pid, f"program{pid}.exe") for pid in range(1, 41)}
+    )
+    cache = ProcessNameCache(provider)
+    for window in range(20000):
+        cache.get_name(window % 40 + 1)
+    print(f"20000 lookups, {provider.queries} provider queries, stats: {cache.stats()}")
+
+    # PID 재사용 감지
+    provider.processes[7] = (5000.0, "reused.exe")
+    cache.verify_interval = 0
+    assert cache.get_name(7) == "reused.exe"
+    # 프로세스 종료
+    del provider.processes[8]
+    assert cache.get_name(8) == UNKNOWN
+    # 생성 시간을 읽을 수 없는 프로세스 (AccessDenied) 는 이름으로 다시 확인
+    provider.processes[9] = (None, "protected.exe")
+    assert cache.get_name(9) == "protected.exe"
+    assert cache.get_name(9) == "protected.exe"
+    provider.processes[9] = (None, "other.exe")
+    assert cache.get_name(9) == "other.exe"
+    del provider.processes[9]
+    assert cache.get_name(9) == UNKNOWN
+    print(f"after reuse/exit/access denied: {cache.stats()}")
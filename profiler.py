@@ -0,0 +1,243 @@
+import json
+import os
+import threading
+import time
+
+# 단계 요약표의 열 순서. 뒤의 세 개는 앞 단계 안에서 일어나는 세부 구간
+PHASES = (
+    "lookup",
+    "skip",
+    "wait",
+    "cursor_move",
+    "auto_position",
+    "pace",
+    "click",
+    "preview",
+)
+SUB_PHASES = ("capture", "match", "scroll")
+
+
+class NullSpan:
+    """프로파일러가 꺼져 있을 때 쓰는 아무것도 하지 않는 구간입니다."""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+class NullProfiler:
+    """꺼진 프로파일러입니다. span() 은 미리 만든 NullSpan 하나를 돌려줍니다."""
+
+    enabled = False
+
+    def span(self, name, step=None):
+        return NULL_SPAN
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class Span:
+    """with 블록 하나의 시작과 끝을 기록합니다."""
+
+    __slots__ = ("profiler", "name", "step", "start")
+
+    def __init__(self, profiler, name, step):
+        self.profiler = profiler
+        self.name = name
+        self.step = step
+
+    def __enter__(self):
+        self.start = self.profiler.clock()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        profiler = self.profiler
+        # list.append 는 GIL 아래에서 원자적이므로 여러 엔진이 함께 써도 됨
+        profiler.spans.append(
+            (
+                self.name,
+                self.step,
+                self.start,
+                profiler.clock(),
+                threading.get_ident(),
+            )
+        )
+        return False
+
+
+class StepProfiler:
+    """단계별 실행 구간(찾기, 조건 확인, 대기, 클릭 등)을 기록합니다.
+
+    기록은 Chrome trace-event JSON (chrome://tracing, Perfetto) 과 단계별 요약표로 내보냅니다.
+    """
+
+    enabled = True
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.origin = clock()
+        self.spans = []  # (이름, 단계 번호, 시작, 끝, 스레드)
+
+    def span(self, name, step=None):
+        return Span(self, name, step)
+
+    def trace_events(self):
+        """Chrome trace-event 형식의 이벤트 목록을 반환합니다. 시간 단위는 마이크로초입니다."""
+        pid = os.getpid()
+        events = []
+        threads = {}
+        for name, step, start, end, thread in self.spans:
+            threads.setdefault(thread, len(threads))
+            event = {
+                "name": name,
+                "cat": "step" if name == "step" else "phase",
+                "ph": "X",
+                "ts": round((start - self.origin) * 1e6, 1),
+                "dur": round((end - start) * 1e6, 1),
+                "pid": pid,
+                "tid": thread,
+            }
+            if step is not None:
+                event["args"] = {"step": step}
+            events.append(event)
+        for thread, number in threads.items():
+            events.append(
+                {
+                    "name": "thread_name",
+                    "ph": "M",
+                    "pid": pid,
+                    "tid": thread,
+                    "args": {"name": f"macro {number}"},
+                }
+            )
+        return events
+
+    def write_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"traceEvents": self.trace_events(), "displayTimeUnit": "ms"}, f
+            )
+
+    def step_totals(self):
+        """단계 번호 -> {구간 이름: 초} 를 반환합니다. 같은 구간이 여러 번이면 더합니다."""
+        totals = {}
+        for name, step, start, end, _ in self.spans:
+            if step is None:
+                continue
+            phases = totals.setdefault(step, {})
+            phases[name] = phases.get(name, 0.0) + (end - start)
+        return totals
+
+    def summary_table(self):
+        """단계별 구간 시간(ms) 표를 문자열로 반환합니다. 기록된 구간의 열만 보여줍니다."""
+        totals = self.step_totals()
+        used = {name for phases in totals.values() for name in phases}
+        columns = [name for name in PHASES + SUB_PHASES if name in used]
+        header = f"{'step':>6} {'total':>9} " + " ".join(
+            f"{name:>13}" for name in columns
+        )
+        lines = [header, "-" * len(header)]
+        sums = {}
+        for step in sorted(totals):
+            phases = totals[step]
+            for name, seconds in phases.items():
+                sums[name] = sums.get(name, 0.0) + seconds
+            lines.append(self.table_row(str(step), phases, columns))
+        lines.append("-" * len(header))
+        lines.append(self.table_row("all", sums, columns))
+        return "\n".join(lines)
+
+    @staticmethod
+    def table_row(label, phases, columns):
+        cells = " ".join(
+            f"{phases[name] * 1000:13.2f}" if name in phases else f"{'':>13}"
+            for name in columns
+        )
+        return f"{label:>6} {phases.get('step', 0.0) * 1000:9.2f} {cells}"
+
+
+if __name__ == "__main__":
+    # 가짜 데스크톱에서 프로파일러를 켜고 끈 실행 시간을 비교하고 예시 추적 파일을 씁니다. (리눅스)
+    import sys
+    import tempfile
+
+    from capture import MemoryFrameSource
+    from macro_engine import Desktop, MacroEngine
+    from process_cache import ProcessNameCache, StubProcessProvider
+    from window_index import FakeWindowBackend
+    from window_watcher import ScriptedEventSource
+
+    class NullInput:
+        def send_click(self, hwnd, x, y, click_type, menu=False):
+            pass
+
+        def send_keys(self, hwnd, keys):
+            pass
+
+        def move_cursor_before_click(self):
+            pass
+
+    backend = FakeWindowBackend()
+    backend.processes[1] = "MidasGen.exe"
+    main = backend.add_window(0, "MidasMain", "MIDAS", 1)
+    for i in range(20):
+        backend.add_window(main, "Button", f"Button {i}", 1)
+    steps = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    click_data_list = [
+        {
+            "window_class": "Button",
+            "window_text": f"Button {i % 20}",
+            "depth": 2,
+            "program": "MidasGen.exe",
+            "x": 5,
+            "y": 5,
+            "keyboard": "ok{enter}" if i % 10 == 0 else "",
+            "is_cursor_move": i % 3 == 0,
+        }
+        for i in range(steps)
+    ]
+
+    def run(profiler):
+        desktop = Desktop(
+            backend,
+            MemoryFrameSource(),
+            ScriptedEventSource([]),
+            ProcessNameCache(StubProcessProvider()),
+        )
+        engine = MacroEngine(
+            desktop=desktop, input_backend=NullInput(), profiler=profiler
+        )
+        plan = engine.compile(click_data_list)
+        start = time.perf_counter()
+        engine.run(plan)
+        return time.perf_counter() - start
+
+    # 엔진의 통계 출력은 숨김
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    try:
+        off = min(run(None) for _ in range(3))
+        on_profiler = StepProfiler()
+        on = run(on_profiler)
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+
+    print(f"{steps} steps: profiler off {off * 1000:.1f} ms, on {on * 1000:.1f} ms")
+    print(
+        f"Overhead per step: off {off / steps * 1e6:.1f} us total, "
+        f"on +{(on - off) / steps * 1e6:.1f} us, {len(on_profiler.spans)} spans"
+    )
+    path = os.path.join(tempfile.gettempdir(), "midas_linker_trace.json")
+    on_profiler.write_chrome_trace(path)
+    print(f"Chrome trace written to {path}")
+    table = on_profiler.summary_table().splitlines()
+    print("\n".join(table[:6] + ["   ..."] + table[-2:]))
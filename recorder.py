@@ -0,0 +1,376 @@
+import math
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger("recorder")
+
+# 버튼을 누른 곳과 뗀 곳이 이 거리(픽셀) 이상 떨어지면 드래그로 기록
+DRAG_THRESHOLD = 5
+
+
+def new_click_info(x, y, click_type, window_class, window_text, depth, program):
+    """녹화된 클릭 하나의 기본 설정을 만듭니다. (hwnd는 저장하지 않음)"""
+    return {
+        "x": x,
+        "y": y,
+        "click_type": click_type,
+        "window_class": window_class,
+        "window_text": window_text,
+        "window_title": window_text,  # 윈도우 창 이름
+        "depth": depth,
+        "program": program,
+        "is_skip": False,
+        "skip_image_path": "",
+        "skip_image_target": {},
+        "is_wait": False,
+        "wait_image_path": "",
+        "wait_image_target": {},
+        "keyboard": "",
+        "is_cursor_move": False,
+        "is_auto_position": False,
+        "auto_position_path": "",
+        "auto_position_target": {},
+    }
+
+
+class EventRing:
+    """생산자 하나, 소비자 하나가 락 없이 쓰는 고정 크기 링 버퍼입니다.
+
+    생산자는 tail 만, 소비자는 head 만 바꿉니다. 칸을 채운 뒤에 tail 을 옮기므로 소비자는
+    다 쓰인 칸만 읽습니다. 가득 차면 새 이벤트를 버리고 dropped 를 늘립니다.
+    """
+
+    def __init__(self, capacity=4096):
+        self.capacity = capacity
+        self.slots = [None] * capacity
+        self.head = 0  # 다음에 읽을 위치 (소비자만 변경)
+        self.tail = 0  # 다음에 쓸 위치 (생산자만 변경)
+        self.dropped = 0
+
+    def __len__(self):
+        return self.tail - self.head
+
+    def push(self, event):
+        tail = self.tail
+        if tail - self.head >= self.capacity:
+            self.dropped += 1
+            return False
+        self.slots[tail % self.capacity] = event
+        self.tail = tail + 1
+        return True
+
+    def pop_all(self):
+        """쌓인 이벤트를 모두 꺼냅니다."""
+        head = self.head
+        tail = self.tail
+        events = []
+        while head < tail:
+            slot = head % self.capacity
+            events.append(self.slots[slot])
+            self.slots[slot] = None
+            head += 1
+        self.head = head
+        return events
+
+
+def key_text(key):
+    """pynput 키를 keyboard 필드 문자열로 바꿉니다. 기록하지 않는 키면 None 입니다."""
+    from macro_plan import KEY_NAMES
+
+    char = getattr(key, "char", None)
+    if char:
+        # 제어 문자 (Ctrl 조합 등) 는 PostMessage 로 재현할 수 없으므로 버림
+        if not char.isprintable():
+            return None
+        return "{{" if char == "{" else char
+    name = getattr(key, "name", None)
+    if name == "space":
+        return " "
+    if name in KEY_NAMES:
+        return "{" + name + "}"
+    return None
+
+
+class ClickRecorder:
+    """녹화 중 훅은 원시 이벤트만 링 버퍼에 넣고, 작업 스레드가 클릭 정보를 채웁니다.
+
+    저수준 마우스/키보드 훅 콜백이 늦으면 시스템 전체 입력이 밀리고 훅이 해제될 수 있으므로
+    훅에서는 WindowFromPoint 외에 아무것도 조회하지 않습니다. 훅 스레드마다 링 버퍼를 따로
+    두어 각 버퍼의 생산자는 하나뿐입니다.
+
+    버튼을 뗄 때 클릭 또는 드래그 단계 하나가 만들어지고, 직전 단계와의 간격이 delay 로
+    기록됩니다. on_click(click_info, hwnd) 과 키 입력 묶음 on_keys(text) 는 작업 스레드에서
+    호출되며, 키 입력은 직전에 기록된 단계의 keyboard 에 붙입니다.
+    """
+
+    def __init__(
+        self,
+        window_backend,
+        on_click,
+        on_keys=None,
+        excluded_hwnds=(),
+        capacity=4096,
+        poll_interval=0.01,
+        clock=time.perf_counter,
+    ):
+        self.window_backend = window_backend
+        self.window_from_point = window_backend.window_from_point
+        self.on_click = on_click
+        self.on_keys = on_keys
+        self.excluded_hwnds = excluded_hwnds
+        self.ring = EventRing(capacity)
+        self.key_ring = EventRing(capacity)
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.stopping = threading.Event()
+        self.thread = None
+        # (hwnd, pid) -> (클래스 이름, 깊이). 녹화 한 번 동안만 유지
+        self.identities = {}
+        # 아직 떼지 않은 버튼 (x, y, button, 시각, hwnd)
+        self.pressed = None
+        # 마지막으로 기록한 단계의 버튼을 누른 시각
+        self.last_step_time = None
+        # 마지막 클릭이 무시되었으면 (자신의 GUI 등) 그 뒤의 키 입력도 기록하지 않음
+        self.typing_recorded = False
+        # 통계
+        self.recorded = 0
+        self.ignored = 0
+        self.failed = 0
+        self.drags = 0
+        self.keys = 0
+        self.cache_hits = 0
+        self.max_latency = 0.0
+
+    def on_mouse_click(self, x, y, button, pressed):
+        """pynput 마우스 훅 스레드에서 호출됩니다. 이벤트를 넣기만 하고 바로 돌아갑니다."""
+        hwnd = self.window_from_point(x, y) if pressed else 0
+        self.ring.push((self.clock(), x, y, button, pressed, hwnd))
+
+    def on_key_press(self, key):
+        """pynput 키보드 훅 스레드에서 호출됩니다."""
+        self.key_ring.push((self.clock(), key))
+
+    def start(self):
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=2):
+        """작업 스레드를 멈춥니다. 남은 이벤트는 처리한 뒤 멈춥니다."""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def run(self):
+        while True:
+            stopping = self.stopping.is_set()
+            # 두 버퍼의 이벤트를 시각 순서로 합침
+            events = self.ring.pop_all() + self.key_ring.pop_all()
+            events.sort(key=lambda event: event[0])
+            typed = []
+            for event in events:
+                if len(event) == 2:
+                    text = key_text(event[1])
+                    if text is not None:
+                        typed.append(text)
+                    continue
+                if typed:
+                    self.flush_keys(typed)
+                    typed = []
+                self.process(*event)
+            if typed:
+                self.flush_keys(typed)
+            if stopping:
+                return
+            if not events:
+                self.stopping.wait(self.poll_interval)
+
+    def flush_keys(self, typed):
+        """모인 키 입력을 한 번에 넘깁니다. 아직 기록된 단계가 없으면 버립니다."""
+        if not self.typing_recorded or self.on_keys is None:
+            return
+        self.keys += len(typed)
+        self.on_keys("".join(typed))
+
+    def process(self, timestamp, x, y, button, pressed, hwnd):
+        if pressed:
+            self.pressed = (x, y, button, timestamp, hwnd)
+            return
+        if self.pressed is None or self.pressed[2] != button:
+            # 녹화를 시작하기 전에 누른 버튼
+            return
+        start_x, start_y, _, started, hwnd = self.pressed
+        self.pressed = None
+        if not hwnd or hwnd in self.excluded_hwnds:
+            # 자신의 GUI나 설정 다이얼로그에서의 클릭은 무시
+            self.ignored += 1
+            self.typing_recorded = False
+            return
+        end = None
+        if math.hypot(x - start_x, y - start_y) >= DRAG_THRESHOLD:
+            end = (x, y)
+        try:
+            click_info = self.enrich(start_x, start_y, button, hwnd, end)
+        except Exception as e:
+            # 클릭 직후 윈도우가 닫힌 경우 등
+            log.warning("Failed to record click at (%d, %d): %s", start_x, start_y, e)
+            self.failed += 1
+            self.typing_recorded = False
+            return
+        if self.last_step_time is not None:
+            click_info["delay"] = round(started - self.last_step_time, 3)
+        self.last_step_time = started
+        self.typing_recorded = True
+        self.recorded += 1
+        self.max_latency = max(self.max_latency, self.clock() - timestamp)
+        self.on_click(click_info, hwnd)
+
+    def enrich(self, x, y, button, hwnd, end=None):
+        """원시 이벤트에 윈도우 정보를 채워 클릭 정보를 만듭니다. end 는 드래그 끝 화면 좌표입니다."""
+        backend = self.window_backend
+        left, top, _, _ = backend.get_window_rect(hwnd)
+        pid = backend.get_process_id(hwnd)
+        window_class, depth = self.identity(hwnd, pid)
+        left_button = getattr(button, "name", button) == "left"
+        click_type = "Click" if left_button else "Right Click"
+        if end is not None and left_button:
+            click_type = "Drag"
+        click_info = new_click_info(
+            x - left,
+            y - top,
+            click_type,
+            window_class,
+            backend.get_window_text(hwnd),
+            depth,
+            # 프로세스 이름은 프로세스 캐시에서 조회
+            backend.get_process_name(pid),
+        )
+        if click_type == "Drag":
+            self.drags += 1
+            click_info["end_x"] = end[0] - left
+            click_info["end_y"] = end[1] - top
+        return click_info
+
+    def identity(self, hwnd, pid):
+        """클래스 이름과 깊이를 반환합니다. 같은 윈도우는 부모를 다시 따라가지 않습니다."""
+        key = (hwnd, pid)
+        identity = self.identities.get(key)
+        if identity is not None:
+            self.cache_hits += 1
+            return identity
+        depth = 0
+        parent = hwnd
+        while parent:
+            parent = self.window_backend.get_parent(parent)
+            depth += 1
+        identity = self.identities[key] = (
+            self.window_backend.get_class_name(hwnd),
+            depth,
+        )
+        return identity
+
+    def summary(self):
+        return (
+            f"Clicks recorded {self.recorded}, ignored {self.ignored}, "
+            f"failed {self.failed}, drags {self.drags}, keys {self.keys}, "
+            f"dropped {self.ring.dropped + self.key_ring.dropped}, "
+            f"window cache hits {self.cache_hits}, "
+            f"max hook-to-record latency {self.max_latency * 1000:.1f} ms"
+        )
+
+
+if __name__ == "__main__":
+    # 클릭 폭주에서 훅 콜백이 마이크로초 단위로 끝나는지 리눅스에서 측정합니다.
+    import random
+
+    from window_index import FakeWindowBackend
+
+    class SlowWindowBackend(FakeWindowBackend):
+        """psutil 과 윈도우 API 호출 비용을 흉내 냅니다. 프로세스 이름은 처음만 느립니다."""
+
+        def get_process_name(self, pid):
+            if pid not in self.looked_up:
+                self.looked_up.add(pid)
+                time.sleep(0.005)
+            return super().get_process_name(pid)
+
+        def get_parent(self, hwnd):
+            time.sleep(0.00002)
+            return super().get_parent(hwnd)
+
+    class KeyStub:
+        """pynput KeyCode 처럼 char 만 가진 키입니다."""
+
+        def __init__(self, char):
+            self.char = char
+
+    backend = SlowWindowBackend()
+    backend.looked_up = set()
+    for pid in range(1, 9):
+        backend.processes[pid] = f"program{pid}.exe"
+    for i in range(8):
+        # 화면을 세로 띠로 나눈 최상위 윈도우와 그 안의 자식 윈도우
+        rect = (i * 240, 0, (i + 1) * 240, 1080)
+        top = backend.add_window(0, "TopLevel", f"Window {i}", i + 1, rect=rect)
+        parent = top
+        for depth in range(6):
+            parent = backend.add_window(
+                parent, "Child", f"Child {i}.{depth}", i + 1, rect=rect
+            )
+
+    storm = 10000
+    recorded = []
+    typed = []
+    recorder = ClickRecorder(
+        backend, lambda info, hwnd: recorded.append(info), typed.append
+    )
+    points = [(random.randrange(1920), random.randrange(1080)) for _ in range(storm)]
+
+    # 이전 방식: 훅 안에서 바로 클릭 정보를 채움
+    inline = []
+    for x, y in points[:200]:
+        # 이전 방식은 클릭마다 부모를 따라감
+        recorder.identities.clear()
+        start = time.perf_counter()
+        recorder.enrich(x, y, "left", backend.window_from_point(x, y))
+        inline.append(time.perf_counter() - start)
+    recorder.identities.clear()
+    recorder.cache_hits = 0
+    backend.looked_up.clear()
+
+    recorder.start()
+    hook = []
+    start_storm = time.perf_counter()
+    for i, (x, y) in enumerate(points):
+        start = time.perf_counter()
+        recorder.on_mouse_click(x, y, "left", True)
+        hook.append(time.perf_counter() - start)
+        # 네 번에 한 번은 끌어서 놓음
+        end_x = x + 40 if i % 4 == 0 else x
+        start = time.perf_counter()
+        recorder.on_mouse_click(end_x, y, "left", False)
+        hook.append(time.perf_counter() - start)
+        start = time.perf_counter()
+        recorder.on_key_press(KeyStub("a"))
+        hook.append(time.perf_counter() - start)
+        if i % 10 == 0:
+            # 훅 스레드처럼 사이사이 GIL 을 내어줌 (약 10,000 클릭/초)
+            time.sleep(0.0005)
+    storm_time = time.perf_counter() - start_storm
+    recorder.stop(timeout=60)
+
+    hook.sort()
+    inline.sort()
+    print(
+        f"Inline enrichment in hook: median {inline[len(inline) // 2] * 1e6:.0f} us, "
+        f"max {inline[-1] * 1e6:.0f} us"
+    )
+    print(
+        f"Ring buffer hook callback: median {hook[len(hook) // 2] * 1e6:.1f} us, "
+        f"p99 {hook[int(len(hook) * 0.99)] * 1e6:.1f} us, max {hook[-1] * 1e6:.0f} us"
+    )
+    print(f"{storm} clicks with keystrokes in {storm_time:.2f} s")
+    print(recorder.summary())
@@ -0,0 +1,129 @@
+import argparse
+import json
+import signal
+import sys
+
+from diagnostics import LEVELS, MatchDiagnostics
+from logs import setup_logging, shutdown_logging
+from macro_engine import CANCELLED, FAILED_STATUSES, MacroEngine, parse_speed
+from macro_format import load_macro
+from macro_plan import PlanError
+from profiler import StepProfiler
+
+EXIT_OK = 0
+EXIT_STEP_FAILED = 1
+EXIT_BAD_MACRO = 2
+EXIT_CANCELLED = 130
+
+
+def write_timings(path, results):
+    """단계별 결과를 한 줄에 하나씩 JSON 으로 저장합니다."""
+    with open(path, "w", encoding="utf-8") as f:
+        for result in results:
+            f.write(json.dumps(result.to_dict(), ensure_ascii=False) + "\n")
+
+
+def exit_code(results):
+    """실행 결과로 종료 코드를 정합니다."""
+    if any(result.status == CANCELLED for result in results):
+        return EXIT_CANCELLED
+    for result in results:
+        if result.status in FAILED_STATUSES:
+            return EXIT_STEP_FAILED
+        if any(record.outcome == "timeout" for record in result.waits):
+            return EXIT_STEP_FAILED
+    return EXIT_OK
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="저장된 클릭 매크로를 GUI 없이 실행합니다."
+    )
+    parser.add_argument("macro", help="저장된 매크로 파일 (JSON 또는 .mlnk)")
+    parser.add_argument(
+        "--timings", help="단계별 결과와 소요 시간을 저장할 JSON Lines 파일"
+    )
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default="fast",
+        help="재생 속도: fast (조건 대기만, 기본값), realtime (녹화 간격대로) 또는 배속 숫자",
+    )
+    parser.add_argument(
+        "--mask",
+        action="store_true",
+        help="실행 중인 단계의 대상 윈도우를 반투명 오버레이로 가림",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="TRACE",
+        help="단계별 구간 시간을 Chrome trace JSON 으로 저장하고 요약표를 출력",
+    )
+    parser.add_argument(
+        "--log-level",
+        help="로그 수준. 예: info,match=debug,wait=warning (기본값: MIDAS_LINKER_LOG 또는 info)",
+    )
+    parser.add_argument(
+        "--log-json",
+        metavar="PATH",
+        help="모든 로그를 JSON Lines 로 저장할 파일 (기본값: MIDAS_LINKER_LOG_JSON)",
+    )
+    parser.add_argument(
+        "--diagnostics",
+        choices=LEVELS,
+        help="이미지 매칭 디버그 이미지 저장 수준 (기본값: MIDAS_LINKER_DIAGNOSTICS)",
+    )
+    args = parser.parse_args(argv)
+
+    try:
+        setup_logging(args.log_level, args.log_json)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+
+    try:
+        click_data_list = load_macro(args.macro)
+    except (OSError, ValueError) as e:
+        print(f"Failed to load macro '{args.macro}': {e}", file=sys.stderr)
+        return EXIT_BAD_MACRO
+
+    masker = None
+    if args.mask:
+        from overlay import OverlayManager
+
+        masker = OverlayManager().start()
+    profiler = StepProfiler() if args.profile else None
+    engine = MacroEngine(speed=args.speed, masker=masker, profiler=profiler)
+    if args.diagnostics:
+        engine.diagnostics = MatchDiagnostics(level=args.diagnostics)
+    try:
+        plan = engine.compile(click_data_list)
+    except PlanError as e:
+        print(f"Failed to load macro '{args.macro}': {e}", file=sys.stderr)
+        return EXIT_BAD_MACRO
+
+    # Ctrl+C 는 실행 스레드를 멈추고 정리가 끝날 때까지 기다립니다.
+    signal.signal(signal.SIGINT, lambda signum, frame: engine.stop())
+    thread = engine.start(plan)
+    while thread.is_alive():
+        thread.join(0.2)
+
+    if masker is not None:
+        masker.stop()
+    results = engine.step_results
+    if args.timings:
+        write_timings(args.timings, results)
+    # 통계와 요약표가 섞이지 않도록 남은 로그를 먼저 모두 씀
+    shutdown_logging()
+    if profiler is not None:
+        profiler.write_chrome_trace(args.profile)
+        print(profiler.summary_table())
+    if engine.error is not None:
+        # 단계가 예외로 끝난 것은 취소가 아니라 실패
+        return EXIT_STEP_FAILED
+    if engine.stop_requested:
+        return EXIT_CANCELLED
+    return exit_code(results)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
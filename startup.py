@@ -0,0 +1,103 @@
+import importlib
+import subprocess
+import sys
+import threading
+import time
+
+from logs import get_logger
+
+log = get_logger("startup")
+
+# 창을 띄운 뒤 백그라운드에서 미리 불러올 무거운 모듈 (녹화/실행 시작 시 바로 쓰도록)
+HEAVY_MODULES = (
+    "win32gui",
+    "numpy",
+    "cv2",
+    "psutil",
+    "pynput.mouse",
+    "macro_engine",
+)
+# 시작 보고서에서 각각 측정할 모듈
+REPORT_MODULES = ("PyQt5.QtWidgets", "gui") + HEAVY_MODULES
+
+
+class ImportTimer:
+    """모듈을 불러오는 데 걸린 시간을 기록합니다."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = []  # (모듈 이름, 초, 오류)
+        self.lock = threading.Lock()
+
+    def elapsed(self):
+        """생성 이후 지난 시간(초)을 반환합니다."""
+        return time.perf_counter() - self.started
+
+    def load(self, name):
+        """모듈을 불러오고 걸린 시간을 기록합니다. 실패해도 예외를 내지 않습니다."""
+        start = time.perf_counter()
+        error = None
+        try:
+            importlib.import_module(name)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        with self.lock:
+            self.timings.append((name, time.perf_counter() - start, error))
+        return error is None
+
+    def summary(self):
+        return ", ".join(
+            f"{name} {seconds * 1000:.0f} ms" + (" (failed)" if error else "")
+            for name, seconds, error in self.timings
+        )
+
+
+def warm_up(timer, modules=HEAVY_MODULES, on_done=None):
+    """무거운 모듈을 백그라운드 스레드에서 미리 불러옵니다."""
+
+    def run():
+        for name in modules:
+            timer.load(name)
+        elapsed = timer.elapsed() * 1000
+        log.info("Warm-up finished after %.0f ms: %s", elapsed, timer.summary())
+        if on_done is not None:
+            on_done()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def cold_import_time(name, python=sys.executable):
+    """새 인터프리터에서 모듈 하나를 불러오는 시간(초)을 -X importtime 으로 측정합니다.
+
+    불러올 수 없으면 None 을 반환합니다.
+    """
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {name}"],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None
+    # 형식: "import time: self [us] | cumulative | imported package"
+    for line in reversed(result.stderr.splitlines()):
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == name:
+            return int(parts[1].strip()) / 1e6
+    return None
+
+
+def import_report(modules=REPORT_MODULES):
+    """모듈별 콜드 임포트 시간을 (모듈 이름, 초 또는 None) 목록으로 반환합니다."""
+    return [(name, cold_import_time(name)) for name in modules]
+
+
+if __name__ == "__main__":
+    # 모듈별 콜드 임포트 시간을 출력합니다. 회귀 추적용으로 릴리스마다 비교합니다.
+    names = sys.argv[1:] or REPORT_MODULES
+    for name, seconds in import_report(names):
+        if seconds is None:
+            print(f"{name:<20} unavailable")
+        else:
+            print(f"{name:<20} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,131 @@
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, Qt
+
+# 요약 문자열 최대 길이
+SUMMARY_LENGTH = 80
+
+
+def create_summary(click_info):
+    """리스트 아이템에 표시할 요약 정보를 생성합니다."""
+    summary = (
+        f"({click_info['x']}, {click_info['y']}) "
+        f"{click_info['window_title']} {click_info['program']}"
+    )
+    if len(summary) > SUMMARY_LENGTH:
+        summary = summary[: SUMMARY_LENGTH - 3] + "..."
+    return summary
+
+
+def contiguous_blocks(rows):
+    """행 번호들을 연속된 (처음, 끝) 구간 목록으로 묶습니다. 오름차순입니다."""
+    blocks = []
+    for row in sorted(set(rows)):
+        if blocks and blocks[-1][1] == row - 1:
+            blocks[-1][1] = row
+        else:
+            blocks.append([row, row])
+    return [(first, last) for first, last in blocks]
+
+
+class ClickStepModel(QAbstractListModel):
+    """클릭 단계 목록을 뷰에 보여주는 모델입니다.
+
+    요약 문자열은 뷰가 보이는 행을 요청할 때만 만듭니다. 여러 행의 추가, 삭제, 이동은
+    구간 단위 시그널로 알려서 뷰가 전체를 다시 그리지 않도록 합니다.
+    """
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.steps = []
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.steps)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < len(self.steps):
+            return None
+        if role == Qt.DisplayRole:
+            return create_summary(self.steps[index.row()])
+        if role == Qt.UserRole:
+            return self.steps[index.row()]
+        return None
+
+    def set_steps(self, steps):
+        """전체 단계를 바꿉니다. 요약은 만들지 않으므로 단계 수와 관계없이 바로 끝납니다."""
+        self.beginResetModel()
+        self.steps = steps
+        self.endResetModel()
+
+    def clear(self):
+        self.set_steps([])
+
+    def append(self, click_info):
+        self.insert(len(self.steps), [click_info])
+
+    def insert(self, row, click_infos):
+        """row 앞에 여러 단계를 한 번에 넣습니다."""
+        if not click_infos:
+            return
+        self.beginInsertRows(QModelIndex(), row, row + len(click_infos) - 1)
+        self.steps[row:row] = click_infos
+        self.endInsertRows()
+
+    def remove(self, rows):
+        """여러 행을 삭제합니다. 연속된 행은 한 번에 지웁니다."""
+        for first, last in reversed(contiguous_blocks(rows)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.steps[first : last + 1]
+            self.endRemoveRows()
+
+    def duplicate(self, rows):
+        """여러 행을 복제하여 각 구간 바로 아래에 넣습니다. 복제된 행 번호를 반환합니다."""
+        inserted = []
+        offset = 0
+        for first, last in contiguous_blocks(rows):
+            first += offset
+            last += offset
+            copies = [click_info.copy() for click_info in self.steps[first : last + 1]]
+            self.insert(last + 1, copies)
+            inserted.extend(range(last + 1, last + 1 + len(copies)))
+            offset += len(copies)
+        return inserted
+
+    def move(self, rows, delta):
+        """여러 행을 한 칸 위(delta=-1) 또는 아래(delta=1)로 옮깁니다. 옮긴 뒤 행 번호를 반환합니다.
+
+        맨 위나 맨 아래에 붙어 있는 구간은 움직이지 않습니다.
+        """
+        moved = []
+        for first, last in contiguous_blocks(rows):
+            at_edge = first == 0 if delta < 0 else last == len(self.steps) - 1
+            if at_edge:
+                # 끝에 붙은 구간은 그대로 둠 (구간 사이에는 항상 빈 행이 있음)
+                moved.extend(range(first, last + 1))
+                continue
+            # 구간 전체 대신 바로 옆 행 하나만 반대편으로 옮김
+            if delta < 0:
+                neighbor = first - 1
+                self.beginMoveRows(
+                    QModelIndex(), neighbor, neighbor, QModelIndex(), last + 1
+                )
+                # 구간 길이만큼만 복사 (pop/insert 는 목록 끝까지 밀어서 O(n))
+                self.steps[neighbor : last + 1] = self.steps[first : last + 1] + [
+                    self.steps[neighbor]
+                ]
+            else:
+                neighbor = last + 1
+                self.beginMoveRows(
+                    QModelIndex(), neighbor, neighbor, QModelIndex(), first
+                )
+                self.steps[first : neighbor + 1] = [
+                    self.steps[neighbor]
+                ] + self.steps[first : last + 1]
+            self.endMoveRows()
+            moved.extend(range(first + delta, last + delta + 1))
+        return sorted(moved)
+
+    def refresh(self, row):
+        """단계 내용이 바뀌었음을 뷰에 알립니다."""
+        index = self.index(row)
+        self.dataChanged.emit(index, index, [Qt.DisplayRole])
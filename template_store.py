@@ -0,0 +1,145 @@
+import os
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from logs import get_logger
+
+log = get_logger("template")
+
+# 매크로의 이미지 조건에서 템플릿 경로를 담는 필드
+IMAGE_PATH_FIELDS = ("skip_image_path", "wait_image_path", "auto_position_path")
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resolve_image_path(image_path):
+    """상대 경로는 스크립트 폴더 기준의 절대 경로로 바꾸고 정규화합니다."""
+    if not os.path.isabs(image_path):
+        image_path = os.path.join(SCRIPT_DIR, image_path)
+    return os.path.normpath(image_path)
+
+
+def referenced_image_paths(click_data_list):
+    """매크로가 참조하는 모든 템플릿 경로를 중복 없이 반환합니다."""
+    paths = []
+    for click_info in click_data_list:
+        for field in IMAGE_PATH_FIELDS:
+            image_path = click_info.get(field)
+            if image_path and image_path not in paths:
+                paths.append(image_path)
+    return paths
+
+
+class Template:
+    """디코딩된 그레이스케일 템플릿과 미리 계산된 파생 데이터입니다."""
+
+    __slots__ = ("path", "gray", "levels", "mean", "std", "nbytes", "mtime", "size")
+
+    def __init__(self, path, gray, mtime, size, max_levels=3, min_side=8):
+        self.path = path
+        self.gray = gray
+        self.mtime = mtime
+        self.size = size
+        # levels[0] 은 원본, levels[i] 는 1/2^i 크기
+        self.levels = [gray]
+        while len(self.levels) <= max_levels:
+            h, w = self.levels[-1].shape[:2]
+            if min(h, w) // 2 < min_side:
+                break
+            self.levels.append(cv2.pyrDown(self.levels[-1]))
+        mean, std = cv2.meanStdDev(gray)
+        self.mean = float(mean[0][0])
+        self.std = float(std[0][0])
+        self.nbytes = sum(level.nbytes for level in self.levels)
+
+    @property
+    def shape(self):
+        return self.gray.shape
+
+
+class TemplateStore:
+    """템플릿 이미지를 한 번만 디코딩하여 메모리에 보관합니다.
+
+    파일의 mtime 과 크기가 바뀌면 다시 읽고, 전체 바이트 수가 max_bytes 를 넘으면
+    가장 오래 사용하지 않은 템플릿부터 버립니다.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.templates = OrderedDict()  # 절대 경로 -> Template
+        self.total_bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, image_path):
+        """템플릿을 반환합니다. 파일이 없거나 디코딩에 실패하면 None 을 반환합니다."""
+        path = resolve_image_path(image_path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            log.warning("Image file not found: %s", path)
+            self.discard(path)
+            return None
+
+        with self.lock:
+            template = self.templates.get(path)
+            if (
+                template is not None
+                and template.mtime == stat.st_mtime
+                and template.size == stat.st_size
+            ):
+                self.templates.move_to_end(path)
+                self.hits += 1
+                return template
+
+        gray = cv2.imdecode(np.fromfile(path, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if gray is None:
+            log.warning("Failed to load target image: %s", path)
+            return None
+        template = Template(path, gray, stat.st_mtime, stat.st_size)
+
+        with self.lock:
+            self.misses += 1
+            old = self.templates.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+            self.templates[path] = template
+            self.total_bytes += template.nbytes
+            # 방금 넣은 템플릿은 남겨둔 채로 오래된 것부터 제거
+            while self.total_bytes > self.max_bytes and len(self.templates) > 1:
+                _, evicted = self.templates.popitem(last=False)
+                self.total_bytes -= evicted.nbytes
+        return template
+
+    def discard(self, path):
+        with self.lock:
+            old = self.templates.pop(path, None)
+            if old is not None:
+                self.total_bytes -= old.nbytes
+
+    def preload(self, image_paths):
+        """백그라운드 스레드에서 템플릿들을 미리 디코딩합니다."""
+        image_paths = list(image_paths)
+        if not image_paths:
+            return None
+
+        def run():
+            for image_path in image_paths:
+                self.get(image_path)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def stats(self):
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "templates": len(self.templates),
+                "bytes": self.total_bytes,
+            }
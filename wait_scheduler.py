@@ -0,0 +1,151 @@
+import threading
+import time
+
+
+class RealClock:
+    """실제 시간을 사용하는 시계입니다."""
+
+    def now(self):
+        return time.monotonic()
+
+    def sleep(self, seconds, wake_event):
+        """seconds 동안 기다립니다. wake_event 가 설정되면 바로 깨어나 True 를 반환합니다."""
+        return wake_event.wait(seconds)
+
+
+class VirtualClock:
+    """실제로 잠들지 않고 시간만 앞으로 옮기는 시계입니다. 스케줄 검증용입니다."""
+
+    def __init__(self, start=0.0):
+        self.time = start
+        self.sleeps = []
+
+    def now(self):
+        return self.time
+
+    def sleep(self, seconds, wake_event):
+        if wake_event.is_set():
+            return True
+        self.sleeps.append(seconds)
+        self.time += seconds
+        return wake_event.is_set()
+
+
+class WaitRecord:
+    """대기 한 번의 결과입니다."""
+
+    __slots__ = ("label", "waited", "polls", "outcome")
+
+    def __init__(self, label, waited, polls, outcome):
+        self.label = label
+        self.waited = waited
+        self.polls = polls
+        self.outcome = outcome  # "ok", "timeout", "cancelled"
+
+    def __repr__(self):
+        return (
+            f"WaitRecord({self.label!r}, {self.waited:.3f}s, "
+            f"polls={self.polls}, {self.outcome})"
+        )
+
+
+class WaitScheduler:
+    """조건이 참이 될 때까지 적응형 간격으로 폴링합니다.
+
+    동작 직후에는 initial 간격으로 빠르게 확인하고, 마지막 동작 이후 지난 시간에
+    비례하여 간격을 max_interval 까지 점차 늘립니다. cancel() 을 호출하면 즉시 깨어납니다.
+    """
+
+    def __init__(
+        self, clock=None, initial=0.05, max_interval=1.0, backoff_ratio=0.25
+    ):
+        self.clock = clock or RealClock()
+        self.initial = initial
+        self.max_interval = max_interval
+        self.backoff_ratio = backoff_ratio
+        self.cancelled = threading.Event()
+        self.last_action = self.clock.now()
+        self.records = []
+
+    def mark_action(self):
+        """클릭 등 UI 를 바꿀 수 있는 동작 직후에 호출합니다."""
+        self.last_action = self.clock.now()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def reset(self):
+        self.cancelled.clear()
+        self.last_action = self.clock.now()
+        self.records = []
+
+    def next_interval(self, now):
+        """마지막 동작 이후 지난 시간으로 다음 폴링 간격을 정합니다."""
+        since_action = now - self.last_action
+        return min(self.max_interval, max(self.initial, since_action * self.backoff_ratio))
+
+    def wait_until(self, poll, timeout, label="", wait=None, token=None):
+        """poll() 이 참 값을 돌려줄 때까지 기다립니다. 기한이 지나거나 취소되면 None 을 반환합니다.
+
+        wait(seconds) 를 주면 기본 대기 대신 사용합니다. (예: 윈도우 이벤트로 더 일찍 깨어나기)
+        token() 을 주면 poll 전에 받은 값을 wait(seconds, token) 으로 넘겨 poll 하는 동안
+        온 이벤트를 놓치지 않게 합니다.
+        """
+        clock = self.clock
+        start = clock.now()
+        deadline = start + timeout
+        polls = 0
+        while True:
+            polls += 1
+            seen = token() if token is not None else None
+            result = poll()
+            if result:
+                return self.finish(label, start, polls, "ok", result)
+            if self.cancelled.is_set():
+                return self.finish(label, start, polls, "cancelled", None)
+            now = clock.now()
+            remaining = deadline - now
+            if remaining <= 0:
+                return self.finish(label, start, polls, "timeout", None)
+            interval = min(self.next_interval(now), remaining)
+            if token is not None:
+                wait(interval, seen)
+            elif wait is not None:
+                wait(interval)
+            else:
+                clock.sleep(interval, self.cancelled)
+
+    def finish(self, label, start, polls, outcome, result):
+        self.records.append(WaitRecord(label, self.clock.now() - start, polls, outcome))
+        return result
+
+    def summary(self):
+        """대기 종류별 횟수와 총 대기 시간을 반환합니다."""
+        summary = {}
+        for record in self.records:
+            entry = summary.setdefault(record.outcome, {"count": 0, "waited": 0.0})
+            entry["count"] += 1
+            entry["waited"] += record.waited
+        return summary
+
+
+if __name__ == "__main__":
+    # 가상 시계로 3.2초 뒤에 참이 되는 조건을 기다려 봅니다. (실제로 잠들지 않음)
+    clock = VirtualClock()
+    scheduler = WaitScheduler(clock)
+    appear_at = 3.2
+    scheduler.mark_action()
+    scheduler.wait_until(lambda: clock.now() >= appear_at, 300, "adaptive")
+    record = scheduler.records[-1]
+    print(f"Adaptive: detected after {record.waited:.2f}s with {record.polls} polls")
+    print("Intervals:", ", ".join(f"{s:.2f}" for s in clock.sleeps))
+
+    fixed = 0
+    while fixed < appear_at:
+        fixed += 1
+    print(f"Fixed 1s polling: detected after {fixed:.2f}s with {fixed + 1} polls")
+
+    # 취소는 다음 폴링을 기다리지 않고 바로 반영됩니다.
+    scheduler.cancel()
+    scheduler.wait_until(lambda: False, 300, "cancelled")
+    print(scheduler.records[-1])
@@ -0,0 +1,384 @@
+import time
+
+from window_walk import walk_windows
+
+
+class WindowInfo:
+    """스냅샷에 기록된 윈도우 하나의 정보입니다."""
+
+    __slots__ = (
+        "hwnd",
+        "parent",
+        "window_class",
+        "window_text",
+        "depth",
+        "program",
+        "enabled",
+        "visible",
+        "pid",
+    )
+
+    def __init__(
+        self,
+        hwnd,
+        parent,
+        window_class,
+        window_text,
+        depth,
+        program,
+        enabled,
+        visible,
+        pid=0,
+    ):
+        self.hwnd = hwnd
+        self.parent = parent
+        self.window_class = window_class
+        self.window_text = window_text
+        self.depth = depth
+        self.program = program
+        self.enabled = enabled
+        self.visible = visible
+        self.pid = pid
+
+    def to_dict(self):
+        """find_hwnds_by_class 가 돌려주던 형식의 딕셔너리로 변환합니다."""
+        return {
+            "hwnd": self.hwnd,
+            "window_class": self.window_class,
+            "window_text": self.window_text,
+            "window_title": self.window_text,
+            "depth": self.depth,
+            "program": self.program,
+            "enabled": self.enabled,
+            "visible": self.visible,
+        }
+
+
+class Win32WindowBackend:
+    """win32gui 를 사용하여 실제 데스크톱의 윈도우를 열거합니다."""
+
+    def __init__(self, process_cache):
+        import win32gui
+        import win32process
+
+        self.win32gui = win32gui
+        self.win32process = win32process
+        self.process_cache = process_cache
+
+    def top_level_windows(self):
+        """최상위 윈도우 목록을 반환합니다."""
+        hwnds = []
+        self.win32gui.EnumWindows(lambda hwnd, acc: acc.append(hwnd), hwnds)
+        return hwnds
+
+    def child_windows(self, hwnd):
+        """hwnd 아래의 모든 자손 윈도우를 반환합니다. (EnumChildWindows 는 이미 재귀적입니다)"""
+        hwnds = []
+        self.win32gui.EnumChildWindows(hwnd, lambda child, acc: acc.append(child), hwnds)
+        return hwnds
+
+    def get_parent(self, hwnd):
+        return self.win32gui.GetParent(hwnd)
+
+    def get_class_name(self, hwnd):
+        return self.win32gui.GetClassName(hwnd)
+
+    def get_window_text(self, hwnd):
+        return self.win32gui.GetWindowText(hwnd)
+
+    def is_window(self, hwnd):
+        return bool(self.win32gui.IsWindow(hwnd))
+
+    def is_enabled(self, hwnd):
+        return bool(self.win32gui.IsWindowEnabled(hwnd))
+
+    def is_visible(self, hwnd):
+        return bool(self.win32gui.IsWindowVisible(hwnd))
+
+    def get_process_id(self, hwnd):
+        _, pid = self.win32process.GetWindowThreadProcessId(hwnd)
+        return pid
+
+    def get_process_name(self, pid):
+        return self.process_cache.get_name(pid)
+
+    def get_window_rect(self, hwnd):
+        return self.win32gui.GetWindowRect(hwnd)
+
+    def window_from_point(self, x, y):
+        return self.win32gui.WindowFromPoint((x, y))
+
+
+class FakeWindowBackend:
+    """메모리 안의 가짜 윈도우 트리입니다. 리눅스에서 인덱스와 조회 로직을 검증할 때 사용합니다."""
+
+    def __init__(self):
+        self.windows = {}  # hwnd -> dict
+        self.children = {0: []}
+        self.processes = {}  # pid -> 프로그램 이름
+        self.next_hwnd = 0x10000
+
+    def add_window(
+        self,
+        parent=0,
+        window_class="Static",
+        window_text="",
+        pid=0,
+        enabled=True,
+        visible=True,
+        rect=(0, 0, 800, 600),
+    ):
+        """가짜 윈도우를 추가하고 hwnd 를 반환합니다."""
+        hwnd = self.next_hwnd
+        self.next_hwnd += 4
+        self.windows[hwnd] = {
+            "parent": parent,
+            "window_class": window_class,
+            "window_text": window_text,
+            "pid": pid,
+            "enabled": enabled,
+            "visible": visible,
+            "rect": rect,
+        }
+        self.children.setdefault(parent, []).append(hwnd)
+        self.children[hwnd] = []
+        return hwnd
+
+    def remove_window(self, hwnd):
+        """윈도우와 그 자손을 제거합니다."""
+        for child in list(self.children.get(hwnd, ())):
+            self.remove_window(child)
+        info = self.windows.pop(hwnd, None)
+        if info is not None:
+            self.children[info["parent"]].remove(hwnd)
+        self.children.pop(hwnd, None)
+
+    def top_level_windows(self):
+        return list(self.children[0])
+
+    def child_windows(self, hwnd):
+        result = []
+        stack = list(reversed(self.children.get(hwnd, ())))
+        while stack:
+            child = stack.pop()
+            result.append(child)
+            stack.extend(reversed(self.children.get(child, ())))
+        return result
+
+    def get_parent(self, hwnd):
+        info = self.windows.get(hwnd)
+        return info["parent"] if info else 0
+
+    def get_class_name(self, hwnd):
+        return self.windows[hwnd]["window_class"]
+
+    def get_window_text(self, hwnd):
+        return self.windows[hwnd]["window_text"]
+
+    def is_window(self, hwnd):
+        return hwnd in self.windows
+
+    def is_enabled(self, hwnd):
+        return self.windows[hwnd]["enabled"]
+
+    def is_visible(self, hwnd):
+        return self.windows[hwnd]["visible"]
+
+    def get_process_id(self, hwnd):
+        return self.windows[hwnd]["pid"]
+
+    def get_process_name(self, pid):
+        return self.processes.get(pid, "Unknown")
+
+    def get_window_rect(self, hwnd):
+        return self.windows[hwnd]["rect"]
+
+    def window_from_point(self, x, y):
+        """점을 포함하는 가장 나중에 추가된 보이는 윈도우를 반환합니다. 없으면 0 입니다."""
+        for hwnd in reversed(self.windows):
+            info = self.windows[hwnd]
+            left, top, right, bottom = info["rect"]
+            if info["visible"] and left <= x < right and top <= y < bottom:
+                return hwnd
+        return 0
+
+
+def build_synthetic_tree(backend, window_count, fan_out=8, programs=20):
+    """window_count 개의 윈도우로 이루어진 가짜 트리를 만들고 hwnd 목록을 반환합니다."""
+    for pid in range(1, programs + 1):
+        backend.processes[pid] = f"program{pid}.exe"
+    hwnds = []
+    frontier = []
+    while len(hwnds) < window_count:
+        if not frontier or len(hwnds) % (fan_out * fan_out * 4) == 0:
+            # 새 최상위 윈도우
+            pid = len(hwnds) % programs + 1
+            hwnd = backend.add_window(0, "TopLevel", f"Window {len(hwnds)}", pid)
+            frontier = [hwnd]
+        else:
+            parent = frontier[len(hwnds) % len(frontier)]
+            pid = backend.windows[parent]["pid"]
+            hwnd = backend.add_window(
+                parent, f"Class{len(hwnds) % 37}", f"Text {len(hwnds)}", pid
+            )
+            if len(backend.children[parent]) >= fan_out:
+                frontier.remove(parent)
+            frontier.append(hwnd)
+        hwnds.append(hwnd)
+    return hwnds
+
+
+class WindowTreeSnapshot:
+    """윈도우 트리를 한 번 열거하고 (program, window_class, window_text, depth) 로 색인합니다."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.windows = []
+        self.by_hwnd = {}
+        self.index = {}
+        self.class_index = {}
+        self.created_at = time.monotonic()
+        # 만든 뒤 관련 윈도우 이벤트가 있었으면 True (다음 열거 대상)
+        self.dirty = False
+        self.build()
+
+    @staticmethod
+    def make_key(program, window_class, window_text, depth):
+        return (program, window_class, window_text, depth)
+
+    @classmethod
+    def key_for(cls, click_info):
+        """click_info (또는 타겟 정보) 에서 색인 키를 만듭니다."""
+        return cls.make_key(
+            click_info["program"],
+            click_info["window_class"],
+            click_info["window_text"],
+            click_info["depth"],
+        )
+
+    def build(self):
+        """모든 윈도우를 한 번씩만 열거하며 색인을 만듭니다."""
+        backend = self.backend
+        programs = {}  # 한 번의 스냅샷 안에서는 pid 당 한 번만 조회
+        for hwnd, parent, depth in walk_windows(backend):
+            pid = backend.get_process_id(hwnd)
+            program = programs.get(pid)
+            if program is None:
+                program = programs[pid] = backend.get_process_name(pid)
+            self.add(
+                WindowInfo(
+                    hwnd,
+                    parent,
+                    backend.get_class_name(hwnd),
+                    backend.get_window_text(hwnd),
+                    depth,
+                    program,
+                    backend.is_enabled(hwnd),
+                    backend.is_visible(hwnd),
+                    pid,
+                )
+            )
+
+    def add(self, info):
+        self.windows.append(info)
+        self.by_hwnd[info.hwnd] = info
+        key = self.make_key(info.program, info.window_class, info.window_text, info.depth)
+        self.index.setdefault(key, []).append(info)
+        self.class_index.setdefault(info.window_class, []).append(info)
+
+    def age(self):
+        """스냅샷이 만들어진 후 지난 시간(초)을 반환합니다."""
+        return time.monotonic() - self.created_at
+
+    def lookup(self, click_info, pid=None):
+        """기록된 정보와 일치하는 활성화되고 보이는 첫 번째 hwnd 를 O(1) 로 찾습니다.
+
+        pid 를 주면 그 프로세스의 윈도우만 찾습니다. (같은 프로그램을 여러 개 띄운 경우)
+        """
+        return self.lookup_key(
+            self.key_for(click_info), click_info["window_title"], pid
+        )
+
+    def lookup_key(self, key, window_title, pid=None):
+        """미리 계산된 색인 키로 찾습니다. (실행 계획의 Target.key)"""
+        for info in self.index.get(key, ()):
+            if (
+                info.enabled
+                and info.visible
+                and info.window_text == window_title
+                and (pid is None or info.pid == pid)
+            ):
+                return info.hwnd
+        return None
+
+    def process_ids(self, program):
+        """program 이름을 가진 프로세스의 pid 를 처음 나타난 순서대로 반환합니다."""
+        pids = []
+        for info in self.windows:
+            if info.program == program and info.pid not in pids:
+                pids.append(info.pid)
+        return pids
+
+    def find_by_class(self, window_class):
+        """window_class 가 일치하는 모든 윈도우 정보를 반환합니다."""
+        return list(self.class_index.get(window_class, ()))
+
+    def is_still_valid(self, hwnd):
+        """스냅샷 이후에도 hwnd 가 살아있고 클릭 가능한지 확인합니다."""
+        backend = self.backend
+        return (
+            backend.is_window(hwnd)
+            and backend.is_enabled(hwnd)
+            and backend.is_visible(hwnd)
+        )
+
+
+def linear_find(backend, click_info):
+    """색인 없이 모든 윈도우를 훑는 기존 방식의 조회입니다. 벤치마크 비교용입니다."""
+    for top_hwnd in backend.top_level_windows():
+        for hwnd in [top_hwnd] + backend.child_windows(top_hwnd):
+            if not backend.is_enabled(hwnd) or not backend.is_visible(hwnd):
+                continue
+            depth = 0
+            parent = hwnd
+            while parent:
+                parent = backend.get_parent(parent)
+                depth += 1
+            if (
+                backend.get_class_name(hwnd) == click_info["window_class"]
+                and backend.get_window_text(hwnd) == click_info["window_text"]
+                and backend.get_window_text(hwnd) == click_info["window_title"]
+                and depth == click_info["depth"]
+                and backend.get_process_name(backend.get_process_id(hwnd))
+                == click_info["program"]
+            ):
+                return hwnd
+    return None
+
+
+if __name__ == "__main__":
+    # 리눅스에서도 실행 가능한 50,000 개 윈도우 합성 트리 벤치마크
+    import random
+
+    backend = FakeWindowBackend()
+    hwnds = build_synthetic_tree(backend, 50000)
+
+    start = time.perf_counter()
+    snapshot = WindowTreeSnapshot(backend)
+    build_time = time.perf_counter() - start
+    print(f"Snapshot build: {len(snapshot.windows)} windows in {build_time * 1000:.1f} ms")
+
+    targets = [snapshot.by_hwnd[h].to_dict() for h in random.sample(hwnds, 200)]
+
+    start = time.perf_counter()
+    for target in targets:
+        assert snapshot.lookup(target) == target["hwnd"]
+    indexed_time = (time.perf_counter() - start) / len(targets)
+
+    start = time.perf_counter()
+    for target in targets[:10]:
+        assert linear_find(backend, target) == target["hwnd"]
+    linear_time = (time.perf_counter() - start) / 10
+
+    print(f"Indexed lookup: {indexed_time * 1e6:.1f} us/lookup")
+    print(f"Linear scan:    {linear_time * 1000:.1f} ms/lookup")
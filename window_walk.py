@@ -0,0 +1,111 @@
+def top_level_depth(backend, hwnd, depths):
+    """최상위 윈도우의 깊이를 GetParent(소유자) 체인으로 계산합니다. 기존 get_window_depth 와 같은 값입니다."""
+    chain = []
+    while hwnd and hwnd not in depths:
+        chain.append(hwnd)
+        hwnd = backend.get_parent(hwnd)
+    depth = depths.get(hwnd, 0)
+    for ancestor in reversed(chain):
+        depth += 1
+        depths[ancestor] = depth
+    return depth
+
+
+def walk_windows(backend):
+    """모든 윈도우를 정확히 한 번씩 방문하며 (hwnd, parent, depth) 를 생성합니다.
+
+    EnumChildWindows 는 이미 모든 자손을 재귀적으로 돌려주므로 최상위 윈도우마다 한 번만 호출합니다.
+    자손은 부모보다 먼저 나오지 않으므로 깊이는 부모의 깊이 + 1 로 바로 구해집니다.
+    """
+    depths = {}
+    seen = set()
+    for top_hwnd in backend.top_level_windows():
+        if top_hwnd in seen:
+            continue
+        seen.add(top_hwnd)
+        yield top_hwnd, 0, top_level_depth(backend, top_hwnd, depths)
+        for hwnd in backend.child_windows(top_hwnd):
+            if hwnd in seen:
+                continue
+            seen.add(hwnd)
+            parent = backend.get_parent(hwnd)
+            parent_depth = depths.get(parent)
+            if parent_depth is None:
+                # 열거 도중 부모가 바뀐 경우 등: 체인을 따라 계산
+                depth = top_level_depth(backend, hwnd, depths)
+            else:
+                depth = depths[hwnd] = parent_depth + 1
+            yield hwnd, parent, depth
+
+
+class CountingBackend:
+    """child_windows 로 돌려준 윈도우 수를 세는 백엔드 래퍼입니다. 벤치마크용입니다."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.visits = 0
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def top_level_windows(self):
+        hwnds = self.backend.top_level_windows()
+        self.visits += len(hwnds)
+        return hwnds
+
+    def child_windows(self, hwnd):
+        hwnds = self.backend.child_windows(hwnd)
+        self.visits += len(hwnds)
+        return hwnds
+
+
+def legacy_all_hwnds(backend):
+    """수정 전 get_all_hwnds/get_all_descendants 의 방문 방식입니다. 벤치마크 비교용입니다."""
+
+    def descendants(hwnd):
+        hwnd_list = []
+        for child_hwnd in backend.child_windows(hwnd):
+            hwnd_list.append(child_hwnd)
+            hwnd_list.extend(descendants(child_hwnd))
+        return hwnd_list
+
+    all_hwnds = []
+    for hwnd in backend.top_level_windows():
+        all_hwnds.append(hwnd)
+        all_hwnds.extend(descendants(hwnd))
+    return all_hwnds
+
+
+def build_chain_tree(backend, depth, fan_out):
+    """깊이 depth, 각 노드의 자식 수 fan_out 인 완전 트리를 가짜 백엔드에 만듭니다."""
+    level = [backend.add_window(0, "TopLevel", "root", 1)]
+    for _ in range(depth - 1):
+        next_level = []
+        for parent in level:
+            for _ in range(fan_out):
+                next_level.append(backend.add_window(parent, "Child", "", 1))
+        level = next_level
+    return len(backend.windows)
+
+
+if __name__ == "__main__":
+    # 깊이와 fan-out 에 따른 방문 횟수 비교 (리눅스에서 실행 가능)
+    from window_index import FakeWindowBackend
+
+    print(f"{'depth':>5} {'fan_out':>7} {'windows':>8} {'legacy':>10} {'walk':>8}")
+    # 기존 방식은 깊이에 따라 폭발적으로 늘어나므로 작은 크기만 비교합니다.
+    for depth, fan_out in [(2, 8), (3, 16), (4, 4), (6, 3), (8, 2), (12, 1), (16, 1)]:
+        fake = FakeWindowBackend()
+        window_count = build_chain_tree(fake, depth, fan_out)
+
+        legacy = CountingBackend(fake)
+        legacy_hwnds = legacy_all_hwnds(legacy)
+
+        walker = CountingBackend(fake)
+        walked = list(walk_windows(walker))
+        assert len(walked) == window_count
+        assert len(set(legacy_hwnds)) == window_count
+
+        print(
+            f"{depth:>5} {fan_out:>7} {window_count:>8} {legacy.visits:>10} {walker.visits:>8}"
+        )
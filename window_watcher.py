@@ -0,0 +1,293 @@
+import threading
+import time
+
+# WinEvent 상수
+EVENT_OBJECT_CREATE = 0x8000
+EVENT_OBJECT_DESTROY = 0x8001
+EVENT_OBJECT_SHOW = 0x8002
+EVENT_OBJECT_HIDE = 0x8003
+EVENT_OBJECT_STATECHANGE = 0x800A
+EVENT_OBJECT_NAMECHANGE = 0x800C
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+OBJID_WINDOW = 0
+CHILDID_SELF = 0
+WM_QUIT = 0x0012
+# 훅 스레드가 준비될 때까지 기다리는 최대 시간(초)
+START_TIMEOUT = 5.0
+
+EVENT_KINDS = {
+    EVENT_OBJECT_CREATE: "create",
+    EVENT_OBJECT_DESTROY: "destroy",
+    EVENT_OBJECT_SHOW: "show",
+    EVENT_OBJECT_HIDE: "hide",
+    EVENT_OBJECT_STATECHANGE: "state",
+    EVENT_OBJECT_NAMECHANGE: "name",
+}
+
+# (eventMin, eventMax) 구간. LOCATIONCHANGE 처럼 잦은 이벤트는 제외합니다.
+HOOK_RANGES = [
+    (EVENT_OBJECT_CREATE, EVENT_OBJECT_HIDE),
+    (EVENT_OBJECT_STATECHANGE, EVENT_OBJECT_STATECHANGE),
+    (EVENT_OBJECT_NAMECHANGE, EVENT_OBJECT_NAMECHANGE),
+]
+
+
+class WinEventSource:
+    """SetWinEventHook 으로 윈도우 생성/파괴/이름 변경 알림을 받습니다."""
+
+    def __init__(self):
+        self.thread = None
+        self.thread_id = None
+        self.ready = threading.Event()
+        self.error = None
+
+    def start(self, callback):
+        """훅 스레드를 시작합니다. 훅 설정에 실패하면 그 예외를 호출한 스레드에서 발생시킵니다."""
+        self.ready.clear()
+        self.error = None
+        self.thread = threading.Thread(target=self.run, args=(callback,), daemon=True)
+        self.thread.start()
+        if not self.ready.wait(START_TIMEOUT):
+            raise RuntimeError("window event hook thread did not start")
+        if self.error is not None:
+            self.thread = None
+            raise self.error
+
+    def run(self, callback):
+        try:
+            hooks = self.set_hooks(callback)
+        except Exception as e:
+            # 준비 신호를 기다리는 스레드가 멈추지 않도록 오류를 넘기고 끝냄
+            self.error = e
+            self.ready.set()
+            return
+        self.ready.set()
+        self.pump(hooks)
+
+    def set_hooks(self, callback):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        kernel32 = ctypes.windll.kernel32
+
+        WinEventProcType = ctypes.WINFUNCTYPE(
+            None,
+            wintypes.HANDLE,
+            wintypes.DWORD,
+            wintypes.HWND,
+            wintypes.LONG,
+            wintypes.LONG,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        )
+        user32.SetWinEventHook.restype = wintypes.HANDLE
+        user32.SetWinEventHook.argtypes = [
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.HMODULE,
+            WinEventProcType,
+            wintypes.DWORD,
+            wintypes.DWORD,
+            wintypes.DWORD,
+        ]
+        user32.UnhookWinEvent.argtypes = [wintypes.HANDLE]
+
+        def handle_event(hook, event, hwnd, id_object, id_child, thread, event_time):
+            # 윈도우 자체에 대한 이벤트만 전달 (캐럿, 커서 등은 무시)
+            if not hwnd or id_object != OBJID_WINDOW or id_child != CHILDID_SELF:
+                return
+            kind = EVENT_KINDS.get(event)
+            if kind:
+                callback(kind, hwnd)
+
+        # 콜백이 가비지 컬렉션되지 않도록 보관
+        self.proc = WinEventProcType(handle_event)
+        hooks = [
+            user32.SetWinEventHook(
+                low,
+                high,
+                None,
+                self.proc,
+                0,
+                0,
+                WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS,
+            )
+            for low, high in HOOK_RANGES
+        ]
+        if not any(hooks):
+            raise OSError("SetWinEventHook failed")
+        self.thread_id = kernel32.GetCurrentThreadId()
+        return hooks
+
+    def pump(self, hooks):
+        import ctypes
+        from ctypes import wintypes
+
+        user32 = ctypes.windll.user32
+        # OUTOFCONTEXT 훅은 이 스레드의 메시지 루프에서 호출됩니다.
+        msg = wintypes.MSG()
+        while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+
+        for hook in hooks:
+            if hook:
+                user32.UnhookWinEvent(hook)
+
+    def stop(self):
+        if self.thread is None:
+            return
+        import ctypes
+
+        ctypes.windll.user32.PostThreadMessageW(self.thread_id, WM_QUIT, 0, 0)
+        self.thread.join(timeout=1)
+        self.thread = None
+
+
+class ScriptedEventSource:
+    """스크립트에 따라 이벤트를 재생합니다. 리눅스에서 대기 로직을 검증할 때 사용합니다.
+
+    script 는 (지연 초, 이벤트 종류, 동작) 목록입니다. 동작은 hwnd 이거나 hwnd 를 반환하는 함수입니다.
+    """
+
+    def __init__(self, script):
+        self.script = list(script)
+        self.thread = None
+        self.stopped = threading.Event()
+
+    def start(self, callback):
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, args=(callback,), daemon=True)
+        self.thread.start()
+
+    def run(self, callback):
+        for delay, kind, action in self.script:
+            if self.stopped.wait(delay):
+                return
+            hwnd = action() if callable(action) else action
+            callback(kind, hwnd)
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout=1)
+            self.thread = None
+
+
+class WindowWatcher:
+    """윈도우 변경 알림을 받아 대기 중인 스레드를 바로 깨웁니다."""
+
+    def __init__(self, source, fallback_interval=1.0, min_interval=0.05):
+        self.source = source
+        # 놓친 이벤트(예: 알림 없는 텍스트 변경)에 대비한 최대 대기 간격
+        self.fallback_interval = fallback_interval
+        # 이벤트가 몰려올 때 재검색을 묶기 위한 최소 간격
+        self.min_interval = min_interval
+        self.condition = threading.Condition()
+        self.generation = 0
+        self.event_counts = {}
+        self.listeners = []
+        self.running = False
+
+    def start(self):
+        if not self.running:
+            self.source.start(self.on_event)
+            self.running = True
+
+    def stop(self):
+        if self.running:
+            self.running = False
+            self.source.stop()
+        self.wake()
+
+    def on_event(self, kind, hwnd):
+        """이벤트 소스에서 호출됩니다."""
+        with self.condition:
+            self.generation += 1
+            self.event_counts[kind] = self.event_counts.get(kind, 0) + 1
+            self.condition.notify_all()
+        for listener in self.listeners:
+            listener(kind, hwnd)
+
+    def wake(self):
+        """취소 등으로 대기 중인 스레드를 즉시 깨웁니다."""
+        with self.condition:
+            self.generation += 1
+            self.condition.notify_all()
+
+    def token(self):
+        """현재 세대 번호를 반환합니다. 검색 전에 받아 두었다가 wait_event 에 넘깁니다."""
+        return self.generation
+
+    def wait_event(self, timeout, seen=None):
+        """윈도우 이벤트가 오거나 timeout 초가 지날 때까지 기다립니다.
+
+        seen 은 검색 전에 받은 token() 입니다. 그 뒤에 온 이벤트나 wake() 가 있으면 바로 반환합니다.
+        """
+        with self.condition:
+            if seen is None:
+                seen = self.generation
+            self.condition.wait_for(lambda: self.generation != seen, timeout)
+            woken = self.generation != seen
+        if woken:
+            # 이벤트가 연달아 오는 경우 한 번에 묶어서 재검색
+            time.sleep(self.min_interval)
+        return woken
+
+    def wait_for(self, find, timeout, is_cancelled=None):
+        """find() 가 참 값을 돌려줄 때까지 윈도우 이벤트를 기다립니다.
+
+        기한이 지나거나 is_cancelled() 가 참이 되면 None 을 반환합니다.
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            with self.condition:
+                seen = self.generation
+            result = find()
+            if result:
+                return result
+            if is_cancelled is not None and is_cancelled():
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            with self.condition:
+                if self.generation == seen:
+                    self.condition.wait(min(remaining, self.fallback_interval))
+            if is_cancelled is not None and is_cancelled():
+                return None
+            # 이벤트가 연달아 오는 경우 한 번에 묶어서 재검색
+            time.sleep(min(self.min_interval, max(deadline - time.monotonic(), 0)))
+
+
+if __name__ == "__main__":
+    # 0.3초 뒤에 나타나는 윈도우를 기다리는 데 걸리는 시간을 측정합니다.
+    from window_index import FakeWindowBackend, WindowTreeSnapshot, build_synthetic_tree
+
+    backend = FakeWindowBackend()
+    build_synthetic_tree(backend, 5000)
+    target = {
+        "window_class": "#32770",
+        "window_text": "Calculation",
+        "window_title": "Calculation",
+        "depth": 1,
+        "program": "program1.exe",
+    }
+
+    def show_target():
+        return backend.add_window(0, "#32770", "Calculation", 1)
+
+    source = ScriptedEventSource(
+        [(0.1, "create", lambda: backend.add_window(0, "Noise", "", 2))]
+        + [(0.2, "create", show_target)]
+    )
+    watcher = WindowWatcher(source)
+    watcher.start()
+    start = time.perf_counter()
+    hwnd = watcher.wait_for(lambda: WindowTreeSnapshot(backend).lookup(target), 60)
+    elapsed = time.perf_counter() - start
+    watcher.stop()
+    print(f"Found hwnd {hwnd:#x} after {elapsed * 1000:.0f} ms (1 s polling would take 1000 ms)")
+    print(f"Events: {watcher.event_counts}")